@@ -0,0 +1,82 @@
+# benchmarks/bench_codec.py
+
+"""
+Скорость сериализации/разбора и размер файлов users/portfolios
+для текущего пути (json.dump с indent=2) и кодеков из infra/codec.py.
+
+Запуск:
+    python -m benchmarks.bench_codec
+    python -m benchmarks.bench_codec --records 100000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_storage import generate_data
+from valutatrade_hub.infra import codec
+
+
+def make_records(n: int):
+    """users/portfolios в формате to_dict() — через генератор из bench_storage"""
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_data(tmp, n)
+        with open(os.path.join(tmp, "users.json"), encoding="utf-8") as f:
+            users = json.load(f)
+        with open(os.path.join(tmp, "portfolios.json"), encoding="utf-8") as f:
+            portfolios = json.load(f)
+    return {"users": users, "portfolios": portfolios}
+
+
+def stdlib_encode(records, kind):
+    # Прежний путь DatabaseManager._safe_write
+    return json.dumps(records, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def stdlib_decode(raw):
+    return json.loads(raw)
+
+
+def codec_encoder(fmt):
+    return lambda records, kind: codec.encode(records, kind, fmt)
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк кодеков файлов данных")
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    variants = {"json (stdlib)": (stdlib_encode, stdlib_decode)}
+    if codec.orjson is not None:
+        variants["json (orjson)"] = (codec_encoder("json"), codec.decode)
+    variants["binary"] = (codec_encoder("binary"), codec.decode)
+    if codec.msgpack is not None:
+        variants["msgpack"] = (codec_encoder("msgpack"), codec.decode)
+
+    data = make_records(args.records)
+    print(f"{'kind':>10} {'codec':>14} {'size, KB':>10} "
+          f"{'encode, rec/s':>14} {'decode, rec/s':>14}")
+    for kind, records in data.items():
+        for name, (encode, decode) in variants.items():
+            raw = encode(records, kind)
+            assert decode(raw) == records, f"{name}: данные не совпали"
+            enc = best_of(args.repeat, lambda: encode(records, kind))
+            dec = best_of(args.repeat, lambda: decode(raw))
+            print(f"{kind:>10} {name:>14} {len(raw) / 1024:>10.0f} "
+                  f"{len(records) / enc:>14,.0f} {len(records) / dec:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_group_commit.py
+
+"""
+Групповая фиксация записей: сколько записей сливается в один fsync
+и какова p99 задержка записи при разном окне write_batch_window_ms.
+
+N потоков одновременно сохраняют портфели (portfolios.json, layout single).
+Окно 0 — запись сразу, как без групповой фиксации.
+
+Запуск:
+    python -m benchmarks.bench_group_commit
+    python -m benchmarks.bench_group_commit --windows 0,2,5,10 --threads 16
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_storage import generate_data
+from valutatrade_hub.infra import group_commit
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def make_db(data_dir: str, window_ms: float, wait: bool) -> DatabaseManager:
+    settings = SettingsLoader()
+    settings._settings["data_dir"] = data_dir
+    settings._settings["storage_backend"] = "json"
+    settings._settings["portfolio_layout"] = "single"
+    settings._settings["trade_journal"] = False
+    settings._settings["write_batch_window_ms"] = window_ms
+    settings._settings["write_wait_durable"] = wait
+    # Писатель один на процесс — для нового окна создаём заново
+    if group_commit._writer is not None:
+        group_commit._writer.flush()
+    group_commit._writer = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DatabaseManager()
+
+
+def run(db: DatabaseManager, n_users: int, n_threads: int, per_thread: int) -> list:
+    """Каждый поток сохраняет per_thread портфелей; задержки save_portfolio, мс"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(offset: int) -> None:
+        local = []
+        for k in range(per_thread):
+            user_id = 1 + (offset * per_thread + k) % n_users
+            portfolio = db.load_portfolio(user_id)
+            start = time.perf_counter()
+            db.save_portfolio(portfolio)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк групповой фиксации")
+    parser.add_argument("--windows", default="0,2,5,10",
+                        help="Окна write_batch_window_ms через запятую")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=25,
+                        help="Записей на поток")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="fire-and-forget: не ждать durability")
+    args = parser.parse_args()
+
+    print(f"{'window':>7} {'writes':>7} {'fsyncs':>7} {'avg batch':>10} "
+          f"{'p50, ms':>9} {'p99, ms':>9} {'total, s':>9}")
+    for window in (float(x) for x in args.windows.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            generate_data(tmp, args.users)
+            db = make_db(tmp, window, wait=not args.no_wait)
+            start = time.perf_counter()
+            latencies = run(db, args.users, args.threads, args.writes)
+            if db.group_writer is not None:
+                db.group_writer.flush()
+            total = time.perf_counter() - start
+
+            stats = db.write_stats()
+            fsyncs = stats.get("files_written", len(latencies))
+            avg_batch = stats.get("avg_batch", 1.0)
+            latencies.sort()
+            p99 = latencies[min(int(0.99 * len(latencies)), len(latencies) - 1)]
+            print(f"{window:>7g} {len(latencies):>7} {fsyncs:>7} {avg_batch:>10} "
+                  f"{statistics.median(latencies):>9.2f} {p99:>9.2f} {total:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# benchmarks/bench_parser_service.py
+
+"""
+Пропускная способность и сквозная задержка обновления курсов
+(RatesUpdater: опрос → разбор → сравнение → rates.json → история)
+без сети: клиенты ReplayApiClient отдают ответы из фикстур
+с заданной задержкой, долей ошибок 503 и размером ответа.
+Данные пишутся во временный каталог, рабочие файлы не трогаются.
+
+Фикстуры: без --fixtures генерируются синтетические ответы
+(курсы дрейфуют от ответа к ответу). Записать настоящие
+(нужны ключи в .env и сеть):
+    python -m benchmarks.bench_parser_service --record benchmarks/fixtures --samples 3
+
+Запуск:
+    python -m benchmarks.bench_parser_service
+    python -m benchmarks.bench_parser_service --fixtures benchmarks/fixtures \\
+        --refreshes 200 --latency-ms 150 --jitter-ms 100 \\
+        --error-rate 0.1 --payload-scale 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from valutatrade_hub.parser_service import storage
+from valutatrade_hub.parser_service.api_clients import (
+    CoinGeckoClient,
+    ExchangeRateApiClient,
+    HttpClientMixin,
+)
+from valutatrade_hub.parser_service.config import config
+from valutatrade_hub.parser_service.replay import (
+    RecordingApiClient,
+    ReplayApiClient,
+    fixture_path,
+    save_fixture,
+)
+from valutatrade_hub.parser_service.rollups import RollupStore
+from valutatrade_hub.parser_service.timeseries import RateHistoryStore
+from valutatrade_hub.parser_service.updater import RatesUpdater
+
+
+def make_specs():
+    """Боевые клиенты как описание запросов; ключ API для replay не нужен"""
+    fiat = ExchangeRateApiClient.__new__(ExchangeRateApiClient)
+    fiat.url = f"{config.EXCHANGERATE_API_URL}/replay/latest/{config.BASE_CURRENCY}"
+    return [fiat, CoinGeckoClient()]
+
+
+def write_synthetic_fixtures(directory: Path, responses: int) -> None:
+    """Синтетические ответы обоих API: курсы сдвигаются на 0.5% за ответ"""
+    fiat, crypto = make_specs()
+    fiat_responses, crypto_responses = [], []
+    for n in range(responses):
+        drift = 1 + 0.005 * n
+        fiat_body = {
+            "result": "success",
+            "base_code": config.BASE_CURRENCY,
+            "conversion_rates": {
+                code: round((1.0 + i / 10) * drift, 6)
+                for i, code in enumerate(config.FIAT_CURRENCIES)
+            },
+        }
+        crypto_body = {
+            config.CRYPTO_ID_MAP[code]: {config.BASE_CURRENCY.lower(): round((100.0 + i) * drift, 4)} # noqa: E501
+            for i, code in enumerate(config.CRYPTO_CURRENCIES)
+        }
+        headers = {"Content-Type": "application/json", "ETag": f'W/"synthetic-{n}"'}
+        fiat_responses.append({"status": 200, "headers": headers, "body": json.dumps(fiat_body)}) # noqa: E501
+        crypto_responses.append({"status": 200, "headers": headers, "body": json.dumps(crypto_body)}) # noqa: E501
+    for spec, recorded in ((fiat, fiat_responses), (crypto, crypto_responses)):
+        save_fixture(fixture_path(directory, spec), {
+            "client": type(spec).__name__, "synthetic": True, "responses": recorded,
+        })
+
+
+def use_data_dir(data_dir: Path) -> None:
+    """Направить rates.json, историю и валидаторы во временный каталог"""
+    storage.RATES_FILE_PATH = data_dir / "rates.json"
+    storage.HTTP_VALIDATORS_PATH = data_dir / "http_validators.json"
+    storage.HISTORY_DIR = data_dir / "history"
+    storage._history_store = RateHistoryStore(storage.HISTORY_DIR)
+    storage._rollup_store = RollupStore(storage.HISTORY_DIR)
+    HttpClientMixin._validators = {}
+
+
+def record(directory: Path, samples: int, interval: float) -> None:
+    clients = [CoinGeckoClient()]
+    if config.EXCHANGERATE_API_KEY:
+        clients.insert(0, ExchangeRateApiClient())
+    recorders = [RecordingApiClient(client, directory) for client in clients]
+    for n in range(samples):
+        if n:
+            time.sleep(interval)
+        for recorder in recorders:
+            try:
+                rates = recorder.fetch_rates()
+                print(f"{recorder.client_name}: курсов {len(rates)}")
+            except Exception as e:
+                print(f"{recorder.client_name}: {e}")
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк обновления курсов на фикстурах") # noqa: E501
+    parser.add_argument("--fixtures", type=Path, default=None,
+                        help="Каталог фикстур (по умолчанию — синтетические)")
+    parser.add_argument("--record", type=Path, default=None,
+                        help="Записать ответы настоящих API в каталог и выйти")
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--sample-interval", type=float, default=60.0)
+    parser.add_argument("--refreshes", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.record is not None:
+        record(args.record, args.samples, args.sample_interval)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        fixtures = args.fixtures
+        if fixtures is None:
+            fixtures = tmp / "fixtures"
+            write_synthetic_fixtures(fixtures, responses=10)
+        use_data_dir(tmp / "data")
+        (tmp / "data").mkdir()
+
+        clients = [
+            ReplayApiClient(
+                spec, fixtures,
+                latency=args.latency_ms / 1000,
+                jitter=args.jitter_ms / 1000,
+                error_rate=args.error_rate,
+                payload_scale=args.payload_scale,
+                seed=args.seed + i,
+            )
+            for i, spec in enumerate(make_specs())
+        ]
+
+        # Метки времени — по минуте на обновление, как у планировщика
+        clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        fetch_ms, save_ms, total_ms = [], [], []
+        ok = 0
+        started = time.perf_counter()
+        for n in range(args.refreshes):
+            updater = RatesUpdater(clients)
+            updater.timestamp = (clock + timedelta(minutes=n)).strftime("%Y-%m-%dT%H:%M:%SZ") # noqa: E501
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                updater.fetch_all()
+                t1 = time.perf_counter()
+                ok += updater._save()
+                t2 = time.perf_counter()
+            fetch_ms.append((t1 - t0) * 1000)
+            save_ms.append((t2 - t1) * 1000)
+            total_ms.append((t2 - t0) * 1000)
+        elapsed = time.perf_counter() - started
+
+        print(f"Фикстуры: {fixtures}; задержка {args.latency_ms:g}±{args.jitter_ms:g} мс, " # noqa: E501
+              f"ошибок {args.error_rate:.0%}, размер ×{args.payload_scale:g}")
+        print(f"Обновлений: {args.refreshes}, успешных {ok}; "
+              f"{args.refreshes / elapsed:.1f} обновлений/с")
+        print(f"{'этап':<8} {'p50, мс':>9} {'p95, мс':>9} {'max, мс':>9}")
+        for label, values in (("опрос", fetch_ms), ("запись", save_ms), ("всего", total_ms)): # noqa: E501
+            print(f"{label:<8} {statistics.median(values):9.2f} "
+                  f"{percentile(values, 0.95):9.2f} {max(values):9.2f}")
+        for client in clients:
+            adapter = client.adapter
+            print(f"{client.client_name}: ответов {adapter.served}, "
+                  f"503 {adapter.errors}, 304 {adapter.not_modified}")
+
+
+if __name__ == "__main__":
+    main()
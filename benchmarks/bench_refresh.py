@@ -0,0 +1,140 @@
+# benchmarks/bench_refresh.py
+
+"""
+Опрос API при обновлении курсов: последовательный (как раньше)
+против параллельного RatesUpdater.fetch_all с общим сроком
+и асинхронного AsyncRatesUpdater.
+Вместо внешних API — локальные HTTP-заглушки с искусственной задержкой.
+
+Запуск:
+    python -m benchmarks.bench_refresh
+    python -m benchmarks.bench_refresh --fiat-ms 400 --crypto-ms 700 --deadline 0.5
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from valutatrade_hub.parser_service.api_clients import (
+    CoinGeckoClient,
+    ExchangeRateApiClient,
+)
+from valutatrade_hub.parser_service.async_clients import (
+    AsyncBaseApiClient,
+    AsyncCoinGeckoClient,
+    AsyncExchangeRateApiClient,
+    aiohttp,
+)
+from valutatrade_hub.parser_service.config import config
+from valutatrade_hub.parser_service.updater import AsyncRatesUpdater, RatesUpdater
+
+
+def start_stub(payload: dict, delay: float) -> ThreadingHTTPServer:
+    """HTTP-заглушка на свободном порту: ждёт delay секунд и отдаёт payload"""
+    body = json.dumps(payload).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, как у настоящих API
+
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_clients(fiat_delay: float, crypto_delay: float):
+    fiat = start_stub({
+        "result": "success",
+        "conversion_rates": {
+            code: 1.0 + i / 10 for i, code in enumerate(config.FIAT_CURRENCIES)
+        },
+    }, fiat_delay)
+    crypto = start_stub({
+        config.CRYPTO_ID_MAP[code]: {config.BASE_CURRENCY.lower(): 100.0 + i}
+        for i, code in enumerate(config.CRYPTO_CURRENCIES)
+    }, crypto_delay)
+
+    # Клиенты настоящие, меняется только адрес (ключ API не нужен)
+    fiat_client = ExchangeRateApiClient.__new__(ExchangeRateApiClient)
+    fiat_client.url = f"http://127.0.0.1:{fiat.server_port}/latest"
+    crypto_client = CoinGeckoClient()
+    crypto_client.url = f"http://127.0.0.1:{crypto.server_port}/price"
+    return [fiat_client, crypto_client], [fiat, crypto]
+
+
+def make_async_clients(sync_clients) -> list:
+    """Асинхронные клиенты с теми же адресами, что у синхронных"""
+    fiat_client = AsyncExchangeRateApiClient.__new__(AsyncExchangeRateApiClient)
+    AsyncBaseApiClient.__init__(fiat_client)
+    fiat_client.spec = sync_clients[0]
+    crypto_client = AsyncCoinGeckoClient()
+    crypto_client.spec = sync_clients[1]
+    return [fiat_client, crypto_client]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк опроса API")
+    parser.add_argument("--fiat-ms", type=float, default=300)
+    parser.add_argument("--crypto-ms", type=float, default=500)
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Срок на опрос, с (по умолчанию REFRESH_DEADLINE)")
+    args = parser.parse_args()
+    deadline = args.deadline if args.deadline is not None else config.REFRESH_DEADLINE # noqa: E501
+
+    clients, servers = make_clients(args.fiat_ms / 1000, args.crypto_ms / 1000)
+    try:
+        start = time.perf_counter()
+        sequential = {}
+        for client in clients:
+            sequential.update(client.fetch_rates())
+        seq_time = time.perf_counter() - start
+
+        updater = RatesUpdater(clients)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            updater.fetch_all(deadline)
+        par_time = time.perf_counter() - start
+        received = {pair: info["rate"] for pair, info in updater.pairs.items()}
+
+        async_updater = AsyncRatesUpdater(make_async_clients(clients))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            async_updater.fetch_all(deadline)
+        async_time = time.perf_counter() - start
+        async_received = {
+            pair: info["rate"] for pair, info in async_updater.pairs.items()
+        }
+
+        print(f"Задержки: fiat {args.fiat_ms:g} мс, crypto {args.crypto_ms:g} мс; " # noqa: E501
+              f"срок {deadline:g} с")
+        print(f"Последовательно: {seq_time * 1000:8.1f} мс, пар {len(sequential)}")
+        print(f"Параллельно:     {par_time * 1000:8.1f} мс, пар {len(received)}")
+        print(f"Асинхронно:      {async_time * 1000:8.1f} мс, пар {len(async_received)} " # noqa: E501
+              f"(aiohttp: {'да' if aiohttp is not None else 'нет'})")
+        print(f"Не успели: {', '.join(updater.missed) or '—'}; "
+              f"асинхронно: {', '.join(async_updater.missed) or '—'}")
+        if not updater.missed:
+            assert received == sequential, "наборы курсов разошлись"
+        if not async_updater.missed:
+            assert async_received == sequential, "асинхронные курсы разошлись"
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_storage.py
+
+"""
+Сравнение задержки одной сделки (load_portfolio → изменение → save_portfolio)
+для бэкендов json, json с шардированными портфелями и sqlite
+при разном числе пользователей.
+
+Запуск:
+    python -m benchmarks.bench_storage
+    python -m benchmarks.bench_storage --users 10000,100000 --trades 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def generate_data(data_dir: str, n_users: int) -> None:
+    """Сгенерировать users.json и portfolios.json на n_users пользователей"""
+    now = datetime.now().isoformat()
+    users = [
+        {
+            "user_id": i,
+            "username": f"user{i}",
+            "hashed_password": "0" * 64,
+            "salt": "salt",
+            "registration_date": now,
+        }
+        for i in range(1, n_users + 1)
+    ]
+    portfolios = [
+        {
+            "user_id": i,
+            "wallets": {
+                "USD": {"currency_code": "USD", "balance": 1000.0},
+                "BTC": {"currency_code": "BTC", "balance": 0.01},
+            },
+        }
+        for i in range(1, n_users + 1)
+    ]
+    with open(os.path.join(data_dir, "users.json"), "w", encoding="utf-8") as f:
+        json.dump(users, f)
+    with open(os.path.join(data_dir, "portfolios.json"), "w", encoding="utf-8") as f:
+        json.dump(portfolios, f)
+
+
+# Конфигурации: подпись → (storage_backend, portfolio_layout)
+CONFIGS = {
+    "json": ("json", "single"),
+    "sharded": ("json", "sharded"),
+    "sqlite": ("sqlite", "single"),
+}
+
+
+def make_db(data_dir: str, name: str) -> DatabaseManager:
+    """DatabaseManager, направленный во временную директорию"""
+    backend, layout = CONFIGS[name]
+    settings = SettingsLoader()
+    settings._settings["data_dir"] = data_dir
+    settings._settings["storage_backend"] = backend
+    settings._settings["portfolio_layout"] = layout
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DatabaseManager()
+
+
+def bench_trades(db: DatabaseManager, n_users: int, n_trades: int) -> list:
+    """Выполнить n_trades сделок, вернуть задержки в миллисекундах"""
+    latencies = []
+    step = max(n_users // n_trades, 1)
+    for k in range(n_trades):
+        user_id = 1 + (k * step) % n_users
+        start = time.perf_counter()
+        # Модели печатают отладку на каждый кошелёк — глушим вывод
+        with contextlib.redirect_stdout(io.StringIO()):
+            portfolio = db.load_portfolio(user_id)
+            portfolio.get_wallet("USD").withdraw(1.0)
+            db.save_portfolio(portfolio)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк бэкендов хранения")
+    parser.add_argument("--users", default="10000,100000,1000000",
+                        help="Размеры базы через запятую")
+    parser.add_argument("--trades", type=int, default=20,
+                        help="Число сделок на sqlite и sharded")
+    parser.add_argument("--json-trades", type=int, default=3,
+                        help="Число сделок на json (каждая перечитывает всю базу)")
+    args = parser.parse_args()
+
+    print(f"{'users':>10} {'backend':>8} {'trades':>7} {'p50, ms':>10} {'max, ms':>10}")
+    for n_users in (int(x) for x in args.users.split(",")):
+        for name in CONFIGS:
+            n_trades = args.json_trades if name == "json" else args.trades
+            with tempfile.TemporaryDirectory() as tmp:
+                generate_data(tmp, n_users)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    db = make_db(tmp, name)  # sqlite/sharded: здесь же миграция
+                latencies = bench_trades(db, n_users, n_trades)
+                print(f"{n_users:>10} {name:>8} {n_trades:>7} "
+                      f"{statistics.median(latencies):>10.2f} {max(latencies):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
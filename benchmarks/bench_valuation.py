@@ -0,0 +1,113 @@
+# benchmarks/bench_valuation.py
+
+"""
+Оценка портфеля: прежний путь (get_exchange_rate на каждый кошелёк)
+против пакетной оценки value_portfolio / value_portfolios
+для портфелей из 5, 50 и 500 кошельков.
+
+Запуск:
+    python -m benchmarks.bench_valuation
+    python -m benchmarks.bench_valuation --wallets 5,50,500 --portfolios 1000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from valutatrade_hub.core import rate_matrix
+from valutatrade_hub.core.exceptions import CurrencyNotFoundError
+from valutatrade_hub.core.models import Portfolio
+from valutatrade_hub.core.usecases import (
+    get_exchange_rate,
+    value_portfolio,
+    value_portfolios,
+)
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def write_rates(data_dir: str, n_codes: int) -> list:
+    """rates.json с n_codes валютами C0000…; возвращает список кодов"""
+    codes = [f"C{i:04d}" for i in range(n_codes)]
+    pairs = {
+        f"{code}_USD": {"rate": 1.0 + i / 7, "updated_at": "", "source": "bench"}
+        for i, code in enumerate(codes)
+    }
+    with open(os.path.join(data_dir, "rates.json"), "w", encoding="utf-8") as f:
+        json.dump({"pairs": pairs, "last_updated": "2099-01-01T00:00:00"}, f)
+    return ["USD"] + codes
+
+
+def make_portfolio(user_id: int, codes: list) -> Portfolio:
+    return Portfolio.from_storage({
+        "user_id": user_id,
+        "wallets": {
+            code: {"currency_code": code, "balance": 1.0 + k}
+            for k, code in enumerate(codes)
+        },
+    })
+
+
+def legacy_total(portfolio: Portfolio, base: str) -> float:
+    # Прежний Portfolio.get_total_value: курс на каждый кошелёк
+    total = 0.0
+    for code, balance in portfolio.get_balances().items():
+        try:
+            total += balance * get_exchange_rate(code, base)
+        except CurrencyNotFoundError:
+            continue
+    return total
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк оценки портфелей")
+    parser.add_argument("--wallets", default="5,50,500",
+                        help="Размеры портфеля через запятую")
+    parser.add_argument("--portfolios", type=int, default=200,
+                        help="Число портфелей для value_portfolios")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--base", default="EUR")
+    args = parser.parse_args()
+    sizes = [int(x) for x in args.wallets.split(",")]
+
+    print(f"NumPy: {'да' if rate_matrix.np is not None else 'нет'}")
+    print(f"{'wallets':>8} {'per-wallet, ms':>15} {'batch, ms':>10} "
+          f"{'speedup':>8} {'list, ms/portf.':>16}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        codes = write_rates(tmp, max(sizes) + 1)
+        SettingsLoader()._settings["data_dir"] = tmp
+        for size in sizes:
+            wallet_codes = codes[:size - 1] + [args.base]
+            portfolio = make_portfolio(1, wallet_codes)
+            portfolios = [
+                make_portfolio(i, wallet_codes) for i in range(args.portfolios)
+            ]
+            # DatabaseManager печатает пути при каждом создании — глушим вывод
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = legacy_total(portfolio, args.base)
+                got = value_portfolio(portfolio, args.base)["total"]
+                legacy = best_of(args.repeat, lambda: legacy_total(portfolio, args.base)) # noqa: E501
+                batch = best_of(args.repeat, lambda: value_portfolio(portfolio, args.base)) # noqa: E501
+                many = best_of(args.repeat, lambda: value_portfolios(portfolios, args.base)) # noqa: E501
+            assert abs(expected - got) <= 1e-9 * abs(expected), "итоги разошлись"
+
+            print(f"{size:>8} {legacy * 1000:>15.3f} {batch * 1000:>10.3f} "
+                  f"{legacy / batch:>7.1f}x "
+                  f"{many * 1000 / args.portfolios:>16.4f}")
+
+
+if __name__ == "__main__":
+    main()
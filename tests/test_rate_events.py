@@ -0,0 +1,73 @@
+# tests/test_rate_events.py
+
+import contextlib
+import io
+
+import pytest
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from valutatrade_hub.infra.database import DatabaseManager
+    from valutatrade_hub.infra.rate_cache import rate_cache
+    from valutatrade_hub.infra.settings import SettingsLoader
+    from valutatrade_hub.parser_service import storage, updater
+    from valutatrade_hub.parser_service.timeseries import RateHistoryStore
+
+# Снимок, записанный RatesUpdater, доходит до кеша курсов через шину
+# rate_events: DatabaseManager().get_rates_snapshot() не читает rates.json
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """data_dir во временном каталоге — и для DatabaseManager, и для storage"""
+    monkeypatch.setitem(SettingsLoader()._settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(storage, "RATES_FILE_PATH", tmp_path / "rates.json")
+    monkeypatch.setattr(
+        storage, "_history_store", RateHistoryStore(tmp_path / "history")
+    )
+    monkeypatch.setattr(storage, "_rollup_store", None)
+    rate_cache.invalidate()
+    yield tmp_path
+    rate_cache.invalidate()
+
+
+def _database() -> DatabaseManager:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DatabaseManager()
+
+
+def _save(pairs, timestamp: str) -> bool:
+    rates_updater = updater.RatesUpdater(clients=[])
+    rates_updater.timestamp = timestamp
+    rates_updater.pairs = {
+        pair: {"rate": rate, "updated_at": timestamp, "source": "CoinGecko"}
+        for pair, rate in pairs.items()
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        return rates_updater._save()
+
+
+def test_publisher_and_cache_share_rates_path(data_dir):
+    db = _database()
+    assert db.rates_file == str(storage.RATES_FILE_PATH)
+
+
+def test_saved_snapshot_reaches_cache_without_disk_read(data_dir, monkeypatch):
+    # Кеш уже держит предыдущий снимок — как в процессе main.py,
+    # где планировщик и CLI работают вместе
+    assert _save({"BTC_USD": 60000.0, "EUR_USD": 1.08}, "2025-10-10T12:00:00Z")
+    _database().get_rates_snapshot()
+
+    assert _save({"BTC_USD": 61000.0, "EUR_USD": 1.08}, "2025-10-10T12:05:00Z")
+
+    def disk_read(*args, **kwargs):
+        raise AssertionError("rates.json прочитан с диска")
+
+    monkeypatch.setattr(DatabaseManager, "_read_rates_data", disk_read)
+    parses, published = rate_cache.parses, rate_cache.published
+
+    snapshot = _database().get_rates_snapshot()
+
+    assert rate_cache.parses == parses
+    assert rate_cache.published == published
+    assert snapshot.get_rate("BTC", "USD") == 61000.0
+    assert snapshot.last_updated.isoformat() == "2025-10-10T12:05:00+00:00"
@@ -22,7 +22,11 @@ from valutatrade_hub.core.usecases import (
     get_exchange_rate
 )
 '''
-from valutatrade_hub.core.exceptions import ApiRequestError, CurrencyNotFoundError
+from valutatrade_hub.core.exceptions import (
+    ApiRequestError,
+    CurrencyNotFoundError,
+    StaleRatesError,
+)
 from valutatrade_hub.infra.database import DatabaseManager
 
 # Попробуем импортировать компоненты парсера (если доступны)
@@ -97,6 +101,8 @@ def print_help():
   buy --currency <валюта> --amount <число>       — купить валюту
   sell --currency <валюта> --amount <число>      — продать валюту
   get-rate --from <валюта> --to <валюта>         — узнать курс
+           [--at <ISO-время> [--interpolate]]    — курс на момент времени
+  show-history --pair <ПАРА> [--interval 1h]     — свечи OHLC (1m, 1h, 1d)
   update-rates                                   — обновить курсы вручную
   start-scheduler                                — запустить автообновление
   exit                                           — выйти
@@ -271,16 +277,13 @@ def cmd_register(args):
         print("Пароль должен быть не короче 4 символов")
         return
 
-    # Загружаем пользователей
-    users = db.load_users_dict()
-
-    # Проверка уникальности
-    if any(user.username == username for user in users.values()):
+    # Проверка уникальности — по индексу username → user_id
+    if db.find_user_id(username) is not None:
         print(f"Имя пользователя '{username}' уже занято")
         return
 
     # Генерация ID и соли
-    user_id = max(users.keys(), default=0) + 1
+    user_id = db.next_user_id()
     salt = secrets.token_urlsafe(8)
 
     # Создаём пользователя (пароль хэшируется внутри)
@@ -348,16 +351,8 @@ def cmd_login(args):
         print("Ошибка: параметр --password обязателен.")
         return
 
-    # Загружаем пользователей
-    # users = load_users()
-    users = db.load_users_dict()
-
-    # Поиск по username
-    user = None
-    for u in users.values():
-        if u.username == username:
-            user = u
-            break
+    # Поиск по username через индекс
+    user = db.get_user_by_username(username)
 
     if not user:
         print(f"Пользователь '{username}' не найден")
@@ -545,9 +540,13 @@ def cmd_show_portfolio(args):
 
     # Эмодзи для популярных валют
     EMOJI = {"USD": "💵", "EUR": "💶", "BTC": "🪙", "ETH": "🔷", "RUB": "🇷🇺"}
-    total_value = 0.0
 
-    from valutatrade_hub.core.usecases import CurrencyNotFoundError, get_exchange_rate
+    from valutatrade_hub.core.usecases import value_portfolio
+
+    # Стоимость всех кошельков — одним проходом по курсам снимка
+    valuation = value_portfolio(portfolio, base_currency)
+    values = valuation["wallets"]
+    total_value = valuation["total"]
 
     if pretty:
         # ✅ Красивый режим
@@ -555,12 +554,9 @@ def cmd_show_portfolio(args):
         for wallet in wallets.values():
             code = wallet.currency_code
             emoji = EMOJI.get(code, "💰")
-            try:
-                rate = get_exchange_rate(code, base_currency)
-                value_in_base = wallet.balance * rate
-                total_value += value_in_base
-                print(f"{emoji} {code}: {value_in_base:,.2f}")
-            except CurrencyNotFoundError:
+            if code in values:
+                print(f"{emoji} {code}: {values[code]:,.2f}")
+            else:
                 print(f"{emoji} {code}: курс {base_currency} неизвестен")
         print("──────────────────────")
         print(f"🎯 ИТОГО: {total_value:,.2f} {base_currency}")
@@ -571,12 +567,9 @@ def cmd_show_portfolio(args):
 
         for wallet in wallets.values():
             code = wallet.currency_code
-            try:
-                rate = get_exchange_rate(code, base_currency)
-                value_in_base = wallet.balance * rate
-                total_value += value_in_base
-                print(f"- {code}: {wallet.balance:,.6f}  → {value_in_base:,.2f} {base_currency}") # noqa: E501
-            except CurrencyNotFoundError:
+            if code in values:
+                print(f"- {code}: {wallet.balance:,.6f}  → {values[code]:,.2f} {base_currency}") # noqa: E501
+            else:
                 print(f"- {code}: {wallet.balance:,.6f}  → курс {code}→{base_currency} неизвестен, пропущено") # noqa: E501
 
         print("-" * 40)
@@ -787,6 +780,8 @@ def cmd_buy(args):
         print(f"❌ Валюта '{e.code}' не поддерживается.")
     except InsufficientFundsError as e:
         print(f"❌ Недостаточно средств: доступно {e.available:.2f} USD, требуется {e.required:.2f} USD") # noqa: E501
+    except StaleRatesError as e:
+        print(f"⏳ {e}")
     except Exception as e:
         print(f"❌ Ошибка при покупке: {e}")
 
@@ -1022,6 +1017,8 @@ def cmd_sell(args):
         msg = f"🪙 Недостаточно: есть {e.available:.6f}, нужно {e.required:.6f}" \
                 if pretty  else f"❌ Недостаточно {currency}: доступно {e.available:.6f}, требуется {e.required:.6f}" # noqa: E501
         print(msg)
+    except StaleRatesError as e:
+        print(f"⏳ {e}")
     except Exception as e:
         print(f"❌ Ошибка при продаже: {e}")
 
@@ -1373,6 +1370,11 @@ def cmd_get_rate(args):
         from_curr = from_curr.strip().upper()
         to_curr = to_curr.strip().upper()
 
+        at = parsed.get("at")
+        if at:
+            _print_rate_at(from_curr, to_curr, at, "interpolate" in parsed)
+            return
+
         # Вся логика — в usecase
         rate = usecase_get_rate(from_curr, to_curr)
 
@@ -1404,7 +1406,8 @@ def cmd_get_rate(args):
 
     except ValueError as e:
         print(e)
-        print("Использование: get-rate --from <валюта> --to <валюта> [--pretty]")
+        print("Использование: get-rate --from <валюта> --to <валюта> [--pretty] "
+              "[--at <ISO-время> [--interpolate]]")
     except CurrencyNotFoundError as e:
         print(f"❌ Валюта '{e.code}' не поддерживается.")
     except ApiRequestError as e:
@@ -1412,6 +1415,75 @@ def cmd_get_rate(args):
     except Exception as e:
         print(f"❌ Ошибка: {e}")
 
+
+def _print_rate_at(from_curr: str, to_curr: str, at, interpolate: bool) -> None:
+    """Курс на момент времени из истории (get-rate --at)"""
+    if at is True:
+        raise ValueError("Параметр --at требует значение, например 2025-10-10T12:00:00Z") # noqa: E501
+    try:
+        from valutatrade_hub.parser_service.storage import get_rate_at
+    except ImportError as e:
+        print(f"❌ История курсов недоступна: {e}")
+        return
+    try:
+        found = get_rate_at(f"{from_curr}_{to_curr}", at, interpolate)
+    except ValueError as e:
+        raise ValueError(f"Некорректный запрос --at '{at}': {e}")
+    if found is None:
+        print(f"⚠️ В истории нет курса {from_curr}/{to_curr} на {at}")
+        return
+    rate, point_time = found
+    print(f"Курс {from_curr}/{to_curr} на {at}: {rate:.6f}")
+    if interpolate:
+        print("   (линейная интерполяция между соседними точками)")
+    else:
+        print(f"   (точка истории от {point_time})")
+
+
+def cmd_show_history(args):
+    """show-history --pair BTC_USD [--interval 1h] [--limit 24] — свечи OHLC"""
+    try:
+        parsed = parse_args(args)
+        pair = parsed.get("pair")
+        interval = parsed.get("interval", "1h")
+        limit = parsed.get("limit", "24")
+        if not pair or pair is True:
+            raise ValueError("Параметр --pair обязателен.")
+        try:
+            limit = int(limit)
+            if limit <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError("--limit должен быть положительным целым числом.")
+        pair = pair.strip().upper()
+
+        try:
+            from valutatrade_hub.parser_service.storage import (
+                ensure_rollups,
+                get_rollup_store,
+            )
+            from valutatrade_hub.parser_service.timeseries import from_epoch_ms
+        except ImportError as e:
+            print(f"❌ История курсов недоступна: {e}")
+            return
+
+        ensure_rollups(pair)
+        candles = get_rollup_store().read(pair, interval, limit=limit)
+        if not candles:
+            print(f"⚠️ В истории нет данных по паре {pair}")
+            return
+
+        print(f"📈 {pair}, интервал {interval} (последние {len(candles)}):")
+        print(f"{'Начало':<21} {'Open':>14} {'High':>14} {'Low':>14} {'Close':>14}") # noqa: E501
+        for bucket, o, h, lo, c in candles:
+            print(f"{from_epoch_ms(bucket):<21} {o:>14.6f} {h:>14.6f} {lo:>14.6f} {c:>14.6f}") # noqa: E501
+
+    except ValueError as e:
+        print(e)
+        print("Использование: show-history --pair <ПАРА> [--interval 1m|1h|1d] [--limit N]") # noqa: E501
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+
 '''
 def cmd_get_rate(args):
     try:
@@ -1634,139 +1706,37 @@ def create_show_rates_parser(subparsers) -> None:
     sort_group = parser.add_argument_group("сортировка")
     sort_group.add_argument("--top", "-n", type=int, help="Показать топ-N самых дорогих активов по отношению к базе") # noqa: E501
 
-'''
-def cmd_show_rates(args: argparse.Namespace) -> None:
-    """Обработчик команды show-rates"""
-    if not PARSER_AVAILABLE and not os.path.exists("data/rates.json"):
-        print("❌ Локальный кеш курсов пуст. Выполните 'update-rates', 
-            чтобы загрузить данные.") # noqa: E501
-        return
-
-    # Определяем путь к файлу
-    rates_file = config.RATES_FILE_PATH if PARSER_AVAILABLE else RATES_FILE_PATH
-
-    if not os.path.exists(rates_file):
-        print("❌ Локальный кеш курсов пуст. Выполните 'update-rates', 
-            чтобы загрузить данные.") # noqa: E501
-        return
-
-    # Читаем кеш
-    try:
-        with open(rates_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, Exception):
-        print("❌ Ошибка чтения файла кеша. Файл повреждён.")
-        return
-
-    pairs = data.get("pairs", {})
-    last_refresh = data.get("last_refresh", "неизвестно")
-
-    if not pairs:
-        print("❌ Локальный кеш курсов пуст. Выполните 'update-rates', 
-            чтобы загрузить данные.") # noqa: E501
-        return
-
-    # Фильтрация по валюте: ищем пары, где валюта в начале (например, BTC_USD)
-    filtered_pairs = {}
-    currency = args.currency
-    base = args.base
-
-    for pair, info in pairs.items():
-        from_cur, to_cur = pair.split("_", 1) if "_" in pair else (pair, "")
-
-        # Фильтр: --currency BTC → ищем пары, начинающиеся с BTC
-        if currency and not from_cur == currency:
-            continue
-
-        # Фильтр: --base EUR → конвертируем только те, что в USD, если нужно
-        if to_cur != base:
-            # Пока просто пропускаем — у нас курсы только к USD
-            # (в будущем можно добавить кросс-курсы)
-            continue
-
-        filtered_pairs[pair] = info
-
-    # Если есть --top: сортируем по rate и берём топ-N
-    if args.top is not None:
-        sorted_pairs = sorted(
-            filtered_pairs.items(),
-            key=lambda x: x[1]["rate"],
-            reverse=True
-        )[:args.top]
-        filtered_pairs = dict(sorted_pairs)
-
-    # Если после фильтрации нет данных
-    if not filtered_pairs:
-        if currency:
-            print(f"❌ Курс для '{currency}' не найден в кеше.")
-        else:
-            print("❌ По заданным фильтрам ничего не найдено.")
-        return
-
-    # Вывод
-    print(f"Rates from cache (updated at {last_refresh}):")
-    for pair, info in filtered_pairs.items():
-        rate = info["rate"]
-        print(f"- {pair}: {rate:,.6f}".rstrip("0").rstrip("."))
-'''
 
 def cmd_show_rates(args: argparse.Namespace) -> None:
     """Обработчик команды show-rates — с поддержкой офлайн-режима 
     и безопасным доступом к данным"""
     
-    # Отложенная загрузка config — чтобы не падать, если parser_service недоступен
-    try:
-        from valutatrade_hub.parser_service.config import config
-        rates_file = config.RATES_FILE_PATH
-    except (ImportError, AttributeError):
-        # fallback: используем локальный путь
-        import os
-        rates_file = os.path.join("data", "rates.json")
-
-    # Проверяем, существует ли файл
-    if not os.path.exists(rates_file):
+    # Снимок из общего кеша курсов: rates.json разбирается один раз
+    # на снимок, матрица кросс-курсов строится тоже один раз.
+    # db.rates_file — тот же файл, что пишет update-rates (config.RATES_FILE_PATH)
+    db = DatabaseManager()
+    if not os.path.exists(db.rates_file):
         print("❌ Локальный кеш курсов не найден. Выполните 'update-rates', чтобы загрузить данные.") # noqa: E501
         return
+    snapshot = db.get_rates_snapshot()
 
-    # Читаем кеш
-    try:
-        with open(rates_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError:
-        print("❌ Ошибка: файл rates.json повреждён или пуст.")
-        return
-    except Exception as e:
-        print(f"❌ Ошибка при чтении файла: {e}")
-        return
-
-    pairs = data.get("pairs", {})
-    last_refresh = data.get("last_refresh", "неизвестно")
-
-    if not pairs:
+    if not snapshot.pairs:
         print("❌ Кеш курсов пуст. Выполните 'update-rates', чтобы загрузить данные.")
         return
 
-    # Фильтрация
-    filtered_pairs = {}
-
-    for pair, info in pairs.items():
-        if "rate" not in info:
-            continue
-
-        # Разбиваем пару: например, BTC_USD
-        if "_" not in pair:
-            continue
-        from_cur, to_cur = pair.split("_", 1)
-
-        # Фильтр: --currency BTC → показываем только пары с этим активом
-        if args.currency and from_cur.upper() != args.currency.upper():
-            continue
-
-        # Фильтр: --base USD → показываем только курсы к этой валюте
-        if args.base and to_cur.upper() != args.base.upper():
-            continue
+    # Курсы к базе — из матрицы кросс-курсов снимка: любая валюта,
+    # связанная с --base цепочкой пар, а не только пары вида XXX_<base>
+    base = (args.base or "USD").upper()
+    codes = [args.currency.upper()] if args.currency else None
+    try:
+        table = snapshot.matrix.table(base, codes)
+    except CurrencyNotFoundError:
+        table = {}
 
-        filtered_pairs[pair] = info
+    filtered_pairs = {
+        f"{code}_{base}": {"rate": rate, **_quote_origin(snapshot, code, base)}
+        for code, rate in table.items()
+    }
 
     # Сортировка: --top N
     if args.top is not None:
@@ -1793,15 +1763,33 @@ def cmd_show_rates(args: argparse.Namespace) -> None:
         return
 
     # Вывод
+    if snapshot.last_updated is not None:
+        last_refresh = snapshot.last_updated.strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        last_refresh = "неизвестно"
     print(f"\n📊 Курсы из кеша (обновлено: {last_refresh})")
+    if snapshot.is_stale():
+        print("⚠️ Курсы устарели. Запустите: update-rates")
     print("-" * 50)
     for pair, info in filtered_pairs.items():
         rate = info["rate"]
         # Форматируем число: убираем лишние нули
         formatted_rate = f"{rate:,.10f}".rstrip("0").rstrip(".")
-        print(f"{pair:12} → {formatted_rate}")
+        print(f"{pair:12} → {formatted_rate:>20}  {info['updated_at']}  [{info['source']}]") # noqa: E501
     print()  # пустая строка для читаемости
 
+
+def _quote_origin(snapshot, code: str, base: str) -> dict:
+    """updated_at и source курса code→base: прямая пара, обратная или кросс-курс"""
+    for pair, suffix in ((f"{code}_{base}", ""), (f"{base}_{code}", ", обратный")):
+        info = snapshot.pairs.get(pair)
+        if isinstance(info, dict):
+            return {
+                "updated_at": info.get("updated_at", "—"),
+                "source": f"{info.get('source', '—')}{suffix}",
+            }
+    return {"updated_at": "—", "source": "кросс-курс"}
+
 def main():
     # CLI-интерфейс
     print("Добро пожаловать в ValutaTrade Hub!")
@@ -1834,6 +1822,8 @@ def main():
                 cmd_sell(args)
             elif cmd == "get-rate":
                 cmd_get_rate(args)
+            elif cmd == "show-history":
+                cmd_show_history(args)
             elif cmd == "update-rates":
                 if not PARSER_AVAILABLE:
                     print("❌ Нет API-ключа...")
@@ -31,6 +31,19 @@ class CurrencyNotFoundError(ValutaTradeError):
         super().__init__(message)
 
 
+class NoConversionPathError(CurrencyNotFoundError):
+    """
+    Исключение: обе валюты известны, но в снимке курсов нет
+    цепочки пар, связывающей их.
+    """
+    def __init__(self, from_code: str, to_code: str):
+        self.from_code = from_code
+        self.to_code = to_code
+        self.code = to_code
+        message = f"Нет пути конвертации {from_code} → {to_code}"
+        ValutaTradeError.__init__(self, message)
+
+
 class ApiRequestError(ValutaTradeError):
     """
     Исключение: ошибка при обращении к внешнему API.
@@ -52,6 +65,21 @@ class UserAlreadyExistsError(ValutaTradeError):
         message = f"Пользователь с именем '{username}' уже существует"
         super().__init__(message)
 
+
+class StaleRatesError(ValutaTradeError):
+    """
+    Исключение: курсы старше rates_ttl_seconds.
+    Выбрасывается при сделке, если включён refuse_stale_trades.
+    """
+    def __init__(self, age_seconds, ttl_seconds: float):
+        self.age_seconds = age_seconds
+        self.ttl_seconds = ttl_seconds
+        if age_seconds is None:
+            message = "Курсы без отметки времени. Запустите: update-rates"
+        else:
+            message = f"Курсы устарели: {age_seconds:,.0f} с при TTL {ttl_seconds} с. Запустите: update-rates" # noqa: E501
+        super().__init__(message)
+
 class ApiRequestError(Exception):
     """Исключение: при запросе к внешнему API (сетевые проблемы, 4xx/5xx)"""
     pass
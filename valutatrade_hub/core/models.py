@@ -2,7 +2,7 @@
 
 import hashlib
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 from valutatrade_hub.core.currencies import get_currency
 
@@ -299,6 +299,17 @@ class Wallet:
             initial_balance=data['balance']
         )
 
+    @classmethod
+    def from_storage(cls, currency_code: str, balance: float) -> 'Wallet':
+        """
+        Быстрый конструктор для данных из собственного хранилища:
+        без отладочного вывода и повторной валидации баланса.
+        """
+        wallet = cls.__new__(cls)  # Создаём экземпляр без вызова __init__
+        wallet._currency_code = currency_code
+        wallet._balance = float(balance)
+        return wallet
+
 
 # Импортируем Wallet, если он в другом файле
 # from wallet import Wallet  # Раскомментировать при использовании
@@ -317,7 +328,9 @@ class Portfolio:
     '''
     def __init__(self, user_id: int, wallets: Dict[str, 'Wallet'] = None):
         self._user_id = user_id
-        self._wallets: Dict[str, Wallet] = {}
+        # Код валюты → Wallet или «сырой» баланс (float), если кошелёк
+        # загружен из хранилища и к нему ещё не обращались
+        self._wallets: Dict[str, Union[Wallet, float]] = {}
 
         if wallets:
             for currency, wallet in wallets.items():
@@ -334,8 +347,17 @@ class Portfolio:
     @property
     def wallets(self) -> Dict[str, 'Wallet']:
         """Геттер: возвращает копию словаря кошельков (защита от внешнего изменения)"""
+        for code in self._wallets:
+            self._materialize(code)
         return self._wallets.copy()
 
+    def get_balances(self) -> Dict[str, float]:
+        """Балансы {код: баланс} без создания объектов Wallet"""
+        return {
+            code: wallet if isinstance(wallet, float) else wallet.balance
+            for code, wallet in self._wallets.items()
+        }
+
     # === Методы ===
     def add_currency(self, currency_code: str, initial_balance: float = 0.0) -> None:
         """Добавляет новый кошелёк в портфель, если валюта ещё не добавлена"""
@@ -353,7 +375,22 @@ class Portfolio:
 
     def get_wallet(self, currency_code: str) -> Optional['Wallet']:
         """Возвращает кошелёк по коду валюты или None, если не найден"""
-        return self._wallets.get(currency_code.strip().upper())
+        return self._materialize(currency_code.strip().upper())
+
+    def copy(self) -> 'Portfolio':
+        """Независимая копия портфеля: только балансы, без создания Wallet"""
+        portfolio = Portfolio.__new__(Portfolio)
+        portfolio._user_id = self._user_id
+        portfolio._wallets = self.get_balances()
+        return portfolio
+
+    def _materialize(self, currency_code: str) -> Optional['Wallet']:
+        """Создать Wallet из сырого баланса при первом обращении"""
+        wallet = self._wallets.get(currency_code)
+        if isinstance(wallet, float):
+            wallet = Wallet.from_storage(currency_code, wallet)
+            self._wallets[currency_code] = wallet
+        return wallet
 
     '''
     def get_total_value(self, base_currency: str = 'USD') -> float:
@@ -379,25 +416,14 @@ class Portfolio:
     def get_total_value(self, base_currency: str = 'USD') -> float:
         """
         Возвращает общую стоимость портфеля в указанной базовой валюте.
-        Использует get_exchange_rate из usecases.
+        Курсы всех кошельков берутся одним проходом (value_portfolio).
         """
-        from valutatrade_hub.core.usecases import (
-            CurrencyNotFoundError,
-            get_exchange_rate,
-        )
-
-        base_currency = base_currency.strip().upper()
+        from valutatrade_hub.core.usecases import value_portfolio
 
-        total = 0.0
-        for wallet in self._wallets.values():
-            try:
-                rate = get_exchange_rate(wallet.currency_code, base_currency)
-                value = wallet.balance * rate
-                total += value
-            except CurrencyNotFoundError:
-                print(f"⚠️  Курс для {wallet.currency_code} не найден, пропускаем.")
-                continue
-        return total
+        valuation = value_portfolio(self, base_currency)
+        for currency_code in valuation["missing"]:
+            print(f"⚠️  Курс для {currency_code} не найден, пропускаем.")
+        return valuation["total"]
 
     # === Операции с портфелем ===
     def buy_currency(self, currency_code: str, amount: float, price_in_usd: float) -> None: # noqa: E501
@@ -463,7 +489,10 @@ class Portfolio:
         """Подготовка к сохранению в JSON"""
         return {
             "user_id": self._user_id,
-            "wallets": {code: wallet.to_dict() for code, wallet in self._wallets.items()} # noqa: E501
+            "wallets": {
+                code: {"currency_code": code, "balance": float(balance)}
+                for code, balance in self.get_balances().items()
+            }
         }
 
     @classmethod
@@ -474,6 +503,20 @@ class Portfolio:
             wallets[code] = Wallet.from_dict(wallet_data)
         return cls(user_id=data['user_id'], wallets=wallets)
 
+    @classmethod
+    def from_storage(cls, data: Dict) -> 'Portfolio':
+        """
+        Ленивый портфель из собственного хранилища (формат to_dict):
+        балансы остаются числами, Wallet создаётся в get_wallet.
+        """
+        portfolio = cls.__new__(cls)
+        portfolio._user_id = data['user_id']
+        portfolio._wallets = {
+            code.upper(): float(wallet_data['balance'])
+            for code, wallet_data in data['wallets'].items()
+        }
+        return portfolio
+
     def __repr__(self):
-        wallets_str = ", ".join(f"{code}: {wallet.balance}" for code, wallet in self.wallets.items()) # noqa: E501
+        wallets_str = ", ".join(f"{code}: {balance}" for code, balance in self.get_balances().items()) # noqa: E501
         return f"Portfolio(user_id={self.user_id}, wallets={{{wallets_str}}})"
\ No newline at end of file
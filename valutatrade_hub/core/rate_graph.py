@@ -0,0 +1,206 @@
+# valutatrade_hub/core/rate_graph.py
+
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from valutatrade_hub.core.exceptions import (
+    CurrencyNotFoundError,
+    NoConversionPathError,
+)
+
+# Граф конвертации по всем парам снимка rates.json.
+# Пара A_B с курсом r (1 A = r B) даёт ребро A→B весом -log r
+# и обратное ребро B→A весом +log r. Лучший путь — кратчайший по сумме
+# весов, то есть с наибольшим произведением курсов; он ищется
+# Беллманом — Фордом из каждой валюты (O(V·E) на источник — валют
+# в снимке десятки, пути считаются один раз на снимок).
+# Обходный путь заменяет найденный, только если выгоднее больше чем
+# на TOLERANCE: шум округления котировок не подменяет прямую пару
+# цепочкой, прямые котировки берутся ровно такими, как в файле.
+# Курс храним не логарифмом, а произведением курсов по пути.
+# Если релаксация не сходится за V раундов — в графе отрицательный
+# цикл (котировки расходятся больше допуска, «арбитраж»): лучшего
+# пути нет, пары цикла перечисляются в inconsistent, а для этого
+# источника пути берутся с наименьшим числом пар, среди них — лучший
+# по весу. Прямая пара при этом всегда остаётся прямой.
+
+# Допуск на расхождение котировок по циклу (|log| расхождения, ~0.1%)
+TOLERANCE = 1e-3
+
+
+def parse_pair(pair: str) -> Optional[Tuple[str, str]]:
+    """'BTC_USD' → ('BTC', 'USD'); None для некорректного ключа"""
+    if "_" not in pair:
+        return None
+    from_code, to_code = pair.split("_", 1)
+    if not from_code or not to_code or from_code == to_code:
+        return None
+    return from_code.upper(), to_code.upper()
+
+
+class RateGraph:
+    """Лучшие пути конвертации между всеми валютами снимка"""
+
+    def __init__(self, pairs: Dict[str, float], anchor: str = "USD"):
+        """
+        :param pairs: {"BTC_USD": 59337.21, "EUR_GBP": 0.85, ...}
+        :param anchor: корень первой компоненты связности (имя компоненты)
+        """
+        # Рёбра: (сосед, курс 1 узел = ? соседа, вес -log курса, ключ пары)
+        self._edges: Dict[str, List[Tuple[str, float, float, str]]] = {}
+        for pair, rate in pairs.items():
+            codes = parse_pair(pair)
+            if codes is None or not rate or rate <= 0:
+                continue
+            from_code, to_code = codes
+            weight = -math.log(rate)
+            self._edges.setdefault(from_code, []).append(
+                (to_code, rate, weight, pair)
+            )
+            self._edges.setdefault(to_code, []).append(
+                (from_code, 1.0 / rate, -weight, pair)
+            )
+
+        self.component: Dict[str, str] = {}
+        # Для каждой валюты-источника: курс до каждой валюты её компоненты
+        # и предыдущая валюта на лучшем пути
+        self._rates: Dict[str, Dict[str, float]] = {}
+        self._prev: Dict[str, Dict[str, Optional[str]]] = {}
+        self._cycles: Dict[str, float] = {}
+
+        roots = sorted(self._edges)
+        if anchor in self._edges:
+            roots.remove(anchor)
+            roots.insert(0, anchor)
+        for root in roots:
+            if root not in self.component:
+                self._mark_component(root)
+        for code in self.component:
+            self._shortest(code)
+        self.inconsistent: List[Tuple[str, float]] = sorted(self._cycles.items())
+
+    # === Публичные методы ===
+    @property
+    def codes(self) -> List[str]:
+        return sorted(self.component)
+
+    def connected(self, from_code: str, to_code: str) -> bool:
+        root = self.component.get(from_code)
+        return root is not None and root == self.component.get(to_code)
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        """1 from_code = ? to_code по лучшему пути"""
+        self._check(from_code, to_code)
+        return self._rates[from_code][to_code]
+
+    def path(self, from_code: str, to_code: str) -> List[str]:
+        """Цепочка валют, по которой идёт конвертация"""
+        self._check(from_code, to_code)
+        prev = self._prev[from_code]
+        chain = [to_code]
+        while prev[chain[-1]] is not None:
+            chain.append(prev[chain[-1]])
+        return chain[::-1]
+
+    def anchored(self, base: str = "USD") -> Dict[str, float]:
+        """Курсы к base всех валют, с которыми она связана (сама base = 1.0)"""
+        if base not in self.component:
+            return {base: 1.0}
+        root = self.component[base]
+        return {
+            code: self.rate(code, base)
+            for code, code_root in self.component.items() if code_root == root
+        }
+
+    # === Вспомогательные ===
+    def _mark_component(self, root: str) -> None:
+        """Обход в ширину: все валюты, связанные с root"""
+        self.component[root] = root
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            for neighbor, _, _, _ in self._edges[node]:
+                if neighbor not in self.component:
+                    self.component[neighbor] = root
+                    queue.append(neighbor)
+
+    def _shortest(self, source: str) -> None:
+        """Беллман — Форд из source; при отрицательном цикле — пути по слоям"""
+        size = sum(1 for root in self.component.values() if root == self.component[source]) # noqa: E501
+        dist = {source: 0.0}
+        rates = {source: 1.0}
+        prev: Dict[str, Optional[Tuple[str, str, float]]] = {source: None}
+        for _ in range(size):
+            last = None
+            for node in list(dist):
+                for neighbor, rate, weight, pair in self._edges[node]:
+                    via = dist[node] + weight
+                    if neighbor not in dist or via < dist[neighbor] - TOLERANCE:
+                        dist[neighbor] = via
+                        rates[neighbor] = rates[node] * rate
+                        prev[neighbor] = (node, pair, weight)
+                        last = neighbor
+            if last is None:
+                break
+        else:
+            # За size раундов не сошлось — отрицательный цикл
+            self._record_cycle(last, prev)
+            rates, prev = self._layered(source)
+
+        self._rates[source] = rates
+        self._prev[source] = {
+            code: step[0] if step else None for code, step in prev.items()
+        }
+
+    def _layered(self, source: str) -> Tuple[Dict[str, float], dict]:
+        """
+        Пути с наименьшим числом пар, среди них — лучший по весу.
+        Длина пути растёт на каждом слое, поэтому цикл не мешает.
+        """
+        dist = {source: 0.0}
+        rates = {source: 1.0}
+        prev: Dict[str, Optional[Tuple[str, str, float]]] = {source: None}
+        frontier = [source]
+        while frontier:
+            layer: Dict[str, Tuple[float, float, str, str, float]] = {}
+            for node in frontier:
+                for neighbor, rate, weight, pair in self._edges[node]:
+                    if neighbor in dist:
+                        continue
+                    via = dist[node] + weight
+                    if neighbor not in layer or via < layer[neighbor][0]:
+                        layer[neighbor] = (via, rates[node] * rate, node, pair, weight)
+            for code, (via, rate, node, pair, weight) in layer.items():
+                dist[code] = via
+                rates[code] = rate
+                prev[code] = (node, pair, weight)
+            frontier = list(layer)
+        return rates, prev
+
+    def _record_cycle(self, code: str, prev) -> None:
+        """Найти отрицательный цикл по цепочке prev и запомнить его пары"""
+        # Отступаем по цепочке, пока гарантированно не окажемся в цикле
+        for _ in range(len(prev)):
+            step = prev[code]
+            if step is None:
+                return
+            code = step[0]
+        cycle, weight, node = [], 0.0, code
+        while True:
+            node, pair, edge_weight = prev[node]
+            cycle.append(pair)
+            weight += edge_weight
+            if node == code:
+                break
+        # Выигрыш по циклу: log произведения курсов по кругу
+        for pair in cycle:
+            if abs(self._cycles.get(pair, 0.0)) < -weight:
+                self._cycles[pair] = -weight
+
+    def _check(self, from_code: str, to_code: str) -> None:
+        for code in (from_code, to_code):
+            if code not in self.component:
+                raise CurrencyNotFoundError(code)
+        if not self.connected(from_code, to_code):
+            raise NoConversionPathError(from_code, to_code)
@@ -0,0 +1,167 @@
+# valutatrade_hub/core/rate_matrix.py
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from valutatrade_hub.core.exceptions import (
+    CurrencyNotFoundError,
+    NoConversionPathError,
+)
+from valutatrade_hub.core.rate_graph import RateGraph
+
+# Матрица кросс-курсов одного снимка: matrix[i][j] — сколько единиц
+# валюты j стоит 1 единица валюты i. Строится один раз на снимок
+# (см. RateSnapshot.matrix), дальше любой курс — это обращение по индексу.
+# С NumPy матрица — ndarray, векторные запросы идут одной операцией;
+# без NumPy — списки списков с тем же интерфейсом.
+
+
+class RateMatrix:
+    """Все курсы валюта→валюта для одного снимка rates.json"""
+
+    def __init__(
+        self, rates: Dict[str, float], components: Optional[Dict[str, str]] = None
+    ):
+        """
+        :param rates: курсы к USD, как из load_rates():
+                      {"USD": 1.0, "EUR": 1.0786, "BTC": 59337.21}
+        :param components: код → компонента связности графа пар; курсы
+                           между разными компонентами не определены
+        """
+        codes = sorted(rates)
+        values = [float(rates[code]) for code in codes]
+        if np is not None:
+            vector = np.array(values, dtype=float)
+            matrix = np.outer(vector, 1.0 / vector)
+        else:
+            matrix = [[a / b for b in values] for a in values]
+        self._setup(codes, matrix, components)
+
+    @classmethod
+    def from_graph(cls, graph: RateGraph) -> "RateMatrix":
+        """
+        Матрица по лучшим путям графа конвертации. Курсы по путям не
+        сводятся к курсам к одной валюте (прямая пара важнее цепочки),
+        поэтому матрица заполняется целиком; между компонентами — nan.
+        """
+        codes = graph.codes
+        rows = [
+            [
+                graph.rate(a, b) if graph.connected(a, b) else float("nan")
+                for b in codes
+            ]
+            for a in codes
+        ]
+        matrix = cls.__new__(cls)
+        matrix._setup(
+            codes, np.array(rows, dtype=float) if np is not None else rows,
+            graph.component,
+        )
+        return matrix
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index
+
+    def connected(self, from_code: str, to_code: str) -> bool:
+        """Есть ли путь конвертации from_code → to_code"""
+        if from_code not in self.index or to_code not in self.index:
+            return False
+        if self._components is None:
+            return True
+        return self._components[from_code] == self._components[to_code]
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        """1 from_code = ? to_code"""
+        row, column = self._idx(from_code), self._idx(to_code)
+        self._check_path(from_code, to_code)
+        return float(self._matrix[row][column])
+
+    def rates_to(self, codes: Iterable[str], base: str) -> List[float]:
+        """Курсы нескольких валют к base одним запросом (столбец матрицы)"""
+        column = self._column(codes, base)
+        return column.tolist() if np is not None else column
+
+    def convert(self, amounts: Dict[str, float], base: str) -> Dict[str, float]:
+        """Суммы в разных валютах → суммы в base"""
+        values, _ = self.valuate([amounts], base)[0]
+        return values
+
+    def valuate(
+        self, holdings: List[Dict[str, float]], base: str
+    ) -> List[Tuple[Dict[str, float], float]]:
+        """
+        Оценка нескольких наборов сумм {код: сумма} в base.
+        Все суммы раскладываются в один вектор: курсы берутся одной
+        выборкой из столбца base, итоги считаются одним bincount.
+        :return: [(стоимость по кодам, итог), ...] в порядке holdings
+        """
+        codes = [code for amounts in holdings for code in amounts]
+        if np is None:
+            rates = iter(self._column(codes, base))
+            result = []
+            for amounts in holdings:
+                values = {code: amount * next(rates) for code, amount in amounts.items()} # noqa: E501
+                result.append((values, sum(values.values())))
+            return result
+
+        sizes = [len(amounts) for amounts in holdings]
+        balances = np.fromiter(
+            (amount for amounts in holdings for amount in amounts.values()),
+            dtype=float, count=len(codes),
+        )
+        values = balances * self._column(codes, base)
+        totals = np.bincount(
+            np.repeat(np.arange(len(holdings)), sizes),
+            weights=values, minlength=len(holdings),
+        )
+        flat = values.tolist()
+        result, pos = [], 0
+        for amounts, size, total in zip(holdings, sizes, totals.tolist()):
+            result.append((dict(zip(amounts, flat[pos:pos + size])), total))
+            pos += size
+        return result
+
+    def table(self, base: str, codes: Optional[Iterable[str]] = None) -> Dict[str, float]: # noqa: E501
+        """
+        {код: курс к base} для всех (или перечисленных) валют, кроме самой base.
+        Без списка codes берутся только валюты, связанные с base.
+        """
+        base = base.strip().upper()
+        if codes is None:
+            codes = [code for code in self.codes if self.connected(code, base)]
+        selected = [code for code in codes if code != base]
+        return dict(zip(selected, self.rates_to(selected, base)))
+
+    def _setup(self, codes: List[str], matrix, components: Optional[Dict[str, str]]) -> None: # noqa: E501
+        self.codes: List[str] = codes
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(codes)}
+        self._components = components
+        self._matrix = matrix
+
+    def _column(self, codes: Iterable[str], base: str):
+        column = self._idx(base)
+        rows = []
+        for code in codes:
+            rows.append(self._idx(code))
+            self._check_path(code, base)
+        if np is not None:
+            return self._matrix[rows, column]
+        return [self._matrix[row][column] for row in rows]
+
+    def _check_path(self, from_code: str, to_code: str) -> None:
+        if self._components is not None and \
+                self._components[from_code] != self._components[to_code]:
+            raise NoConversionPathError(from_code, to_code)
+
+    def _idx(self, code: str) -> int:
+        try:
+            return self.index[code]
+        except KeyError:
+            raise CurrencyNotFoundError(code)
@@ -3,11 +3,12 @@
 import os
 from datetime import datetime
 from hashlib import pbkdf2_hmac
-from typing import List
+from typing import Any, Dict, Iterable, List
 
 from valutatrade_hub.core.exceptions import (
     CurrencyNotFoundError,
     InsufficientFundsError,
+    StaleRatesError,
     UserAlreadyExistsError,
 )
 from valutatrade_hub.core.models import Portfolio, User
@@ -256,10 +257,9 @@ def register_user(username: str, password: str) -> User:
     :return: Объект User
     """
     db = DatabaseManager()
-    users: List[User] = db.load_users()
 
-    # Проверка: пользователь уже существует?
-    if any(u.username == username for u in users):
+    # Проверка: пользователь уже существует? (через индекс username → user_id)
+    if db.find_user_id(username) is not None:
         raise UserAlreadyExistsError(username)
 
     if len(password) < 4:
@@ -272,8 +272,8 @@ def register_user(username: str, password: str) -> User:
     # Хэширование пароля: PBKDF2 с 100_000 итераций
     pwd_hash = pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100_000)
 
-    # Генерация ID
-    user_id = max((u.user_id for u in users), default=0) + 1
+    # Генерация ID — монотонная последовательность
+    user_id = db.next_user_id()
 
     # Создаём пользователя
     # В models.User пароль хранится как hashed_password, соль — отдельно
@@ -301,15 +301,13 @@ def login(username: str, password: str) -> Optional[User]:
 @log_action("LOGIN", verbose=False)
 def login(username: str, password: str) -> User:
     db = DatabaseManager()
-    users = db.load_users()
+    user = db.get_user_by_username(username)
 
-    for user in users:
-        if user.username == username:
-            if user.verify_password(password):
-                return user
-            else:
-                raise AuthenticationError("Неверный пароль")
-    raise AuthenticationError("Пользователь не найден")
+    if user is None:
+        raise AuthenticationError("Пользователь не найден")
+    if not user.verify_password(password):
+        raise AuthenticationError("Неверный пароль")
+    return user
 
 '''
 def get_portfolio(user_id: int) -> Portfolio:
@@ -507,28 +505,90 @@ def get_exchange_rate(from_code: str, to_code: str) -> float:
 '''
 
 def get_exchange_rate(from_code: str, to_code: str) -> float:
-    print(f"🔍 get_exchange_rate: ищем курс {from_code} → {to_code}")
-    db = DatabaseManager()
-    rates = db.load_rates()
-    print(f"📊 Доступные курсы: {list(rates.keys())}")
-    print("🔍 DEBUG: Доступные курсы в rates:", rates)
-    print(f"🔍 DEBUG: Ищем валюты: {from_code} и {to_code}")
+    """
+    Курс обмена: 1 from_code = ? to_code.
+    Курсы берутся из общего кеша: rates.json разбирается один раз
+    на снимок, матрица кросс-курсов строится тоже один раз.
+    """
+    snapshot = DatabaseManager().get_rates_snapshot()
 
     from_code = from_code.strip().upper()
     to_code = to_code.strip().upper()
 
-    if from_code not in rates:
-        raise CurrencyNotFoundError(from_code)
-    if to_code not in rates:
-        raise CurrencyNotFoundError(to_code)
+    # Матрица кросс-курсов снимка: CurrencyNotFoundError, если валюты нет
+    return snapshot.matrix.rate(from_code, to_code)
 
-    # Сначала вычисляем курс
-    rate = rates[from_code] / rates[to_code]
-    
-    # Потом уже выводим
-    print(f"✅ Вернули курс: {rate}")
 
-    return rate
+def _trade_rates(db: DatabaseManager) -> Dict[str, float]:
+    """Курсы для сделки; при refuse_stale_trades устаревшие не принимаются"""
+    snapshot = db.get_rates_snapshot()
+    if db.settings.get("refuse_stale_trades", False) and snapshot.is_stale():
+        raise StaleRatesError(snapshot.age_seconds(), snapshot.ttl_seconds)
+    return snapshot.rates
+
+
+def get_exchange_rates(
+    codes: Iterable[str], base: str = "USD", strict: bool = True
+) -> Dict[str, float]:
+    """
+    Курсы нескольких валют к base за один проход по матрице снимка.
+    :param strict: True — CurrencyNotFoundError на неизвестный код
+                   (или NoConversionPathError, если пути к base нет),
+                   False — такие коды пропускаются
+    """
+    matrix = DatabaseManager().get_rates_snapshot().matrix
+    base = base.strip().upper()
+    codes = [code.strip().upper() for code in codes]
+    if not strict:
+        codes = [code for code in codes if matrix.connected(code, base)]
+    return dict(zip(codes, matrix.rates_to(codes, base)))
+
+
+def value_portfolio(portfolio: Portfolio, base: str = "USD") -> Dict[str, Any]:
+    """
+    Оценка портфеля в base: {"user_id", "base", "wallets": {код: стоимость},
+    "total", "missing": [коды без курса]}
+    """
+    return value_portfolios([portfolio], base)[0]
+
+
+def value_portfolios(
+    portfolios: Iterable[Portfolio], base: str = "USD"
+) -> List[Dict[str, Any]]:
+    """
+    Оценка списка портфелей: снимок курсов берётся один раз,
+    стоимости всех кошельков считаются одним векторным проходом
+    по матрице кросс-курсов.
+    """
+    base = base.strip().upper()
+    matrix = DatabaseManager().get_rates_snapshot().matrix
+
+    balances = [(portfolio.user_id, portfolio.get_balances()) for portfolio in portfolios] # noqa: E501
+
+    # Коды без курса в оценку не попадают, а перечисляются в "missing"
+    if base in matrix:
+        known = [
+            {
+                code: amount for code, amount in wallets.items()
+                if matrix.connected(code, base)
+            }
+            for _, wallets in balances
+        ]
+        valued = matrix.valuate(known, base)
+    else:
+        valued = [({}, 0.0)] * len(balances)
+
+    results = []
+    for (user_id, wallets), (values, total) in zip(balances, valued):
+        results.append({
+            "user_id": user_id,
+            "base": base,
+            "wallets": values,
+            "total": total,
+            "missing": [code for code in wallets if code not in values],
+        })
+    return results
+
 
 '''
 def get_exchange_rate(from_curr: str, to_curr: str) -> float:
@@ -621,7 +681,7 @@ def buy(user_id: int, currency_code: str, amount: float) -> None:
     db = DatabaseManager()
     portfolio = db.load_portfolio(user_id)
 
-    rates = db.load_rates()
+    rates = _trade_rates(db)
     if currency_code not in rates:
         raise CurrencyNotFoundError(currency_code)
 
@@ -651,7 +711,11 @@ def buy(user_id: int, currency_code: str, amount: float) -> None:
     # Снимаем USD
     usd_wallet.withdraw(usd_cost)
 
-    db.save_portfolio(portfolio)
+    # С журналом сделок — дописываем две ноги вместо перезаписи портфеля
+    db.record_trade(portfolio, [
+        (currency_code, amount, rate),
+        ("USD", -usd_cost, 1.0),
+    ])
 
 '''
 @log_action("SELL", verbose=True)
@@ -687,7 +751,7 @@ def sell(user_id: int, currency_code: str, amount: float) -> float:
             code=currency_code
         )
 
-    rates = db.load_rates()
+    rates = _trade_rates(db)
     if currency_code not in rates:
         raise CurrencyNotFoundError(currency_code)
 
@@ -709,5 +773,8 @@ def sell(user_id: int, currency_code: str, amount: float) -> float:
         portfolio.add_currency("USD", initial_balance=0.0)
     portfolio.get_wallet("USD").deposit(revenue_usd)
 
-    db.save_portfolio(portfolio)
+    db.record_trade(portfolio, [
+        (currency_code, -amount, rate),
+        ("USD", revenue_usd, 1.0),
+    ])
     return revenue_usd
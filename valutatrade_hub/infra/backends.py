@@ -0,0 +1,94 @@
+# valutatrade_hub/infra/backends.py
+
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+from valutatrade_hub.core.models import Portfolio, User
+
+# Подключаемые бэкенды хранения пользователей и портфелей.
+# JSON-хранилище реализовано прямо в DatabaseManager (бэкенд "json"),
+# остальные бэкенды выбираются через ключ storage_backend в config.json.
+
+
+# --- Абстрактный базовый класс ---
+class BaseStorageBackend(ABC):
+    """Абстрактное хранилище пользователей и портфелей"""
+
+    @abstractmethod
+    def load_users(self) -> List[User]:
+        """Все пользователи списком"""
+        pass
+
+    @abstractmethod
+    def load_users_dict(self) -> Dict[int, User]:
+        """Все пользователи в виде словаря user_id → User"""
+        pass
+
+    @abstractmethod
+    def save_user(self, user: User) -> None:
+        """Создать или обновить одного пользователя"""
+        pass
+
+    def iter_users(self) -> Iterator[User]:
+        """Пользователи по одному. Бэкенды с курсорами переопределяют"""
+        yield from self.load_users()
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """Пользователь по user_id или None"""
+        for user in self.iter_users():
+            if user.user_id == user_id:
+                return user
+        return None
+
+    def find_user_id(self, username: str) -> Optional[int]:
+        """user_id по имени пользователя. Бэкенды с индексом переопределяют"""
+        for user in self.load_users():
+            if user.username == username:
+                return user.user_id
+        return None
+
+    def next_user_id(self) -> int:
+        """Следующий свободный user_id"""
+        return max(self.load_users_dict(), default=0) + 1
+
+    @abstractmethod
+    def load_portfolio(self, user_id: int) -> Optional[Portfolio]:
+        """Портфель пользователя или None, если его нет"""
+        pass
+
+    @abstractmethod
+    def load_portfolios(self) -> Dict[int, Portfolio]:
+        """Все портфели в виде словаря user_id → Portfolio"""
+        pass
+
+    def iter_portfolios(self) -> Iterator[Portfolio]:
+        """Портфели по одному. Бэкенды с курсорами переопределяют"""
+        yield from self.load_portfolios().values()
+
+    @abstractmethod
+    def save_portfolio(self, portfolio: Portfolio) -> None:
+        """Создать или обновить один портфель"""
+        pass
+
+
+def create_backend(name: str, data_dir: str, settings) -> Optional[BaseStorageBackend]:
+    """
+    Фабрика бэкендов по имени из настроек.
+    :param name: значение storage_backend ("json", "sqlite")
+    :return: экземпляр бэкенда или None для встроенного JSON-хранилища
+    :raises ValueError: если бэкенд неизвестен
+    """
+    name = (name or "json").strip().lower()
+
+    if name == "json":
+        return None
+
+    if name == "sqlite":
+        # Импорт здесь, чтобы JSON-режим не тянул sqlite3 без необходимости
+        from valutatrade_hub.infra.sqlite_backend import SqliteStorageBackend
+        return SqliteStorageBackend(
+            data_dir=data_dir,
+            db_name=settings.get("sqlite_file", "valutatrade.db"),
+        )
+
+    raise ValueError(f"Неизвестный storage_backend: '{name}'. Доступные: json, sqlite")
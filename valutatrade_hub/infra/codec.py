@@ -0,0 +1,325 @@
+# valutatrade_hub/infra/codec.py
+
+import codecs
+import json
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Кодеки файлов данных users.json / portfolios.json.
+# Формат определяется по первым байтам файла, поэтому старые JSON-файлы
+# читаются как раньше, а новые записи идут в формате из data_format:
+#   json    — как раньше (через orjson, если установлен)
+#   binary  — записи фиксированной структуры через struct
+#   msgpack — msgpack, если установлен
+#
+# Бинарный файл: MAGIC | версия (B) | вид (B) | число записей (I) | записи.
+# Каждая запись: длина (I) | тело — чтобы запись можно было пропустить,
+# не разбирая. Внутри тела числа упакованы struct, строки — одним блоком.
+
+MAGIC = b"VTH\x00"
+VERSION = 1
+
+KIND_USERS = ord("U")
+KIND_PORTFOLIOS = ord("P")
+KIND_MSGPACK = ord("M")
+
+FORMATS = ("json", "binary", "msgpack")
+
+_HEADER = struct.Struct("<4sBBI")
+_LEN = struct.Struct("<I")
+_USER_HEAD = struct.Struct("<q")
+_PORTFOLIO_HEAD = struct.Struct("<qH")
+
+
+class CodecError(ValueError):
+    """Файл данных повреждён или записан в неизвестном формате"""
+    pass
+
+
+def is_binary(raw: bytes) -> bool:
+    return raw[:4] == MAGIC
+
+
+# Строковые поля записи хранятся одним UTF-8 блоком через NUL:
+# один decode и один split на запись вместо разбора каждого поля
+_SEP = "\x00"
+
+
+def _join_fields(values: List[str]) -> bytes:
+    for value in values:
+        if _SEP in value:
+            raise ValueError(f"Недопустимый символ NUL в поле: {value!r}")
+    return _SEP.join(values).encode("utf-8")
+
+
+# === Пользователи ===
+_USER_FIELDS = ("username", "hashed_password", "salt", "registration_date")
+
+
+def _encode_user(item: Dict[str, Any]) -> bytes:
+    return _USER_HEAD.pack(item["user_id"]) + _join_fields(
+        [item[key] for key in _USER_FIELDS]
+    )
+
+
+def _decode_user(buf: bytes) -> Dict[str, Any]:
+    (user_id,) = _USER_HEAD.unpack_from(buf, 0)
+    username, hashed_password, salt, registration_date = (
+        buf[_USER_HEAD.size:].decode("utf-8").split(_SEP)
+    )
+    return {
+        "user_id": user_id,
+        "username": username,
+        "hashed_password": hashed_password,
+        "salt": salt,
+        "registration_date": registration_date,
+    }
+
+
+# === Портфели ===
+# user_id, число кошельков | балансы (n × double) | коды валют через NUL
+def _encode_portfolio(item: Dict[str, Any]) -> bytes:
+    wallets = item["wallets"]
+    codes = list(wallets)
+    balances = [float(wallets[code]["balance"]) for code in codes]
+    return (
+        _PORTFOLIO_HEAD.pack(item["user_id"], len(codes))
+        + struct.pack(f"<{len(codes)}d", *balances)
+        + _join_fields(codes)
+    )
+
+
+def _decode_portfolio(buf: bytes) -> Dict[str, Any]:
+    user_id, count = _PORTFOLIO_HEAD.unpack_from(buf, 0)
+    if not count:
+        return {"user_id": user_id, "wallets": {}}
+    pos = _PORTFOLIO_HEAD.size
+    balances = struct.unpack_from(f"<{count}d", buf, pos)
+    codes = buf[pos + 8 * count:].decode("utf-8").split(_SEP)
+    return {
+        "user_id": user_id,
+        "wallets": {
+            code: {"currency_code": code, "balance": balance}
+            for code, balance in zip(codes, balances)
+        },
+    }
+
+
+_RECORD_CODECS = {
+    KIND_USERS: (_encode_user, _decode_user),
+    KIND_PORTFOLIOS: (_encode_portfolio, _decode_portfolio),
+}
+
+
+# === Публичные функции ===
+def encode(records: List[Dict[str, Any]], kind: str, fmt: str = "json") -> bytes:
+    """
+    Сериализовать список словарей to_dict().
+    :param kind: "users" или "portfolios"
+    :param fmt: "json", "binary" или "msgpack"
+    """
+    if fmt == "json":
+        return dumps_json(records)
+
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ValueError("data_format='msgpack' требует установленного msgpack")
+        return _HEADER.pack(MAGIC, VERSION, KIND_MSGPACK, len(records)) + \
+            msgpack.packb(records, use_bin_type=True)
+
+    if fmt != "binary":
+        raise ValueError(f"Неизвестный data_format: '{fmt}'. Доступные: {', '.join(FORMATS)}") # noqa: E501
+
+    kind_code = _kind_code(kind)
+    encode_record = _RECORD_CODECS[kind_code][0]
+    out = [_HEADER.pack(MAGIC, VERSION, kind_code, len(records))]
+    for item in records:
+        body = encode_record(item)
+        out.append(_LEN.pack(len(body)))
+        out.append(body)
+    return b"".join(out)
+
+
+def decode(raw: bytes) -> List[Dict[str, Any]]:
+    """Разобрать содержимое файла, определив формат по заголовку"""
+    return list(iter_decode(raw))
+
+
+def iter_decode(raw: bytes) -> Iterator[Dict[str, Any]]:
+    """Записи файла по одной (для бинарного формата — без разбора всего файла)"""
+    if not is_binary(raw):
+        data = loads_json(raw) if raw.strip() else []
+        if not isinstance(data, list):
+            raise CodecError("Ожидался JSON-массив записей")
+        yield from data
+        return
+
+    if len(raw) < _HEADER.size:
+        raise CodecError("Обрезанный заголовок бинарного файла")
+    _, version, kind_code, count = _HEADER.unpack_from(raw, 0)
+    if version != VERSION:
+        raise CodecError(f"Неподдерживаемая версия формата: {version}")
+
+    if kind_code == KIND_MSGPACK:
+        if msgpack is None:
+            raise CodecError("Файл записан в msgpack, но msgpack не установлен")
+        yield from msgpack.unpackb(raw[_HEADER.size:], raw=False)
+        return
+
+    if kind_code not in _RECORD_CODECS:
+        raise CodecError(f"Неизвестный вид записей: {kind_code}")
+    decode_record = _RECORD_CODECS[kind_code][1]
+
+    pos = _HEADER.size
+    unpack_len = _LEN.unpack_from
+    try:
+        for _ in range(count):
+            (length,) = unpack_len(raw, pos)
+            pos += _LEN.size
+            if pos + length > len(raw):
+                raise CodecError("Обрезанная запись в бинарном файле")
+            yield decode_record(raw[pos:pos + length])
+            pos += length
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        if isinstance(e, CodecError):
+            raise
+        raise CodecError(f"Повреждённая запись: {e}") from e
+
+
+def dumps_json(data: Any) -> bytes:
+    """JSON с отступами, как раньше; через orjson, если он есть"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def loads_json(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Прочитать файл users/portfolios в любом поддерживаемом формате"""
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+# === Потоковое чтение ===
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_file_records(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]: # noqa: E501
+    """
+    Записи из открытого файла по одной, с постоянной памятью:
+    бинарный формат читается запись за записью, JSON-массив —
+    инкрементальным декодером по кускам chunk_size.
+    """
+    head = f.read(_HEADER.size)
+    if not is_binary(head):
+        yield from _iter_json_array(head, f, chunk_size)
+        return
+
+    if len(head) < _HEADER.size:
+        raise CodecError("Обрезанный заголовок бинарного файла")
+    _, version, kind_code, count = _HEADER.unpack(head)
+    if version != VERSION:
+        raise CodecError(f"Неподдерживаемая версия формата: {version}")
+
+    if kind_code == KIND_MSGPACK:
+        # msgpack пишется одним массивом — читаем целиком
+        yield from iter_decode(head + f.read())
+        return
+    if kind_code not in _RECORD_CODECS:
+        raise CodecError(f"Неизвестный вид записей: {kind_code}")
+    decode_record = _RECORD_CODECS[kind_code][1]
+
+    for _ in range(count):
+        prefix = f.read(_LEN.size)
+        if len(prefix) < _LEN.size:
+            raise CodecError("Обрезанная запись в бинарном файле")
+        (length,) = _LEN.unpack(prefix)
+        body = f.read(length)
+        if len(body) < length:
+            raise CodecError("Обрезанная запись в бинарном файле")
+        try:
+            yield decode_record(body)
+        except (struct.error, UnicodeDecodeError, ValueError) as e:
+            raise CodecError(f"Повреждённая запись: {e}") from e
+
+
+def _iter_json_array(
+    head: bytes, f: BinaryIO, chunk_size: int
+) -> Iterator[Dict[str, Any]]:
+    """Элементы JSON-массива верхнего уровня без загрузки файла целиком"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = text_decoder.decode(head)
+    pos = 0
+    eof = False
+    started = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            buf = buf[pos:] + text_decoder.decode(b"", final=True)
+        else:
+            buf = buf[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    while True:
+        # Пропускаем пробелы и запятые между элементами
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if fill():
+                continue
+            if not started:
+                return  # пустой файл — как пустой список
+            raise CodecError("Незакрытый JSON-массив")
+
+        if not started:
+            if buf[pos] != "[":
+                raise CodecError("Ожидался JSON-массив записей")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Элемент не поместился в буфер — дочитываем
+            if fill():
+                continue
+            raise
+        if end >= len(buf) and not eof:
+            # Число или литерал мог оборваться на границе куска
+            fill()
+            continue
+        yield item
+        pos = end
+
+
+def _kind_code(kind: str) -> int:
+    if kind == "users":
+        return KIND_USERS
+    if kind == "portfolios":
+        return KIND_PORTFOLIOS
+    raise ValueError(f"Неизвестный вид данных: '{kind}'")
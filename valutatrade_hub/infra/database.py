@@ -2,14 +2,33 @@
 
 import json
 import os
+import shutil
+import tempfile
 from datetime import datetime, timedelta
 
 # infra/database.py
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from valutatrade_hub.core.models import Portfolio, User
+from valutatrade_hub.infra import codec
+from valutatrade_hub.infra.backends import create_backend
+from valutatrade_hub.infra.file_cache import file_cache
+from valutatrade_hub.infra.generation import next_generation, write_generation
+from valutatrade_hub.infra.group_commit import (
+    WriteTicket,
+    completed_ticket,
+    get_group_writer,
+)
+from valutatrade_hub.infra.locking import get_file_lock, lock_stats
+from valutatrade_hub.infra.rate_cache import RateSnapshot, rate_cache
 from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.infra.sharded_portfolios import (
+    LazyPortfolios,
+    ShardedPortfolioStore,
+)
+from valutatrade_hub.infra.trade_journal import TradeLeg, get_journal
+from valutatrade_hub.infra.user_index import get_user_index
 
 
 class JsonDatabase:
@@ -25,18 +44,60 @@ class JsonDatabase:
     def write(self, data: dict) -> None:
         self.path.write_text(json.dumps(data, indent=2))
 
+
+def _write_durable(file_path: str, payload: bytes) -> None:
+    """
+    Записать файл атомарно: временный файл + fsync → os.replace.
+    Прежняя версия остаётся в <file>.backup. Читатели никогда не видят
+    отсутствующий или недописанный файл.
+    """
+    directory = os.path.dirname(file_path) or "."
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            _keep_backup(file_path)
+        os.replace(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def _keep_backup(file_path: str) -> None:
+    """Сохранить текущую версию в .backup: жёсткая ссылка, иначе копия"""
+    backup = file_path + ".backup"
+    try:
+        os.unlink(backup)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(file_path, backup)
+    except OSError:
+        shutil.copy2(file_path, backup)
+
+
+def _on_flushed(file_path: str, ok: bool, submitted: int) -> None:
+    """После отложенной записи: кеш уже содержит новое значение — обновляем подпись"""
+    if ok:
+        file_cache.resign(file_path)
+    else:
+        file_cache.invalidate(file_path)
+    # Файл дописан — другие процессы снова могут его читать
+    get_file_lock(file_path).release_retained(submitted)
+
+
 # Singleton DatabaseManager (абстракция над JSON-хранилищем)
 class DatabaseManager:
     def __init__(self):
         self.settings = SettingsLoader()
 
-        # Получаем data_dir из настроек
-        data_dir = self.settings.get("data_dir", "data")
-
-        # Преобразуем в абсолютный путь: если относительный — считаем от корня проекта
-        project_root = Path(__file__).parent.parent.parent 
-        # valutatrade_hub → finalproject_...
-        self.data_dir = str(project_root / data_dir)
+        # data_dir из настроек; относительный — от корня проекта.
+        # Тот же каталог, что у parser_service (config.DATA_DIR)
+        self.data_dir = str(self.settings.data_path())
 
         os.makedirs(self.data_dir, exist_ok=True)
 
@@ -44,6 +105,59 @@ class DatabaseManager:
         self.portfolios_file = os.path.join(self.data_dir, "portfolios.json")
         self.rates_file = os.path.join(self.data_dir, "rates.json")
 
+        # Общий для процесса кеш разобранных users/portfolios/rates.json.
+        # Флаг — свой у экземпляра: глобальный file_cache.enabled не трогаем,
+        # иначе один DatabaseManager менял бы кеширование всем остальным
+        self.use_file_cache = self.settings.get("file_cache", True)
+
+        # Бэкенд пользователей/портфелей: None → встроенное JSON-хранилище
+        self.backend = create_backend(
+            self.settings.get("storage_backend", "json"), self.data_dir, self.settings
+        )
+
+        # Индекс username → user_id для JSON-хранилища (users.index.json)
+        self.user_index = None
+        if self.backend is None:
+            self.user_index = get_user_index(self.users_file)
+
+        # Раскладка портфелей JSON-хранилища: "single" (один файл) или "sharded"
+        self.portfolio_shards = None
+        if self.backend is None and self.settings.get("portfolio_layout") == "sharded":
+            self.portfolio_shards = ShardedPortfolioStore(
+                os.path.join(self.data_dir, "portfolios")
+            )
+            # Первый запуск — раскладываем существующий portfolios.json.
+            # Проверяется метка завершения, а не наличие каталога: корень
+            # от оборванной миграции не должен прятать остальные портфели
+            if not self.portfolio_shards.migrated():
+                self.portfolio_shards.migrate_from(self.portfolios_file)
+
+        # Журнал сделок: buy/sell дописывают строку вместо перезаписи портфеля
+        self.journal = None
+        if self.settings.get("trade_journal", False):
+            self.journal = get_journal(
+                os.path.join(self.data_dir, "trades.journal"),
+                fsync=self.settings.get("journal_fsync", True),
+            )
+
+        # Формат новых записей users/portfolios; чтение определяет формат само
+        self.data_format = self.settings.get("data_format", "json")
+        if self.data_format not in codec.FORMATS:
+            raise ValueError(
+                f"Неизвестный data_format: '{self.data_format}'. "
+                f"Доступные: {', '.join(codec.FORMATS)}"
+            )
+
+        # Групповая фиксация: записи в пределах окна сливаются в одну
+        # fsync'нутую запись файла. 0 — писать сразу, как раньше
+        self.group_writer = None
+        self.write_wait_durable = self.settings.get("write_wait_durable", True)
+        window_ms = self.settings.get("write_batch_window_ms", 0)
+        if window_ms and window_ms > 0:
+            self.group_writer = get_group_writer(
+                window_ms, _write_durable, _on_flushed
+            )
+
         '''
         self.settings = SettingsLoader()
         self.data_dir = self.settings.get("data_dir", "data")
@@ -78,36 +192,98 @@ class DatabaseManager:
         
 
     def load_users(self) -> List[User]:
-        if not os.path.exists(self.users_file):
-            return []
-        try:
-            with open(self.users_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return [User.from_dict(item) for item in data]
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
-            print(f"⚠️ Ошибка загрузки users.json: {e}")
-            return []
+        if self.backend is not None:
+            return self.backend.load_users()
+        return list(self.load_users_dict().values())
     
     def load_users_dict(self) -> Dict[int, User]:
         """Загружает пользователей в виде словаря user_id → User"""
+        if self.backend is not None:
+            return self.backend.load_users_dict()
+        # Копия словаря: сами объекты User общие (identity map)
+        return dict(self._cache_get(self.users_file, self._parse_users_file))
+
+    def _parse_users_file(self) -> Dict[int, User]:
+        self._wait_pending(self.users_file)
         if not os.path.exists(self.users_file):
             return {}
         try:
-            with open(self.users_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with get_file_lock(self.users_file).shared():
+                data = codec.read_records(self.users_file)
             users = {}
             for item in data:
                 user = User.from_dict(item)
                 users[user.user_id] = user
             return users
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
+        except (json.JSONDecodeError, codec.CodecError, KeyError, TypeError) as e:
             print(f"⚠️ Ошибка загрузки users.json: {e}")
             return {}
     
     def save_user(self, user: User):
-        users = self.load_users_dict()
-        users[user.user_id] = user
-        self._safe_write(self.users_file, [u.to_dict() for u in users.values()])
+        if self.backend is not None:
+            self.backend.save_user(user)
+            return
+        with get_file_lock(self.users_file).exclusive():
+            users = self.load_users_dict()
+            users[user.user_id] = user
+            ticket = self._submit_write(
+                self.users_file, [u.to_dict() for u in users.values()], "users"
+            )
+            self._cache_written(self.users_file, users, ticket)
+        if self._await_write(ticket):
+            self.user_index.record(user)
+
+    def iter_users(self) -> Iterator[User]:
+        """
+        Пользователи по одному. Если users.json уже разобран и не менялся —
+        из кеша, иначе файл читается потоково, с постоянной памятью.
+        """
+        if self.backend is not None:
+            yield from self.backend.iter_users()
+            return
+        cached = self._cache_peek(self.users_file)
+        if cached is not None:
+            yield from list(cached.values())
+            return
+        try:
+            for item in self._iter_records(self.users_file):
+                yield User.from_dict(item)
+        except (json.JSONDecodeError, codec.CodecError, KeyError, TypeError) as e:
+            print(f"⚠️ Ошибка загрузки users.json: {e}")
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """
+        Пользователь по user_id: поиск по ключу в разобранном users.json
+        (кеш файлов), без обхода. С выключенным кешем — потоковый обход,
+        останавливается на найденном.
+        """
+        if self.backend is not None:
+            return self.backend.get_user(user_id)
+        if self.use_file_cache:
+            return self._cache_get(self.users_file, self._parse_users_file).get(user_id) # noqa: E501
+        for user in self.iter_users():
+            if user.user_id == user_id:
+                return user
+        return None
+
+    def find_user_id(self, username: str) -> Optional[int]:
+        """user_id по имени пользователя через индекс, без обхода всех пользователей"""
+        if self.backend is not None:
+            return self.backend.find_user_id(username)
+        return self.user_index.find(username, self.iter_users)
+
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        """Пользователь по имени или None"""
+        user_id = self.find_user_id(username)
+        if user_id is None:
+            return None
+        return self.get_user(user_id)
+
+    def next_user_id(self) -> int:
+        """Следующий user_id из монотонной последовательности"""
+        if self.backend is not None:
+            return self.backend.next_user_id()
+        return self.user_index.allocate_user_id(self.iter_users)
     
     '''
     def save_user(self, user: User):
@@ -123,9 +299,18 @@ class DatabaseManager:
     '''
     
     def load_portfolio(self, user_id: int) -> Portfolio:
-        portfolios = self.load_portfolios()
-        if user_id in portfolios:
-            return portfolios[user_id]
+        if self.journal is None:
+            portfolio = self._load_stored_portfolio(user_id)
+        else:
+            # Чекпоинт + хвост журнала сделок, согласованно с компакцией
+            with self.journal.lock:
+                portfolio = self._load_stored_portfolio(user_id)
+                if self.journal.has_records(user_id):
+                    portfolio = self.journal.apply(
+                        portfolio or Portfolio(user_id=user_id)
+                    )
+        if portfolio is not None:
+            return portfolio
         # Если портфель не найден — возвращаем пустой (без магии!)
         print(f"🔧 Портфель для user_id={user_id} не найден — создан пустой")
         return Portfolio(user_id=user_id)
@@ -170,24 +355,194 @@ class DatabaseManager:
         return portfolio
     '''
     def load_portfolios(self) -> Dict[int, Portfolio]:
+        if self.portfolio_shards is not None:
+            # Ленивый обход шардов — для отчётов
+            return LazyPortfolios(self.portfolio_shards, journal=self.journal)
+        if self.journal is None:
+            return self._load_stored_portfolios_copy()
+        with self.journal.lock:
+            portfolios = self._load_stored_portfolios_copy()
+            for user_id in self.journal.user_ids():
+                portfolios[user_id] = self.journal.apply(
+                    portfolios.get(user_id) or Portfolio(user_id=user_id)
+                )
+        return portfolios
+
+    def _load_stored_portfolios_copy(self) -> Dict[int, Portfolio]:
+        portfolios = self._load_stored_portfolios()
+        if self.backend is None:
+            # Копии: объекты из кеша файлов не должны меняться снаружи
+            portfolios = {uid: p.copy() for uid, p in portfolios.items()}
+        return portfolios
+
+    def iter_portfolios(self) -> Iterator[Portfolio]:
+        """
+        Портфели по одному (с наложенным журналом сделок) — для обходов
+        и отчётов: весь portfolios.json в памяти не собирается.
+        """
+        if self.portfolio_shards is not None:
+            lazy = LazyPortfolios(self.portfolio_shards, journal=self.journal)
+            for user_id in lazy:
+                yield lazy[user_id]
+            return
+
+        if self.backend is not None:
+            stored = self.backend.iter_portfolios()
+        else:
+            stored = self._iter_stored_portfolios()
+
+        pending = set(self.journal.user_ids()) if self.journal is not None else set()
+        for portfolio in stored:
+            if portfolio.user_id in pending:
+                pending.discard(portfolio.user_id)
+                portfolio = self.journal.apply(portfolio)
+            yield portfolio
+        # Портфели, которые пока есть только в журнале
+        for user_id in sorted(pending):
+            yield self.journal.apply(Portfolio(user_id=user_id))
+
+    def _iter_stored_portfolios(self) -> Iterator[Portfolio]:
+        cached = self._cache_peek(self.portfolios_file)
+        if cached is not None:
+            for portfolio in list(cached.values()):
+                yield portfolio.copy()
+            return
+        try:
+            for item in self._iter_records(self.portfolios_file):
+                yield Portfolio.from_storage(item)
+        except (json.JSONDecodeError, codec.CodecError, KeyError, TypeError) as e:
+            print(f"⚠️ Ошибка загрузки portfolios.json: {e}")
+
+    def _iter_records(self, file_path: str) -> Iterator[dict]:
+        """Сырые записи файла по одной, в обход кеша"""
+        self._wait_pending(file_path)
+        try:
+            # Блокировка нужна только на открытие: запись идёт через
+            # os.replace, и открытый дескриптор дочитает свою версию файла
+            with get_file_lock(file_path).shared():
+                f = open(file_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            yield from codec.iter_file_records(f)
+
+    def _load_stored_portfolio(self, user_id: int) -> Optional[Portfolio]:
+        """Портфель из основного хранилища (чекпоинта), без журнала"""
+        if self.backend is not None:
+            return self.backend.load_portfolio(user_id)
+        if self.portfolio_shards is not None:
+            return self.portfolio_shards.load(user_id)
+        portfolio = self._load_stored_portfolios().get(user_id)
+        # Объект из кеша общий для процесса — вызывающий получает копию
+        return portfolio.copy() if portfolio is not None else None
+
+    def _load_stored_portfolios(self) -> Dict[int, Portfolio]:
+        """Все портфели из основного хранилища (чекпоинта), без журнала"""
+        if self.backend is not None:
+            return self.backend.load_portfolios()
+        if self.portfolio_shards is not None:
+            return LazyPortfolios(self.portfolio_shards)
+        return dict(self._cache_get(self.portfolios_file, self._parse_portfolios_file)) # noqa: E501
+
+    def _parse_portfolios_file(self) -> Dict[int, Portfolio]:
+        self._wait_pending(self.portfolios_file)
         if not os.path.exists(self.portfolios_file):
             return {}
         try:
-            with open(self.portfolios_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with get_file_lock(self.portfolios_file).shared():
+                data = codec.read_records(self.portfolios_file)
             portfolios = {}
             for item in data:
-                p = Portfolio.from_dict(item)
+                p = Portfolio.from_storage(item)
                 portfolios[p.user_id] = p
             return portfolios
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
+        except (json.JSONDecodeError, codec.CodecError, KeyError, TypeError) as e:
             print(f"⚠️ Ошибка загрузки portfolios.json: {e}")
             return {}
     
     def save_portfolio(self, portfolio: Portfolio):
-        portfolios = self.load_portfolios()
-        portfolios[portfolio.user_id] = portfolio
-        self._safe_write(self.portfolios_file, [p.to_dict() for p in portfolios.values()]) # noqa: E501
+        if self.journal is not None:
+            # Полный снимок портфеля тоже идёт через журнал
+            self.journal.append_snapshot(portfolio)
+            self._maybe_compact()
+            return
+        self._save_stored_portfolios([portfolio])
+
+    def record_trade(self, portfolio: Portfolio, legs: List[TradeLeg]) -> None:
+        """
+        Зафиксировать сделку. С журналом — дописать ноги сделки
+        (валюта, изменение, курс) в конец журнала, без перезаписи портфелей;
+        без журнала — сохранить изменённый портфель целиком.
+        """
+        if self.journal is None:
+            self.save_portfolio(portfolio)
+            return
+        self.journal.append_trade(portfolio.user_id, legs)
+        self._maybe_compact()
+
+    def compact_journal(self) -> int:
+        """Свернуть журнал сделок в чекпоинт синхронно. Возвращает число записей"""
+        if self.journal is None:
+            return 0
+        return self.journal.compact(
+            self._load_stored_batch, self._save_stored_portfolios
+        )
+
+    def _maybe_compact(self) -> None:
+        """Фоновая компакция, когда хвост журнала превысил порог"""
+        threshold = self.settings.get("journal_compact_threshold", 1000)
+        if self.journal.pending_count() >= threshold:
+            self.journal.compact_in_background(
+                self._load_stored_batch, self._save_stored_portfolios
+            )
+
+    def _load_stored_batch(self, user_ids: List[int]) -> Dict[int, Optional[Portfolio]]:
+        """Портфели из чекпоинта по списку user_id"""
+        if self.backend is None and self.portfolio_shards is None:
+            # Один файл — читаем его один раз на всю пачку
+            portfolios = self._load_stored_portfolios()
+            return {user_id: portfolios.get(user_id) for user_id in user_ids}
+        return {user_id: self._load_stored_portfolio(user_id) for user_id in user_ids}
+
+    def _save_stored_portfolios(self, portfolios: List[Portfolio]) -> None:
+        """Записать пачку портфелей в основное хранилище (чекпоинт)"""
+        if self.backend is not None:
+            for portfolio in portfolios:
+                self.backend.save_portfolio(portfolio)
+            return
+        if self.portfolio_shards is not None:
+            for portfolio in portfolios:
+                self.portfolio_shards.save(portfolio)
+            return
+        with get_file_lock(self.portfolios_file).exclusive():
+            stored = self._load_stored_portfolios()
+            for portfolio in portfolios:
+                stored[portfolio.user_id] = portfolio
+            ticket = self._submit_write(
+                self.portfolios_file,
+                [p.to_dict() for p in stored.values()],
+                "portfolios",
+            )
+            self._cache_written(self.portfolios_file, stored, ticket)
+        self._await_write(ticket)
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Счётчики кеша файлов (попадания/промахи) — для настройки"""
+        return file_cache.stats()
+
+    def lock_stats(self) -> Dict[str, Dict[str, float]]:
+        """Ожидание файловых блокировок по файлам — для поиска конкуренции"""
+        return lock_stats()
+
+    def write_stats(self) -> Dict[str, float]:
+        """Размеры пачек групповой фиксации и p50/p99 задержки записи, мс"""
+        if self.group_writer is None:
+            return {}
+        return self.group_writer.stats()
+
+    def rate_stats(self) -> Dict[str, Any]:
+        """Кеш курсов: попадания, сколько раз разбирали rates.json"""
+        return rate_cache.stats()
 
     '''
     def load_rates(self) -> Dict[str, float]:
@@ -277,81 +632,94 @@ class DatabaseManager:
         - Для крипты: BTC_USD: 59337.21 → 1 BTC = 59337.21 USD → значит, 
         курс BTC = 59337.21
         """
-        print(f"📂 [load] Чтение из: {self.rates_file}")
-        if not os.path.exists(self.rates_file):
-            return {
-                "USD": 1.0,
-                "EUR": 1.07,
-                "BTC": 60000.0,
-                "ETH": 3000.0,
-                "RUB": 95.0
-            }
-        
-        try:
-            with open(self.rates_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"❌ Ошибка чтения rates.json: {e}")
-            return {"USD": 1.0}
-
-        rates = {"USD": 1.0}       
-        print("🔍 [load_rates] Весь JSON из файла:", data)
-        pairs = data.get("pairs", {})
+        # Разбор снимка — один раз на last_updated, дальше из кеша
+        return dict(rate_cache.get(self).rates)
 
-        for pair, info in pairs.items():
-            if not isinstance(info, dict) or "rate" not in info:
-                continue
-
-            rate = float(info["rate"])
-
-            # Разбираем пару
-            if "_" not in pair:
-                continue
-
-            from_curr, to_curr = pair.split("_", 1)
-
-            # Если пара заканчивается на _USD
-            if to_curr == "USD":
-                if from_curr in {"BTC", "ETH", "SOL", "ADA", "DOT", "BNB", "XRP", "AVAX", "LINK"}: # noqa: E501
-                    # Криптовалюты: BTC_USD = 59337 → 1 BTC = 59337 USD
-                    rates[from_curr] = rate
-                else:
-                    """ Фиат: RUB_USD = 75.9557 → это НА САМОМ ДЕЛЕ означает: 
-                    1 USD = 75.9557 RUB
-                    → значит, курс RUB (сколько RUB за 1 USD) = 75.9557 """
-                    rates[from_curr] = rate  # Да, сохраняем как есть: RUB = 75.9557
-            # Если пара USD_XXX — например, USD_EUR = 0.8407
-            elif from_curr == "USD":
-                # 1 USD = 0.8407 EUR → значит, 1 EUR = 1 / 0.8407 ≈ 1.189
-                rates[to_curr] = 1 / rate
-
-        # Гарантируем USD
-        if "USD" not in rates:
-            rates["USD"] = 1.0
-        
-        print("🔧 [load_rates] Все найденные пары:", list(pairs.keys()))
-        print("📊 [load_rates] Итоговые курсы:", rates)
-  
-        return rates
+    def get_rates_snapshot(self) -> RateSnapshot:
+        """Снимок курсов с last_updated и признаком устаревания (без копии)"""
+        return rate_cache.get(self)
 
     def save_rates_with_timestamp(self, rates: Dict[str, float]):
         data = {**rates, "last_updated": datetime.now().isoformat()}
         print(f"💾 [save] Запись в: {self.rates_file}")
-        self._safe_write(self.rates_file, data)
+        with get_file_lock(self.rates_file).exclusive():
+            data["generation"] = next_generation(self.rates_file)
+            ticket = self._submit_write(self.rates_file, data)
+            self._cache_written(self.rates_file, data, ticket)
+            write_generation(self.rates_file, data["generation"])
+            rate_cache.invalidate()
+        self._await_write(ticket)
+
+    def _read_rates_data(self) -> dict:
+        """Сырой JSON rates.json (через кеш файлов)"""
+        def parse():
+            self._wait_pending(self.rates_file)
+            with get_file_lock(self.rates_file).shared():
+                with open(self.rates_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        return self._cache_get(self.rates_file, parse)
        
-    def _safe_write(self, file_path: str, data: any):
-        """Безопасная запись с резервной копией."""
-        backup = file_path + ".backup"
-        if os.path.exists(file_path):
-            os.replace(file_path, backup)
+    def _safe_write(self, file_path: str, data: any) -> bool:
+        """Безопасная запись с резервной копией. Возвращает True при успехе."""
+        with get_file_lock(file_path).exclusive():
+            ticket = self._submit_write(file_path, data)
+        return self._await_write(ticket)
+
+    def _submit_write(
+        self, file_path: str, data: Any, kind: Optional[str] = None
+    ) -> WriteTicket:
+        """
+        Начать запись файла. Без групповой фиксации пишет сразу;
+        с ней — ставит данные в очередь фонового писателя.
+        :param kind: "users"/"portfolios" — записать в формате data_format;
+            None — обычный JSON (rates.json читают и другие модули)
+        """
+        if kind is None:
+            payload = codec.dumps_json(data)
+        else:
+            payload = codec.encode(data, kind, self.data_format)
+        if self.group_writer is not None:
+            # flock держим до фактической записи (снимет _on_flushed)
+            get_file_lock(file_path).retain()
+            return self.group_writer.submit(file_path, payload)
+        # Старое значение в кеше больше не годится, что бы ни случилось дальше
+        file_cache.invalidate(file_path)
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            _write_durable(file_path, payload)
+            return completed_ticket()
         except Exception as e:
             print(f"❌ Ошибка записи {file_path}: {e}")
-            if os.path.exists(backup):
-                os.replace(backup, file_path)
-                print("✅ Восстановлено из бэкапа")
+            return completed_ticket(e)
+
+    def _await_write(self, ticket: WriteTicket) -> bool:
+        """
+        Дождаться durability, если так настроено (write_wait_durable).
+        В режиме fire-and-forget ошибку фоновой записи увидит только лог.
+        """
+        if ticket.done or self.write_wait_durable:
+            return ticket.wait()
+        return True
+
+    def _cache_written(self, file_path: str, value: Any, ticket: WriteTicket) -> None:
+        """Положить записанное значение в кеш (read-your-writes до сброса на диск)"""
+        if self.use_file_cache and (not ticket.done or ticket.error is None):
+            file_cache.put(file_path, value)
+
+    def _cache_get(self, file_path: str, loader) -> Any:
+        """Значение через общий кеш файлов (или loader(), если кеш выключен)"""
+        if not self.use_file_cache:
+            return loader()
+        return file_cache.get(file_path, loader)
+
+    def _cache_peek(self, file_path: str) -> Any:
+        if not self.use_file_cache:
+            return None
+        return file_cache.peek(file_path)
+
+    def _wait_pending(self, file_path: str) -> None:
+        """Перед чтением с диска дождаться отложенных записей в этот файл"""
+        if self.group_writer is not None:
+            self.group_writer.wait_pending(file_path)
 
     def _default_rates(self) -> Dict[str, float]:
         return {
@@ -371,8 +739,7 @@ class DatabaseManager:
             return self._default_rates(), now
 
         try:
-            with open(self.rates_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = self._read_rates_data()
             last_updated_str = data.get("last_updated")
             last_updated = datetime.fromisoformat(last_updated_str) if last_updated_str else now # noqa: E501
 
@@ -0,0 +1,52 @@
+# valutatrade_hub/infra/events.py
+
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+# Шина событий внутри процесса: RatesUpdater публикует новый снимок
+# курсов (RateSnapshot), подписчики — кеш курсов и прочие — получают его
+# сразу, без повторного чтения rates.json.
+# Список подписчиков — неизменяемый кортеж, который при подписке
+# заменяется целиком; публикация и чтение latest идут без блокировок.
+
+Subscriber = Callable[[Any, str], None]
+
+
+class SnapshotBus:
+    """Публикация снимков курсов подписчикам того же процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # только для подписки/отписки
+        self._subscribers: Tuple[Subscriber, ...] = ()
+        self.latest: Optional[Any] = None
+        self.published = 0
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        Подписаться на снимки: callback(snapshot, path к rates.json).
+        :return: функция отписки
+        """
+        with self._lock:
+            self._subscribers = self._subscribers + (callback,)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._subscribers = tuple(
+                    s for s in self._subscribers if s is not callback
+                )
+        return unsubscribe
+
+    def publish(self, snapshot: Any, path: str) -> None:
+        """Разослать снимок; ошибка одного подписчика не мешает остальным"""
+        self.latest = snapshot
+        self.published += 1
+        for callback in self._subscribers:
+            try:
+                callback(snapshot, path)
+            except Exception as e:
+                name = getattr(callback, "__qualname__", repr(callback))
+                print(f"⚠️ [Events] Ошибка подписчика {name}: {e}")
+
+
+# --- Глобальный экземпляр ---
+rate_events = SnapshotBus()
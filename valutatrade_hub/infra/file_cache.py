@@ -0,0 +1,114 @@
+# valutatrade_hub/infra/file_cache.py
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Общий для процесса кеш разобранных файлов данных (identity map).
+# Запись проверяется по (st_mtime_ns, st_size, st_ino) перед каждым
+# использованием: если файл изменил другой процесс — перечитываем.
+
+Signature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path: str) -> Signature:
+    """Дешёвая «подпись» файла по stat; None, если файла нет"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileCache:
+    """
+    Кеш path → разобранное значение (User/Portfolio и т.п.).
+    Свои записи не сбрасывают кеш, а кладут в него новое значение
+    (put), поэтому после сохранения файл не разбирается повторно.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Signature, Any]] = {}
+        self._lock = threading.Lock()
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, path: str, loader: Callable[[], Any]) -> Any:
+        """Значение из кеша, если файл не менялся, иначе — loader()"""
+        if not self.enabled:
+            return loader()
+
+        # Подпись снимаем до чтения: если файл поменяется во время
+        # разбора, при следующем обращении подписи не совпадут
+        signature = file_signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            self._entries[path] = (signature, value)
+        return value
+
+    def peek(self, path: str) -> Any:
+        """Значение из кеша, если файл не менялся, иначе None (без загрузки)"""
+        if not self.enabled:
+            return None
+        signature = file_signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def put(self, path: str, value: Any) -> None:
+        """Запомнить значение, только что записанное нами в path"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[path] = (file_signature(path), value)
+            self.writes += 1
+
+    def resign(self, path: str) -> None:
+        """
+        Обновить подпись записи после отложенной записи файла:
+        значение в кеше уже новое (put), на диск оно легло только сейчас.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries[path] = (file_signature(path), entry[1])
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Сбросить запись для path (или весь кеш)"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для настройки: попадания, промахи, доля попаданий"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.writes = 0
+
+
+# --- Глобальный экземпляр ---
+file_cache = FileCache()
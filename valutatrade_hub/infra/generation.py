@@ -0,0 +1,141 @@
+# valutatrade_hub/infra/generation.py
+
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Callable, Optional
+
+# Номер поколения снимка курсов.
+# Каждая запись rates.json увеличивает generation на 1: номер лежит
+# и в самом JSON, и в крошечном файле-спутнике rates.json.gen.
+# Читателю, чтобы понять, менялись ли курсы, достаточно прочитать
+# несколько байт спутника, а не разбирать весь JSON.
+# Спутник пишется после замены rates.json: номер в нём никогда
+# не опережает содержимое файла.
+
+GEN_SUFFIX = ".gen"
+
+# inotify (Linux): закрытие файла после записи и появление через rename
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def generation_path(path) -> str:
+    return f"{path}{GEN_SUFFIX}"
+
+
+def read_generation(path) -> Optional[int]:
+    """Поколение снимка по спутнику path.gen (None — спутника нет)"""
+    try:
+        with open(generation_path(path), "rb") as f:
+            return int(f.read(32).strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def next_generation(path) -> int:
+    """Следующий номер; вызывать под исключительной блокировкой path"""
+    return (read_generation(path) or 0) + 1
+
+
+def write_generation(path, generation: int) -> None:
+    """Записать спутник атомарно (после замены самого файла)"""
+    target = generation_path(path)
+    temp = f"{target}.tmp"
+    with open(temp, "w", encoding="ascii") as f:
+        f.write(str(generation))
+    os.replace(temp, target)
+
+
+class GenerationWatcher:
+    """
+    Следит за спутником path.gen в фоновом потоке и вызывает
+    callback(generation) при смене номера. На Linux ждёт событий
+    inotify, в остальных случаях опрашивает файл раз в poll_interval.
+    """
+
+    def __init__(
+        self,
+        path,
+        callback: Callable[[Optional[int]], None],
+        poll_interval: float = 1.0,
+    ):
+        self.path = str(path)
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.generation = read_generation(self.path)
+        self.mode = "poll"
+        self._fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "GenerationWatcher":
+        self._fd = self._inotify_init()
+        self.mode = "inotify" if self._fd is not None else "poll"
+        self._thread = threading.Thread(
+            target=self._run, name="rates-gen-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2 * self.poll_interval)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # === Вспомогательные ===
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._fd is not None:
+                ready, _, _ = select.select([self._fd], [], [], self.poll_interval)
+                if not ready or not self._drain():
+                    continue
+            else:
+                self._stop.wait(self.poll_interval)
+            generation = read_generation(self.path)
+            if generation != self.generation:
+                self.generation = generation
+                try:
+                    self.callback(generation)
+                except Exception as e:
+                    print(f"⚠️ [Generation] Ошибка обработчика: {e}")
+
+    def _drain(self) -> bool:
+        """Прочитать события inotify; True — среди них есть наш спутник"""
+        name = os.path.basename(generation_path(self.path)).encode()
+        data = os.read(self._fd, 4096)
+        pos, hit = 0, False
+        while pos + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            if data[pos:pos + length].rstrip(b"\0") == name:
+                hit = True
+            pos += length
+        return hit
+
+    def _inotify_init(self) -> Optional[int]:
+        """Дескриптор inotify на каталог файла; None — inotify недоступен"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(_IN_CLOEXEC)
+            if fd < 0:
+                return None
+            directory = os.path.dirname(os.path.abspath(self.path)).encode()
+            mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+            if libc.inotify_add_watch(fd, directory, mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
@@ -0,0 +1,194 @@
+# valutatrade_hub/infra/group_commit.py
+
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Групповая фиксация записей (group commit).
+# Записи, пришедшие в пределах окна (например, 5 мс), сливаются:
+# для каждого файла на диск уходит только последняя версия данных,
+# одним fsync'нутым вызовом. Вызывающий может дождаться durability
+# (ticket.wait()) или продолжить, не дожидаясь (fire-and-forget).
+
+
+class WriteTicket:
+    """Квитанция на запись: позволяет дождаться, пока данные лягут на диск"""
+
+    def __init__(self):
+        self.submitted_at = time.perf_counter()
+        self._done = threading.Event()
+        self.error: Optional[Exception] = None
+
+    def _complete(self, error: Optional[Exception] = None) -> None:
+        self.error = error
+        self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Дождаться записи. True — данные записаны, False — ошибка или таймаут"""
+        if not self._done.wait(timeout):
+            return False
+        return self.error is None
+
+
+def completed_ticket(error: Optional[Exception] = None) -> WriteTicket:
+    """Квитанция для уже выполненной синхронной записи"""
+    ticket = WriteTicket()
+    ticket._complete(error)
+    return ticket
+
+
+class GroupCommitWriter:
+    """
+    Фоновый поток, сбрасывающий накопленные записи пачками.
+    :param window_ms: окно накопления записей
+    :param write_fn: запись одного файла (path, data); должна делать fsync
+    :param on_flushed: вызывается после каждой записи файла
+        (path, ok, число слитых в неё записей)
+    """
+
+    def __init__(
+        self,
+        window_ms: float,
+        write_fn: Callable[[str, Any], None],
+        on_flushed: Optional[Callable[[str, bool, int], None]] = None,
+    ):
+        self.window = window_ms / 1000
+        self.write_fn = write_fn
+        self.on_flushed = on_flushed
+
+        # path → (последние данные, все квитанции, ждущие этот файл)
+        self._pending: Dict[str, Tuple[Any, List[WriteTicket]]] = {}
+        self._cond = threading.Condition()
+        self._flushing: Dict[str, threading.Event] = {}
+        # Пачки пишутся строго по очереди: иначе более старая пачка
+        # могла бы лечь на диск поверх более новой
+        self._flush_lock = threading.Lock()
+
+        # Статистика для настройки окна
+        self.batches = 0
+        self.submitted = 0
+        self.files_written = 0
+        self._batch_sizes: deque = deque(maxlen=10_000)
+        self._latencies_ms: deque = deque(maxlen=10_000)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, path: str, data: Any) -> WriteTicket:
+        """Поставить запись в очередь. Более ранние данные для path заменяются"""
+        ticket = WriteTicket()
+        with self._cond:
+            _, tickets = self._pending.get(path, (None, []))
+            tickets.append(ticket)
+            self._pending[path] = (data, tickets)
+            self.submitted += 1
+            self._cond.notify()
+        return ticket
+
+    def has_pending(self, path: str) -> bool:
+        with self._cond:
+            return path in self._pending or path in self._flushing
+
+    def wait_pending(self, path: str) -> None:
+        """Дождаться, пока отложенные записи в path дойдут до диска"""
+        with self._cond:
+            entry = self._pending.get(path)
+            flushing = self._flushing.get(path)
+        if entry is not None:
+            entry[1][-1].wait()
+        elif flushing is not None:
+            flushing.wait()
+
+    def flush(self) -> None:
+        """Сбросить всё накопленное немедленно (в вызывающем потоке)"""
+        self._flush_batch()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Первая запись пришла — ждём окно, собирая остальные
+            time.sleep(self.window)
+            self._flush_batch()
+
+    def _flush_batch(self) -> None:
+        with self._flush_lock:
+            self._write_batch()
+
+    def _write_batch(self) -> None:
+        with self._cond:
+            batch, self._pending = self._pending, {}
+            for path in batch:
+                self._flushing[path] = threading.Event()
+        if not batch:
+            return
+
+        batch_size = 0
+        for path, (data, tickets) in batch.items():
+            error = None
+            try:
+                self.write_fn(path, data)
+            except Exception as e:
+                error = e
+                print(f"❌ [GroupCommit] Ошибка записи {path}: {e}")
+            if self.on_flushed is not None:
+                self.on_flushed(path, error is None, len(tickets))
+
+            now = time.perf_counter()
+            for ticket in tickets:
+                self._latencies_ms.append((now - ticket.submitted_at) * 1000)
+                ticket._complete(error)
+            batch_size += len(tickets)
+            self.files_written += 1
+
+            with self._cond:
+                self._flushing.pop(path).set()
+
+        self.batches += 1
+        self._batch_sizes.append(batch_size)
+
+    def stats(self) -> Dict[str, float]:
+        """Размеры пачек и задержки записи (до durability), мс"""
+        latencies = sorted(self._latencies_ms)
+        sizes = list(self._batch_sizes)
+        return {
+            "batches": self.batches,
+            "submitted": self.submitted,
+            "files_written": self.files_written,
+            "avg_batch": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "max_batch": max(sizes, default=0),
+            "p50_ms": round(_percentile(latencies, 0.50), 3),
+            "p99_ms": round(_percentile(latencies, 0.99), 3),
+        }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+# Один писатель на процесс
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_group_writer(
+    window_ms: float,
+    write_fn: Callable[[str, Any], None],
+    on_flushed: Optional[Callable[[str, bool, int], None]] = None,
+) -> GroupCommitWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(window_ms, write_fn, on_flushed)
+        return _writer
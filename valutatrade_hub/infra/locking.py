@@ -0,0 +1,234 @@
+# valutatrade_hub/infra/locking.py
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: остаётся только блокировка внутри процесса
+    fcntl = None
+
+# Блокировки читатель/писатель для файлов data_dir.
+# Между процессами — flock на соседнем файле <path>.lock:
+# много читателей (LOCK_SH) или один писатель (LOCK_EX).
+# Внутри процесса flock один на всех, поэтому потоки дополнительно
+# согласуются через Condition. Писатель реентерабелен в своём потоке
+# и может читать под своей же блокировкой.
+
+
+class FileLock:
+    """Разделяемая/исключительная блокировка одного файла данных"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._cond = threading.Condition()
+        self._fd: Optional[int] = None
+        self._flock_mode: Optional[int] = None  # что держит процесс: SH/EX/None
+
+        self._readers = 0
+        self._writer: Optional[int] = None  # ident потока-писателя
+        self._writer_depth = 0
+        # Исключительная блокировка, удержанная до отложенной записи (group commit)
+        self._retained = 0
+        self._local = threading.local()
+
+        # Инструментация ожидания
+        self.acquisitions = 0
+        self.contended = 0
+        self._waits_ms: deque = deque(maxlen=10_000)
+
+    # === Публичные методы ===
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """Блокировка на чтение: параллельно с другими читателями"""
+        self._acquire_shared()
+        try:
+            yield
+        finally:
+            self._release_shared()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Блокировка на запись: один писатель, без читателей"""
+        self._acquire_exclusive()
+        try:
+            yield
+        finally:
+            self._release_exclusive()
+
+    def retain(self) -> None:
+        """
+        Не отпускать flock после выхода из exclusive(), пока не будет
+        вызван release_retained(). Нужен для отложенной записи: другой
+        процесс не должен прочитать файл до того, как мы его допишем.
+        Вызывается под exclusive().
+        """
+        with self._cond:
+            self._retained += 1
+
+    def release_retained(self, count: int = 1) -> None:
+        with self._cond:
+            self._retained = max(self._retained - count, 0)
+            if not self._retained and self._writer is None and not self._readers:
+                self._unlock()
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self._waits_ms)
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "total_wait_ms": round(sum(waits), 3),
+            "max_wait_ms": round(waits[-1], 3) if waits else 0.0,
+            "p99_wait_ms": round(
+                waits[min(int(0.99 * len(waits)), len(waits) - 1)], 3
+            ) if waits else 0.0,
+        }
+
+    # === Читатели ===
+    def _acquire_shared(self) -> None:
+        me = threading.get_ident()
+        start = time.perf_counter()
+        contended = False
+        with self._cond:
+            if self._writer == me:
+                # Чтение под собственной блокировкой на запись
+                self._writer_depth += 1
+                self._push("w")
+                return
+            while self._writer is not None:
+                contended = True
+                self._cond.wait()
+            if self._flock_mode is None:
+                contended |= self._flock(fcntl.LOCK_SH if fcntl else None)
+            self._readers += 1
+            self._push("r")
+        self._record(start, contended)
+
+    def _release_shared(self) -> None:
+        with self._cond:
+            if self._pop() == "w":
+                self._writer_depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers:
+                if not self._retained:
+                    self._unlock()
+                self._cond.notify_all()
+
+    # === Писатель ===
+    def _acquire_exclusive(self) -> None:
+        me = threading.get_ident()
+        start = time.perf_counter()
+        contended = False
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                self._push("w")
+                return
+            if self._held_as_reader():
+                raise RuntimeError(
+                    f"Повышение блокировки чтения до записи не поддерживается: {self.path}" # noqa: E501
+                )
+            while self._writer is not None or self._readers:
+                contended = True
+                self._cond.wait()
+            self._writer = me
+            self._writer_depth = 1
+            self._push("w")
+            if self._flock_mode != getattr(fcntl, "LOCK_EX", None):
+                try:
+                    contended |= self._flock(fcntl.LOCK_EX if fcntl else None)
+                except BaseException:
+                    self._writer = None
+                    self._writer_depth = 0
+                    self._pop()
+                    self._cond.notify_all()
+                    raise
+        self._record(start, contended)
+
+    def _release_exclusive(self) -> None:
+        with self._cond:
+            self._pop()
+            self._writer_depth -= 1
+            if self._writer_depth:
+                return
+            self._writer = None
+            if not self._retained:
+                self._unlock()
+            self._cond.notify_all()
+
+    # === Вспомогательные ===
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _push(self, kind: str) -> None:
+        self._stack().append(kind)
+
+    def _pop(self) -> str:
+        return self._stack().pop()
+
+    def _held_as_reader(self) -> bool:
+        return "r" in self._stack()
+
+    def _flock(self, mode: Optional[int]) -> bool:
+        """Взять flock. Возвращает True, если пришлось ждать другой процесс"""
+        if fcntl is None:
+            self._flock_mode = mode
+            return False
+        if self._fd is None:
+            directory = os.path.dirname(self.lock_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, mode | fcntl.LOCK_NB)
+            contended = False
+        except BlockingIOError:
+            fcntl.flock(self._fd, mode)
+            contended = True
+        self._flock_mode = mode
+        return contended
+
+    def _unlock(self) -> None:
+        if self._flock_mode is None:
+            return
+        if fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._flock_mode = None
+
+    def _record(self, start: float, contended: bool) -> None:
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._cond:
+            self.acquisitions += 1
+            if contended:
+                self.contended += 1
+            self._waits_ms.append(wait_ms)
+
+
+# Одна блокировка на файл на весь процесс
+_locks: Dict[str, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def get_file_lock(path) -> FileLock:
+    path = os.path.abspath(str(path))
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = FileLock(path)
+        return lock
+
+
+def lock_stats() -> Dict[str, Dict[str, float]]:
+    """Ожидание блокировок по файлам: сколько раз брали, сколько ждали"""
+    with _locks_guard:
+        locks = list(_locks.values())
+    return {lock.path: lock.stats() for lock in locks}
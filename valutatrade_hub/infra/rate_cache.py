@@ -0,0 +1,335 @@
+# valutatrade_hub/infra/rate_cache.py
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from valutatrade_hub.core.rate_graph import RateGraph
+from valutatrade_hub.core.rate_matrix import RateMatrix
+from valutatrade_hub.infra.events import rate_events
+from valutatrade_hub.infra.file_cache import Signature, file_signature
+from valutatrade_hub.infra.generation import GenerationWatcher, read_generation
+
+# Общий для процесса кеш курсов из rates.json.
+# Снимок разбирается один раз на каждое значение last_updated;
+# дальше курсы отдаются из словаря. Перед выдачей проверяется
+# только подпись файла (stat), а не его содержимое.
+# Снимки, опубликованные RatesUpdater в шину rate_events, кеш
+# принимает сразу, не читая файл. Текущее состояние — один кортеж
+# (путь, подпись, снимок), который заменяется целиком: чтение идёт
+# без блокировки, блокировка нужна только писателям.
+# Если подпись файла изменилась, сначала сверяется номер поколения
+# из спутника rates.json.gen: совпал — JSON не разбирается.
+# С настройкой rates_watch кеш не делает и stat: об изменениях
+# сообщает фоновый GenerationWatcher (inotify на Linux).
+
+# Курсы по умолчанию, если rates.json ещё не создан
+DEFAULT_RATES = {
+    "USD": 1.0,
+    "EUR": 1.07,
+    "BTC": 60000.0,
+    "ETH": 3000.0,
+    "RUB": 95.0
+}
+
+
+def build_graph(data: Dict[str, Any]) -> RateGraph:
+    """Граф конвертации по всем парам снимка rates.json"""
+    pairs = {}
+    for pair, info in data.get("pairs", {}).items():
+        if not isinstance(info, dict) or "rate" not in info:
+            continue
+        try:
+            pairs[pair] = float(info["rate"])
+        except (ValueError, TypeError):
+            continue
+    return RateGraph(pairs, anchor="USD")
+
+
+def parse_rates(data: Dict[str, Any], graph: Optional[RateGraph] = None) -> Dict[str, float]: # noqa: E501
+    """
+    Снимок rates.json ({"pairs": {...}, "last_updated": ...}) →
+    {"USD": 1.0, "EUR": 1.0786, "RUB": 75.9557, "BTC": 59337.21}
+    Курс к USD есть у любой валюты, связанной с USD цепочкой пар:
+    BTC_USD = 59337 → BTC = 59337; USD_EUR = 0.8407 → EUR = 1 / 0.8407;
+    пара только к EUR (например, XYZ_EUR) пересчитывается через EUR.
+    """
+    if graph is None:
+        graph = build_graph(data)
+    rates = graph.anchored("USD")
+    rates["USD"] = 1.0
+    return rates
+
+
+def canonical_path(path: Any) -> str:
+    """
+    Путь rates.json как ключ кеша: абсолютный, без симлинков.
+    DatabaseManager и RatesUpdater должны попадать в один и тот же ключ,
+    иначе опубликованный снимок отбрасывается как «чужой».
+    """
+    return os.path.realpath(str(path))
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """ISO-строка last_updated → datetime (None, если не разобрать)"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class RateSnapshot:
+    """Разобранный снимок курсов. Не изменяется после создания"""
+
+    __slots__ = (
+        "rates", "last_updated", "ttl_seconds", "graph", "generation", "pairs",
+        "_matrix",
+    )
+
+    def __init__(
+        self,
+        rates: Dict[str, float],
+        last_updated: Optional[datetime],
+        ttl_seconds: float,
+        graph: Optional[RateGraph] = None,
+        generation: Optional[int] = None,
+        pairs: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        self.rates = rates
+        self.last_updated = last_updated
+        self.ttl_seconds = ttl_seconds
+        self.graph = graph
+        self.generation = generation
+        # Исходные котировки {"BTC_USD": {"rate", "updated_at", "source"}}
+        self.pairs = pairs or {}
+        self._matrix: Optional[RateMatrix] = None
+
+    @property
+    def matrix(self) -> RateMatrix:
+        """Матрица кросс-курсов; строится при первом обращении"""
+        if self._matrix is None:
+            if self.graph is not None:
+                self._matrix = RateMatrix.from_graph(self.graph)
+            else:
+                self._matrix = RateMatrix(self.rates)
+        return self._matrix
+
+    def get_rate(self, from_code: str, to_code: str) -> Optional[float]:
+        """1 from_code = ? to_code; None, если пути конвертации нет"""
+        if not self.matrix.connected(from_code, to_code):
+            return None
+        return self.matrix.rate(from_code, to_code)
+
+    def age_seconds(self) -> Optional[float]:
+        """Сколько секунд прошло с last_updated (None — время неизвестно)"""
+        if self.last_updated is None:
+            return None
+        if self.last_updated.tzinfo is None:
+            now = datetime.now()
+        else:
+            now = datetime.now(timezone.utc)
+        return (now - self.last_updated).total_seconds()
+
+    def is_stale(self) -> bool:
+        """Курсы старше rates_ttl_seconds (или без отметки времени)"""
+        age = self.age_seconds()
+        return age is None or age > self.ttl_seconds
+
+
+def make_snapshot(data: Dict[str, Any], ttl: float) -> RateSnapshot:
+    """Снимок курсов по содержимому rates.json ({"pairs": ..., "last_updated": ...})"""
+    # Пути конвертации между всеми валютами считаются здесь, один раз
+    graph = build_graph(data)
+    for pair, residual in graph.inconsistent:
+        print(f"⚠️ [Rates] Котировка {pair} расходится с другими парами на {residual:+.4%}") # noqa: E501
+    last_updated = parse_timestamp(data.get("last_updated"))
+    generation = data.get("generation")
+    if not isinstance(generation, int):
+        generation = None
+    pairs = data.get("pairs")
+    return RateSnapshot(
+        parse_rates(data, graph), last_updated, ttl, graph, generation,
+        pairs if isinstance(pairs, dict) else None,
+    )
+
+
+class RateCache:
+    """
+    Кеш снимков rates.json для всех потребителей курсов:
+    get_exchange_rate, buy/sell, Portfolio.get_total_value, CLI.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # только для писателей
+        self._current: Optional[Tuple[str, Signature, RateSnapshot]] = None
+        self._watcher: Optional[GenerationWatcher] = None
+
+        self.hits = 0
+        self.parses = 0
+        self.published = 0
+
+    def get(self, db) -> RateSnapshot:
+        """Актуальный снимок для db.rates_file (DatabaseManager)"""
+        ttl = db.settings.get("rates_ttl_seconds", 300)
+        path = canonical_path(db.rates_file)
+        watched = self._watched(db, path)
+        current = self._current
+        if (
+            watched
+            and current is not None
+            and current[0] == path
+            and current[2].ttl_seconds == ttl
+        ):
+            # Изменения отслеживает GenerationWatcher — без stat
+            self.hits += 1
+            return current[2]
+
+        signature = file_signature(path)
+        if (
+            current is not None
+            and current[0] == path
+            and current[1] == signature
+            and current[2].ttl_seconds == ttl
+        ):
+            self.hits += 1
+            return current[2]
+
+        with self._lock:
+            snapshot = self._load(db, path, signature, ttl)
+            self._current = (path, signature, snapshot)
+        return snapshot
+
+    def publish(self, snapshot: RateSnapshot, path: str) -> None:
+        """
+        Принять снимок из шины rate_events (файл уже записан).
+        Снимок чужого rates.json игнорируется.
+        """
+        path = canonical_path(path)
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] != path:
+                return
+            self._current = (path, file_signature(path), snapshot)
+            self.published += 1
+
+    def invalidate(self) -> None:
+        """Сбросить снимок (например, после записи rates.json)"""
+        self._current = None
+
+    def stats(self) -> Dict[str, Any]:
+        current = self._current
+        snapshot = current[2] if current is not None else None
+        return {
+            "hits": self.hits,
+            "parses": self.parses,
+            "published": self.published,
+            "generation": snapshot.generation if snapshot else None,
+            "watcher": self._watcher.mode if self._watcher else None,
+            "last_updated": (
+                snapshot.last_updated.isoformat()
+                if snapshot and snapshot.last_updated else None
+            ),
+        }
+
+    # === Вспомогательные ===
+    def _watched(self, db, path: str) -> bool:
+        """Запустить GenerationWatcher для db.rates_file, если включён rates_watch""" # noqa: E501
+        watcher = self._watcher
+        if watcher is not None and watcher.path == path:
+            return True
+        if not db.settings.get("rates_watch", False):
+            return False
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.stop()
+            self._watcher = GenerationWatcher(path, self._on_generation).start()
+            self._current = None
+        return True
+
+    def _on_generation(self, generation: Optional[int]) -> None:
+        """Спутник rates.json.gen сменил номер — сбросить устаревший снимок"""
+        current = self._current
+        if current is None or current[2].generation != generation:
+            self.invalidate()
+
+    def _load(self, db, path: str, signature, ttl: float) -> RateSnapshot:
+        """Прочитать снимок из файла; вызывается под блокировкой"""
+        if signature is None:
+            return RateSnapshot(dict(DEFAULT_RATES), None, ttl)
+
+        # Поколение не сменилось (файл переписан тем же снимком или
+        # только тронут) — JSON не разбираем
+        current = self._current
+        generation = read_generation(path)
+        if (
+            current is not None
+            and generation is not None
+            and current[0] == path
+            and current[2].generation == generation
+        ):
+            return self._reuse(current[2], ttl)
+
+        try:
+            data = db._read_rates_data()
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"❌ Ошибка чтения rates.json: {e}")
+            return RateSnapshot({"USD": 1.0}, None, ttl)
+        if not isinstance(data, dict):
+            return RateSnapshot({"USD": 1.0}, None, ttl)
+
+        last_updated = parse_timestamp(data.get("last_updated"))
+
+        # Файл переписан, но снимок тот же (тот же last_updated) —
+        # разобранные курсы переиспользуем
+        if (
+            current is not None
+            and last_updated is not None
+            and current[2].last_updated == last_updated
+            and current[2].generation == data.get("generation")
+            and current[0] == path
+        ):
+            return self._reuse(current[2], ttl)
+
+        # Котировки те же, обновлена только отметка свежести
+        # (RatesUpdater без изменившихся пар) — граф не перестраиваем
+        if (
+            current is not None
+            and current[0] == path
+            and current[2].pairs
+            and current[2].pairs == data.get("pairs")
+        ):
+            generation = data.get("generation")
+            return self._reuse(
+                current[2], ttl, last_updated,
+                generation if isinstance(generation, int) else None,
+            )
+
+        self.parses += 1
+        return make_snapshot(data, ttl)
+
+    @staticmethod
+    def _reuse(
+        previous: RateSnapshot,
+        ttl: float,
+        last_updated: Optional[datetime] = None,
+        generation: Optional[int] = None,
+    ) -> RateSnapshot:
+        """Тот же разбор курсов; отметку времени и поколение можно сменить"""
+        reused = RateSnapshot(
+            previous.rates, last_updated or previous.last_updated, ttl,
+            previous.graph,
+            previous.generation if generation is None else generation,
+            previous.pairs,
+        )
+        reused._matrix = previous._matrix
+        return reused
+
+
+# --- Глобальный экземпляр ---
+rate_cache = RateCache()
+rate_events.subscribe(rate_cache.publish)
+
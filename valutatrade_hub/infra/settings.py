@@ -72,7 +72,18 @@ class SettingsLoader:
             "rates_ttl_seconds": 300,
             "base_currency": "USD",
             "log_level": "INFO",
-            "log_file": str(project_root / "logs" / "app.log")
+            "log_file": str(project_root / "logs" / "app.log"),
+            "storage_backend": "json",
+            "sqlite_file": "valutatrade.db",
+            "portfolio_layout": "single",
+            "trade_journal": False,
+            "journal_compact_threshold": 1000,
+            "file_cache": True,
+            "write_batch_window_ms": 0,
+            "write_wait_durable": True,
+            "data_format": "json",
+            "refuse_stale_trades": False,
+            "rates_watch": False
         }
 
     '''
@@ -112,6 +123,15 @@ class SettingsLoader:
         """
         return self._settings.get(key, default)
 
+    def data_path(self) -> Path:
+        """
+        Каталог данных из data_dir: относительный путь — от корня проекта.
+        Общий для DatabaseManager и parser_service: оба работают с одним
+        rates.json.
+        """
+        project_root = Path(__file__).parent.parent.parent
+        return project_root / self.get("data_dir", "data")
+
     def reload(self) -> None:
         """
         Перезагрузить конфигурацию.
@@ -0,0 +1,187 @@
+# valutatrade_hub/infra/sharded_portfolios.py
+
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Mapping
+from typing import Iterator, Optional
+
+from valutatrade_hub.core.models import Portfolio
+from valutatrade_hub.infra.codec import CodecError, read_records
+from valutatrade_hub.infra.locking import get_file_lock
+
+# Шардированное хранение портфелей: data/portfolios/<bucket>/<user_id>.json
+# Загрузка и сохранение одного портфеля трогает ровно один маленький файл.
+
+# Число корзин фиксировано: от него зависит путь к файлу портфеля
+SHARD_BUCKETS = 256
+
+# Метка в корне: portfolios.json разложен полностью
+MIGRATED_MARKER = ".migrated"
+
+
+class ShardedPortfolioStore:
+    """Портфели по одному файлу на пользователя, разложенные по корзинам"""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def bucket_for(self, user_id: int) -> str:
+        """Имя корзины: две hex-цифры от user_id"""
+        return f"{user_id % SHARD_BUCKETS:02x}"
+
+    def path_for(self, user_id: int) -> str:
+        return os.path.join(self.root_dir, self.bucket_for(user_id), f"{user_id}.json")
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.root_dir)
+
+    def load(self, user_id: int) -> Optional[Portfolio]:
+        """Прочитать портфель из его шарда или None, если файла нет"""
+        path = self.path_for(user_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return Portfolio.from_storage(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"⚠️ Ошибка загрузки {path}: {e}")
+            return None
+
+    def save(self, portfolio: Portfolio) -> None:
+        """Записать один шард атомарно: временный файл → rename"""
+        path = self.path_for(portfolio.user_id)
+        bucket_dir = os.path.dirname(path)
+        os.makedirs(bucket_dir, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=bucket_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(portfolio.to_dict(), f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def iter_user_ids(self) -> Iterator[int]:
+        """Обойти шарды, не читая их содержимого"""
+        if not self.exists():
+            return
+        for bucket in sorted(os.listdir(self.root_dir)):
+            bucket_dir = os.path.join(self.root_dir, bucket)
+            if not os.path.isdir(bucket_dir):
+                continue
+            for name in os.listdir(bucket_dir):
+                stem, ext = os.path.splitext(name)
+                if ext == ".json" and stem.isdigit():
+                    yield int(stem)
+
+    def migrated(self) -> bool:
+        """Раскладка portfolios.json завершена (есть метка в корне)"""
+        return os.path.exists(os.path.join(self.root_dir, MIGRATED_MARKER))
+
+    def migrate_from(self, portfolios_file: str) -> int:
+        """
+        Разложить монолитный portfolios.json по шардам. Возвращает число
+        разложенных портфелей.
+        Идёт под исключительной блокировкой portfolios.json: второй процесс
+        дождётся и увидит метку. Шарды собираются во временном каталоге,
+        который вместе с меткой переименовывается в корень, — оборванная
+        миграция не оставляет полупустого корня.
+        """
+        with get_file_lock(portfolios_file).exclusive():
+            if self.migrated():
+                return 0
+            data = []
+            if os.path.exists(portfolios_file):
+                try:
+                    data = read_records(portfolios_file)
+                except (json.JSONDecodeError, CodecError, OSError) as e:
+                    # Метку не ставим: миграция повторится при следующем запуске
+                    print(f"⚠️ [Migration] Ошибка чтения {portfolios_file}: {e}")
+                    return 0
+
+            if self.exists():
+                # Корень без метки: миграция оборвалась до появления метки.
+                # Докладываем недостающие шарды; имеющиеся не трогаем —
+                # они могут быть новее portfolios.json
+                count = 0
+                for item in data:
+                    portfolio = Portfolio.from_storage(item)
+                    if not os.path.exists(self.path_for(portfolio.user_id)):
+                        self.save(portfolio)
+                        count += 1
+                _write_marker(self.root_dir)
+            else:
+                parent = os.path.dirname(os.path.abspath(self.root_dir))
+                os.makedirs(parent, exist_ok=True)
+                staging_dir = tempfile.mkdtemp(prefix=".portfolios-", dir=parent)
+                try:
+                    staging = ShardedPortfolioStore(staging_dir)
+                    for item in data:
+                        staging.save(Portfolio.from_storage(item))
+                    _write_marker(staging_dir)
+                    os.replace(staging_dir, self.root_dir)
+                except BaseException:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+                    raise
+                count = len(data)
+
+        if count:
+            print(f"📦 [Migration] {count} портфелей разложено по шардам в {self.root_dir}") # noqa: E501
+        return count
+
+
+def _write_marker(root_dir: str) -> None:
+    """Метка завершённой миграции; пишется последней, с fsync"""
+    with open(os.path.join(root_dir, MIGRATED_MARKER), "w", encoding="utf-8") as f:
+        f.write("1\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class LazyPortfolios(Mapping):
+    """
+    Ленивое представление всех портфелей: user_id → Portfolio.
+    Шард читается только при обращении к конкретному портфелю,
+    поэтому обход для отчётов не держит все портфели в памяти.
+    Если передан журнал сделок, его хвост накладывается на каждый шард.
+    """
+
+    def __init__(self, store: ShardedPortfolioStore, journal=None):
+        self._store = store
+        self._journal = journal
+
+    def __getitem__(self, user_id: int) -> Portfolio:
+        if self._journal is None:
+            portfolio = self._store.load(user_id)
+        else:
+            with self._journal.lock:
+                portfolio = self._store.load(user_id)
+                if self._journal.has_records(user_id):
+                    portfolio = self._journal.apply(
+                        portfolio or Portfolio(user_id=user_id)
+                    )
+        if portfolio is None:
+            raise KeyError(user_id)
+        return portfolio
+
+    def __contains__(self, user_id) -> bool:
+        if not isinstance(user_id, int):
+            return False
+        if self._journal is not None and self._journal.has_records(user_id):
+            return True
+        return os.path.exists(self._store.path_for(user_id))
+
+    def __iter__(self) -> Iterator[int]:
+        yield from self._store.iter_user_ids()
+        if self._journal is not None:
+            # Портфели, которые пока есть только в журнале
+            for user_id in self._journal.user_ids():
+                if not os.path.exists(self._store.path_for(user_id)):
+                    yield user_id
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
@@ -0,0 +1,254 @@
+# valutatrade_hub/infra/sqlite_backend.py
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from valutatrade_hub.core.exceptions import UserAlreadyExistsError
+from valutatrade_hub.core.models import Portfolio, User
+from valutatrade_hub.infra.backends import BaseStorageBackend
+from valutatrade_hub.infra.codec import CodecError, read_records
+
+# SQLite-хранилище: одна сделка = обновление одной строки,
+# а не перезапись всего portfolios.json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id           INTEGER PRIMARY KEY,
+    username          TEXT    NOT NULL,
+    hashed_password   TEXT    NOT NULL,
+    salt              TEXT    NOT NULL,
+    registration_date TEXT    NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username);
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    user_id INTEGER PRIMARY KEY,
+    wallets TEXT    NOT NULL
+);
+"""
+
+# Одно соединение на файл БД на весь процесс:
+# usecases создают DatabaseManager() на каждый вызов.
+# Транзакция у соединения одна на всех, поэтому и блокировка записи —
+# одна на соединение, а не на экземпляр бэкенда
+_connections: Dict[str, sqlite3.Connection] = {}
+_write_locks: Dict[str, threading.Lock] = {}
+_connections_lock = threading.Lock()
+
+
+def _get_connection(db_path: str) -> Tuple[sqlite3.Connection, threading.Lock]:
+    """Открыть (или переиспользовать) соединение в режиме WAL и его блокировку"""
+    with _connections_lock:
+        conn = _connections.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            _connections[db_path] = conn
+            _write_locks[db_path] = threading.Lock()
+        return conn, _write_locks[db_path]
+
+
+class SqliteStorageBackend(BaseStorageBackend):
+    """
+    Хранилище на stdlib sqlite3 (WAL).
+    users — первичный ключ user_id, уникальный индекс по username.
+    portfolios — первичный ключ user_id, кошельки лежат JSON-строкой.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        db_name: str = "valutatrade.db",
+        auto_migrate: bool = True,
+    ):
+        self.db_path = os.path.join(data_dir, db_name)
+        is_new = not os.path.exists(self.db_path)
+        self.conn, self._lock = _get_connection(self.db_path)
+
+        # Первый запуск — переносим данные из JSON-файлов
+        if is_new and auto_migrate:
+            migrate_json_to_sqlite(
+                users_file=os.path.join(data_dir, "users.json"),
+                portfolios_file=os.path.join(data_dir, "portfolios.json"),
+                backend=self,
+            )
+
+    # === Пользователи ===
+    def load_users(self) -> List[User]:
+        rows = self.conn.execute(
+            "SELECT user_id, username, hashed_password, salt, registration_date "
+            "FROM users ORDER BY user_id"
+        ).fetchall()
+        return [self._row_to_user(row) for row in rows]
+
+    def load_users_dict(self) -> Dict[int, User]:
+        return {user.user_id: user for user in self.load_users()}
+
+    def iter_users(self) -> Iterator[User]:
+        # Курсор отдаёт строки по мере обхода, без fetchall
+        cursor = self.conn.execute(
+            "SELECT user_id, username, hashed_password, salt, registration_date "
+            "FROM users ORDER BY user_id"
+        )
+        for row in cursor:
+            yield self._row_to_user(row)
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        row = self.conn.execute(
+            "SELECT user_id, username, hashed_password, salt, registration_date "
+            "FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return self._row_to_user(row) if row else None
+
+    def find_user_id(self, username: str) -> Optional[int]:
+        # Поиск по уникальному индексу idx_users_username
+        row = self.conn.execute(
+            "SELECT user_id FROM users WHERE username = ?", (username.strip(),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def next_user_id(self) -> int:
+        # MAX по первичному ключу — это спуск по B-дереву, а не полный обход
+        cursor = self.conn.execute("SELECT COALESCE(MAX(user_id), 0) FROM users")
+        return cursor.fetchone()[0] + 1
+
+    def save_user(self, user: User) -> None:
+        data = user.to_dict()
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO users (user_id, username, hashed_password, salt, "
+                    "registration_date) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET "
+                    "username = excluded.username, "
+                    "hashed_password = excluded.hashed_password, "
+                    "salt = excluded.salt, "
+                    "registration_date = excluded.registration_date",
+                    (data["user_id"], data["username"], data["hashed_password"],
+                     data["salt"], data["registration_date"]),
+                )
+        except sqlite3.IntegrityError:
+            # Сработал уникальный индекс по username
+            raise UserAlreadyExistsError(user.username)
+
+    # === Портфели ===
+    def load_portfolio(self, user_id: int) -> Optional[Portfolio]:
+        row = self.conn.execute(
+            "SELECT user_id, wallets FROM portfolios WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return self._row_to_portfolio(row) if row else None
+
+    def load_portfolios(self) -> Dict[int, Portfolio]:
+        rows = self.conn.execute(
+            "SELECT user_id, wallets FROM portfolios ORDER BY user_id"
+        ).fetchall()
+        return {row[0]: self._row_to_portfolio(row) for row in rows}
+
+    def iter_portfolios(self) -> Iterator[Portfolio]:
+        cursor = self.conn.execute(
+            "SELECT user_id, wallets FROM portfolios ORDER BY user_id"
+        )
+        for row in cursor:
+            yield self._row_to_portfolio(row)
+
+    def save_portfolio(self, portfolio: Portfolio) -> None:
+        wallets = json.dumps(portfolio.to_dict()["wallets"], ensure_ascii=False)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO portfolios (user_id, wallets) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET wallets = excluded.wallets",
+                (portfolio.user_id, wallets),
+            )
+
+    # === Вспомогательные ===
+    @staticmethod
+    def _row_to_user(row) -> User:
+        return User(
+            user_id=row[0],
+            username=row[1],
+            hashed_password=row[2],
+            salt=row[3],
+            registration_date=datetime.fromisoformat(row[4]),
+        )
+
+    @staticmethod
+    def _row_to_portfolio(row) -> Portfolio:
+        return Portfolio.from_storage(
+            {"user_id": row[0], "wallets": json.loads(row[1])}
+        )
+
+
+def migrate_json_to_sqlite(
+    users_file: str,
+    portfolios_file: str,
+    backend: SqliteStorageBackend,
+) -> Dict[str, int]:
+    """
+    Одноразовый перенос users.json и portfolios.json в SQLite.
+    Выполняется одной транзакцией; повторный запуск безопасен (upsert
+    по user_id). Имя, занятое пользователем с другим user_id, — ошибка:
+    UserAlreadyExistsError, транзакция откатывается.
+    :return: количество перенесённых записей {"users": N, "portfolios": M}
+    """
+    users, portfolios = [], []
+
+    if os.path.exists(users_file):
+        try:
+            users = read_records(users_file)
+        except (json.JSONDecodeError, CodecError, OSError) as e:
+            print(f"⚠️ [Migration] Ошибка чтения {users_file}: {e}")
+
+    if os.path.exists(portfolios_file):
+        try:
+            portfolios = read_records(portfolios_file)
+        except (json.JSONDecodeError, CodecError, OSError) as e:
+            print(f"⚠️ [Migration] Ошибка чтения {portfolios_file}: {e}")
+
+    with backend._lock, backend.conn:
+        # Не INSERT OR REPLACE: при конфликте уникального индекса по username
+        # он молча удалил бы уже существующую строку
+        for u in users:
+            try:
+                backend.conn.execute(
+                    "INSERT INTO users (user_id, username, hashed_password, "
+                    "salt, registration_date) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET "
+                    "username = excluded.username, "
+                    "hashed_password = excluded.hashed_password, "
+                    "salt = excluded.salt, "
+                    "registration_date = excluded.registration_date",
+                    (u["user_id"], u["username"], u["hashed_password"], u["salt"],
+                     u["registration_date"]),
+                )
+            except sqlite3.IntegrityError:
+                print(f"❌ [Migration] Имя '{u['username']}' (user_id={u['user_id']}) уже занято другим пользователем") # noqa: E501
+                raise UserAlreadyExistsError(u["username"])
+        backend.conn.executemany(
+            "INSERT OR REPLACE INTO portfolios (user_id, wallets) VALUES (?, ?)",
+            [(p["user_id"], json.dumps(p["wallets"], ensure_ascii=False))
+             for p in portfolios],
+        )
+
+    if users or portfolios:
+        print(f"📦 [Migration] Перенесено в SQLite: {len(users)} пользователей, "
+              f"{len(portfolios)} портфелей")
+    return {"users": len(users), "portfolios": len(portfolios)}
+
+
+if __name__ == "__main__":
+    # Ручной запуск миграции: python -m valutatrade_hub.infra.sqlite_backend
+    from valutatrade_hub.infra.database import DatabaseManager
+
+    db = DatabaseManager()
+    target = SqliteStorageBackend(
+        data_dir=db.data_dir,
+        db_name=db.settings.get("sqlite_file", "valutatrade.db"),
+        auto_migrate=False,
+    )
+    migrate_json_to_sqlite(db.users_file, db.portfolios_file, target)
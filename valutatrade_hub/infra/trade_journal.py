@@ -0,0 +1,317 @@
+# valutatrade_hub/infra/trade_journal.py
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from valutatrade_hub.core.exceptions import StorageError
+from valutatrade_hub.core.models import Portfolio
+from valutatrade_hub.infra.locking import get_file_lock
+
+# Журнал сделок (write-ahead log) для портфелей.
+# Сделка = одна дописанная строка в конец файла, без перезаписи портфелей.
+# Состояние портфеля = последний чекпоинт (обычное хранилище) + хвост журнала.
+#
+# Формат строки — компактный JSON-массив:
+#   ["d", seq, user_id, currency, delta, rate, timestamp]  — изменение баланса
+#   ["s", seq, user_id, wallets, timestamp]                — полный снимок портфеля
+#
+# Выдача seq, дозапись и компакция идут под исключительной блокировкой
+# файла журнала (flock, см. locking.py): другой процесс не получит тот же
+# seq и не допишет строку, которую компакция тут же сотрёт.
+
+# Нога сделки: (валюта, изменение баланса, курс к USD)
+TradeLeg = Tuple[str, float, float]
+
+
+class TradeJournal:
+    """
+    Журнал одного файла. Один экземпляр на процесс (см. get_journal):
+    usecases создают DatabaseManager на каждый вызов, а разобранный
+    хвост журнала должен переживать эти вызовы.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.checkpoint_path = path + ".checkpoint"
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._file_lock = get_file_lock(path)
+        self._compacting = False
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._reset_index()
+
+    # === Индекс хвоста журнала ===
+    def _reset_index(self) -> None:
+        self._records: Dict[int, List[list]] = {}  # user_id → записи по порядку
+        self._offset = 0          # сколько байт файла уже разобрано
+        self._inode = None        # чтобы заметить компакцию другим процессом
+        self._count = 0           # число записей в хвосте
+        self._checkpoint_mtime = self._stat_checkpoint()
+        self._watermark = self._read_watermark()
+        self._next_seq = self._watermark + 1
+
+    def _stat_checkpoint(self) -> Optional[int]:
+        try:
+            return os.stat(self.checkpoint_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read_watermark(self) -> int:
+        """Последний seq, уже вошедший в чекпоинт"""
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return int(json.load(f).get("seq", 0))
+        except (FileNotFoundError, json.JSONDecodeError, ValueError, TypeError):
+            return 0
+
+    def _write_watermark(self, seq: int) -> None:
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "compacted_at": datetime.now().isoformat()}, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _refresh(self) -> None:
+        """Дочитать новые строки журнала (в том числе дописанные другим процессом)"""
+        # Другой процесс сделал компакцию — начинаем с нового чекпоинта
+        if self._stat_checkpoint() != self._checkpoint_mtime:
+            self._reset_index()
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._offset:
+                self._reset_index()
+            return
+
+        # Файл заменён или усечён компакцией — перечитываем с начала
+        if self._inode is not None and (st.st_ino != self._inode or st.st_size < self._offset): # noqa: E501
+            self._reset_index()
+        self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+
+        # Неполную последнюю строку (запись в процессе) оставляем на потом
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ [Journal] Пропущена повреждённая запись в {self.path}")
+                continue
+            seq = record[1]
+            self._next_seq = max(self._next_seq, seq + 1)
+            if seq <= self._watermark:
+                continue  # уже в чекпоинте
+            self._records.setdefault(record[2], []).append(record)
+            self._count += 1
+        self._offset += end
+
+    # === Запись ===
+    def append_trade(self, user_id: int, legs: Iterable[TradeLeg]) -> None:
+        """Дописать ноги сделки одной операцией записи"""
+        timestamp = datetime.now().isoformat()
+        with self._lock, self._file_lock.exclusive():
+            self._refresh()
+            lines = []
+            for currency, delta, rate in legs:
+                lines.append(["d", self._next_seq, user_id, currency, delta, rate, timestamp]) # noqa: E501
+                self._next_seq += 1
+            self._append(lines)
+
+    def append_snapshot(self, portfolio: Portfolio) -> None:
+        """Дописать полный снимок портфеля (замена всех балансов)"""
+        timestamp = datetime.now().isoformat()
+        with self._lock, self._file_lock.exclusive():
+            self._refresh()
+            wallets = portfolio.to_dict()["wallets"]
+            self._append([["s", self._next_seq, portfolio.user_id, wallets, timestamp]])
+            self._next_seq += 1
+
+    def _append(self, records: List[list]) -> None:
+        """Дописать записи; вызывается под исключительной блокировкой файла"""
+        data = "".join(
+            json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for r in records
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        # Свои записи сразу попадают в индекс при следующем _refresh
+        self._refresh()
+
+    # === Чтение ===
+    def pending_count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def user_ids(self) -> List[int]:
+        """Пользователи, у которых есть записи в хвосте"""
+        with self._lock:
+            self._refresh()
+            return list(self._records)
+
+    def has_records(self, user_id: int) -> bool:
+        with self._lock:
+            self._refresh()
+            return user_id in self._records
+
+    def apply(self, portfolio: Portfolio) -> Portfolio:
+        """Наложить хвост журнала на портфель из чекпоинта"""
+        with self._lock:
+            self._refresh()
+            records = list(self._records.get(portfolio.user_id, ()))
+        return _apply_records(portfolio, records)
+
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        Под этой блокировкой чекпоинт и хвост читаются согласованно:
+        компакция не вклинится между чтением чекпоинта и наложением хвоста.
+        """
+        return self._lock
+
+    # === Компакция ===
+    def compact(
+        self,
+        load_checkpoint: Callable[[List[int]], Dict[int, Optional[Portfolio]]],
+        save_checkpoint: Callable[[List[Portfolio]], None],
+    ) -> int:
+        """
+        Свернуть журнал в новый чекпоинт и усечь его.
+
+        Порядок шагов делает компакцию безопасной при сбое на любом из них:
+        1. в журнал дописываются снимки ("s") свёрнутых портфелей;
+        2. портфели сохраняются в чекпоинт;
+        3. в файл отметки пишется последний seq;
+        4. журнал усекается.
+        Упали до шага 3 — при чтении дельты снова наложатся на чекпоинт
+        (старый или уже новый), но следом идущий снимок заменит балансы
+        целиком: дважды ничего не применится. После шага 3 все записи
+        не новее отметки пропускаются.
+        :param load_checkpoint: загрузка портфелей из чекпоинта по списку user_id
+        :param save_checkpoint: сохранение пачки портфелей в чекпоинт
+        :return: число свёрнутых записей
+        """
+        with self._lock, self._file_lock.exclusive():
+            self._refresh()
+            if not self._count:
+                return 0
+
+            user_ids = list(self._records)
+            base = load_checkpoint(user_ids)
+            folded = []
+            for user_id in user_ids:
+                portfolio = base.get(user_id) or Portfolio(user_id=user_id)
+                folded.append(_apply_records(portfolio, self._records[user_id]))
+
+            timestamp = datetime.now().isoformat()
+            snapshots = []
+            for portfolio in folded:
+                wallets = portfolio.to_dict()["wallets"]
+                snapshots.append(["s", self._next_seq, portfolio.user_id, wallets, timestamp]) # noqa: E501
+                self._next_seq += 1
+            self._append(snapshots)
+            last_seq = self._next_seq - 1
+
+            save_checkpoint(folded)
+            self._write_watermark(last_seq)
+            with open(self.path, "w", encoding="utf-8"):
+                pass
+
+            count = self._count - len(snapshots)
+            self._reset_index()
+            print(f"🗜️ [Journal] Свёрнуто {count} записей в чекпоинт")
+            return count
+
+    def compact_in_background(self, load_checkpoint, save_checkpoint) -> bool:
+        """Запустить компакцию в фоновом потоке, если она ещё не идёт"""
+        with self._lock:
+            if self._compacting:
+                return False
+            self._compacting = True
+
+        def run():
+            try:
+                self.compact(load_checkpoint, save_checkpoint)
+            except Exception as e:
+                print(f"❌ [Journal] Ошибка компакции: {e}")
+            finally:
+                self._compacting = False
+
+        # Не daemon: при выходе интерпретатор дождётся конца компакции,
+        # а не оборвёт её посреди записи чекпоинта
+        self._compaction_thread = threading.Thread(
+            target=run, name="journal-compaction"
+        )
+        self._compaction_thread.start()
+        return True
+
+    def wait_compaction(self, timeout: Optional[float] = None) -> None:
+        """Дождаться фоновой компакции, если она идёт"""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+def _apply_records(portfolio: Portfolio, records: List[list]) -> Portfolio:
+    """
+    Наложить записи на копию портфеля: исходный объект может быть
+    общим (кеш файлов DatabaseManager) и меняться не должен.
+    """
+    if not records:
+        return portfolio
+    portfolio = Portfolio.from_storage(portfolio.to_dict())
+    for record in records:
+        portfolio = _apply_record(portfolio, record)
+    return portfolio
+
+
+def _apply_record(portfolio: Portfolio, record: list) -> Portfolio:
+    """Применить одну запись журнала к портфелю"""
+    if record[0] == "s":
+        return Portfolio.from_storage({"user_id": record[2], "wallets": record[3]})
+
+    _, seq, user_id, currency, delta, _, _ = record
+    wallet = portfolio.get_wallet(currency)
+    if wallet is None:
+        portfolio.add_currency(currency, initial_balance=0.0)
+        wallet = portfolio.get_wallet(currency)
+    # Округление как в Wallet.deposit/withdraw
+    balance = round(wallet.balance + delta, 6)
+    if balance < 0:
+        # Wallet.withdraw не допускает овердрафта: отрицательный баланс —
+        # потерянная или переставленная запись. Не «чиним», а сообщаем
+        message = (
+            f"Журнал сделок несогласован: запись seq={seq} уводит баланс "
+            f"{currency} пользователя {user_id} в минус ({balance})"
+        )
+        print(f"❌ [Journal] {message}")
+        raise StorageError(message)
+    wallet.balance = balance
+    return portfolio
+
+
+# Один журнал на файл на весь процесс
+_journals: Dict[str, TradeJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path: str, fsync: bool = True) -> TradeJournal:
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = TradeJournal(path, fsync=fsync)
+            _journals[path] = journal
+        return journal
@@ -0,0 +1,234 @@
+# valutatrade_hub/infra/user_index.py
+
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+from valutatrade_hub.core.models import User
+from valutatrade_hub.infra.file_cache import file_signature
+from valutatrade_hub.infra.locking import get_file_lock
+
+# Индекс username → user_id и монотонная последовательность user_id.
+# Хранится рядом с users.json и помнит подпись users.json, по которой
+# был построен: если файл поменяли в обход DatabaseManager — индекс
+# перестраивается.
+#
+# На диске — база users.index.json и журнал users.index.log. Выдача id
+# и регистрация дописывают в журнал одну строку:
+#   ["n", next_user_id]                 — продвинута последовательность
+#   ["u", username, user_id, source]    — учтён пользователь
+# Когда строк в журнале становится больше, чем пользователей (но не
+# меньше LOG_COMPACT_MIN), он сворачивается в базу: в среднем запись
+# стоит O(1), а не перезапись всего индекса.
+# Строки идемпотентны (id — максимум, имя — присваивание), поэтому
+# повторное чтение журнала поверх базы ничего не портит.
+
+LOG_COMPACT_MIN = 1000
+
+
+class UserIndex:
+    """Индекс пользователей для O(1) входа и проверки при регистрации"""
+
+    def __init__(self, users_file: str):
+        self.users_file = users_file
+        self.path = os.path.splitext(users_file)[0] + ".index.json"
+        self.log_path = os.path.splitext(users_file)[0] + ".index.log"
+        self._lock = threading.Lock()
+        self._usernames: Optional[Dict[str, int]] = None
+        self._by_id: Dict[int, str] = {}
+        self._next_user_id = 1
+        self._source = None  # подпись users.json, по которой построен индекс
+        # Что из файлов индекса уже прочитано
+        self._base = None     # подпись users.index.json
+        self._log_offset = 0
+        self._log_lines = 0
+
+    # === Публичные методы ===
+    def find(self, username: str, load_users: Callable[[], Iterable[User]]) -> Optional[int]: # noqa: E501
+        """user_id по имени пользователя или None"""
+        # Порядок блокировок везде один: users.json → индекс в памяти →
+        # файл индекса (см. allocate_user_id)
+        with get_file_lock(self.users_file).shared(), self._lock:
+            self._ensure_fresh(load_users)
+            return self._usernames.get(username.strip())
+
+    def allocate_user_id(self, load_users: Callable[[], Iterable[User]]) -> int:
+        """
+        Выдать следующий user_id. Выданные id не переиспользуются.
+        Выдача идёт под исключительной блокировкой users.json — той же,
+        что у save_user: два процесса не получат один и тот же id.
+        """
+        with get_file_lock(self.users_file).exclusive(), self._lock:
+            with get_file_lock(self.path).exclusive():
+                self._ensure_fresh(load_users)
+                user_id = self._next_user_id
+                self._next_user_id += 1
+                self._append(["n", self._next_user_id])
+                return user_id
+
+    def record(self, user: User) -> None:
+        """Учесть пользователя, только что записанного в users.json"""
+        with self._lock:
+            if self._usernames is None:
+                return  # индекс ещё не строился — построится при первом обращении
+            with get_file_lock(self.path).exclusive():
+                self._sync()
+                self._apply(user.username, user.user_id)
+                self._source = file_signature(self.users_file)
+                source = list(self._source) if self._source else None
+                self._append(["u", user.username, user.user_id, source])
+
+    # === Вспомогательные ===
+    def _ensure_fresh(self, load_users: Callable[[], Iterable[User]]) -> None:
+        # Сначала то, что дописали в индекс другие процессы, — это дешевле,
+        # чем разбор users.json
+        self._sync()
+        signature = file_signature(self.users_file)
+        if self._usernames is not None and self._source == signature:
+            return
+
+        # Индекса нет или он устарел — перестраиваем
+        next_user_id = self._next_user_id
+        self._usernames = {}
+        self._by_id = {}
+        for user in load_users():
+            self._usernames[user.username] = user.user_id
+            self._by_id[user.user_id] = user.username
+            next_user_id = max(next_user_id, user.user_id + 1)
+        self._next_user_id = next_user_id
+        self._source = signature
+        with get_file_lock(self.path).exclusive():
+            self._sync(keep_memory=True)
+            self._compact()
+
+    def _apply(self, username: str, user_id: int) -> None:
+        old_name = self._by_id.get(user_id)
+        if old_name is not None and old_name != username:
+            self._usernames.pop(old_name, None)
+        self._usernames[username] = user_id
+        self._by_id[user_id] = username
+        self._next_user_id = max(self._next_user_id, user_id + 1)
+
+    def _sync(self, keep_memory: bool = False) -> None:
+        """
+        Дочитать изменения файлов индекса. Если базу переписали
+        (компакция другим процессом) — перечитать базу и журнал целиком.
+        keep_memory — только продвинуть последовательность, не трогая
+        имена (при перестроении по users.json).
+        """
+        base = file_signature(self.path)
+        if base is None:
+            return  # индекса на диске нет — построится из users.json
+        log = file_signature(self.log_path)
+        log_size = log[1] if log else 0
+        reload = base != self._base or self._usernames is None or log_size < self._log_offset # noqa: E501
+        if not reload and log_size == self._log_offset:
+            return
+
+        with get_file_lock(self.path).shared():
+            if reload:
+                data = self._read()
+                if data is None:
+                    return
+                if not keep_memory:
+                    self._usernames = dict(data.get("usernames", {}))
+                    self._by_id = {uid: name for name, uid in self._usernames.items()}
+                    self._source = _as_signature(data.get("source"))
+                self._next_user_id = max(
+                    self._next_user_id, int(data.get("next_user_id", 1))
+                )
+                self._base = base
+                self._log_offset = 0
+                self._log_lines = 0
+            self._replay_log(keep_memory)
+
+    def _replay_log(self, keep_memory: bool) -> None:
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        # Недописанную последнюю строку оставляем на потом
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._log_lines += 1
+            if entry[0] == "n":
+                self._next_user_id = max(self._next_user_id, int(entry[1]))
+            elif entry[0] == "u" and not keep_memory:
+                self._apply(entry[1], int(entry[2]))
+                self._source = _as_signature(entry[3])
+        self._log_offset += end
+
+    def _append(self, entry: list) -> None:
+        """Дописать строку в журнал; вызывается под блокировкой файла индекса"""
+        if self._base is None or file_signature(self.path) != self._base:
+            # Базы нет (или её переписали) — строка в журнале ей не к чему
+            self._compact()
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._log_lines += 1
+            self._log_offset = os.path.getsize(self.log_path)
+        except OSError as e:
+            print(f"⚠️ Не удалось дописать индекс пользователей {self.log_path}: {e}")
+            return
+        if self._log_lines > max(LOG_COMPACT_MIN, len(self._usernames or ())):
+            self._compact()
+
+    def _read(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _compact(self) -> None:
+        """
+        Свернуть индекс в базу и очистить журнал: временный файл → rename.
+        Вызывается под исключительной блокировкой файла индекса.
+        """
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "source": list(self._source) if self._source else None,
+                    "next_user_id": self._next_user_id,
+                    "usernames": self._usernames or {},
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            # Сначала база, потом усечение. Читатели ждут на блокировке;
+            # упадём между шагами — строки журнала идемпотентны
+            with open(self.log_path, "w", encoding="utf-8"):
+                pass
+            self._base = file_signature(self.path)
+            self._log_offset = 0
+            self._log_lines = 0
+        except OSError as e:
+            # Индекс — лишь ускоритель: без файла он перестроится
+            print(f"⚠️ Не удалось сохранить индекс пользователей {self.path}: {e}")
+
+
+def _as_signature(value) -> Optional[tuple]:
+    return tuple(value) if isinstance(value, list) else None
+
+
+# Один индекс на файл пользователей на весь процесс
+_indexes: Dict[str, UserIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_user_index(users_file: str) -> UserIndex:
+    with _indexes_lock:
+        index = _indexes.get(users_file)
+        if index is None:
+            index = UserIndex(users_file)
+            _indexes[users_file] = index
+        return index
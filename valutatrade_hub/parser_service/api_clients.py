@@ -1,12 +1,20 @@
 # valutatrade_hub/parser_service/api_clients.py
 
+import hashlib
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from valutatrade_hub.core.exceptions import ApiRequestError
 
+from .storage import load_http_validators, save_http_validators
+
 ''' from .config import COIN_GECKO_URL, EXCHANGE_RATE_URL, CRYPTO_ID_MAP, 
 FIAT_CURRENCIES, CRYPTO_CURRENCIES'''
 from .config import config
@@ -50,9 +58,123 @@ def fetch_fiat_rates() -> Optional[Dict[str, float]]:
         return None
 '''
 
+# --- Общее для синхронных и асинхронных клиентов ---
+class HttpClientMixin:
+    """
+    Повторы с задержкой, условные запросы и учёт времени запроса.
+    Используется BaseApiClient и AsyncBaseApiClient (async_clients.py).
+    """
+
+    # Временные ошибки: повторяем с задержкой
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    # ETag / Last-Modified по эндпоинтам (из http_validators.json)
+    _validators: Optional[Dict[str, Dict[str, str]]] = None
+    _validators_lock = threading.Lock()
+
+    # Последний запрос: request_ms, status_code, attempts (как meta в истории)
+    last_request: Optional[Dict[str, Any]] = None
+
+    # Валидаторы полученных ответов, ещё не закреплённые: их забирает
+    # RatesUpdater (take_validators) и сохраняет только после записи
+    # снимка — иначе при сбое записи следующий опрос получил бы 304
+    # на курсы, которых нет в rates.json
+    _pending_validators: Optional[Dict[str, Dict[str, str]]] = None
+
+    def _conditional(
+        self, url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]] # noqa: E501
+    ) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+        """(ключ эндпоинта, его валидаторы, заголовки с If-None-Match и т.п.)"""
+        key = self._endpoint_key(url, params)
+        validator = self._get_validators().get(key, {})
+        # Новый запрос — незакреплённое от прошлого ответа уже не нужно
+        if self._pending_validators:
+            self._pending_validators.pop(key, None)
+        headers = dict(headers or {})
+        if validator.get("etag"):
+            headers["If-None-Match"] = validator["etag"]
+        if validator.get("last_modified"):
+            headers["If-Modified-Since"] = validator["last_modified"]
+        return key, validator, headers
+
+    def _record(self, start: float, status_code: Optional[int], attempts: int) -> None: # noqa: E501
+        self.last_request = {
+            "request_ms": round((time.perf_counter() - start) * 1000),
+            "status_code": status_code,
+            "attempts": attempts,
+            "not_modified": status_code == 304,
+        }
+
+    def take_validators(self) -> Dict[str, Dict[str, str]]:
+        """Забрать валидаторы последних ответов (до commit_validators)"""
+        pending, self._pending_validators = self._pending_validators or {}, None
+        return pending
+
+    @staticmethod
+    def commit_validators(validators: Dict[str, Dict[str, str]]) -> None:
+        """Закрепить валидаторы: в памяти процесса и в http_validators.json"""
+        if not validators:
+            return
+        HttpClientMixin._get_validators().update(validators)
+        save_http_validators(validators)
+
+    def _remember(self, key: str, validator: Dict[str, str], response) -> None:
+        """Отложить ETag / Last-Modified успешного ответа до take_validators"""
+        etag = response.headers.get("ETag")
+        if etag and self.last_request is not None:
+            self.last_request["etag"] = etag
+        if response.status_code != 200:
+            return
+        new = {
+            name: value for name, value in (
+                ("etag", etag),
+                ("last_modified", response.headers.get("Last-Modified")),
+            ) if value
+        }
+        if new != validator:
+            if self._pending_validators is None:
+                self._pending_validators = {}
+            self._pending_validators[key] = new
+
+    @staticmethod
+    def _get_validators() -> Dict[str, Dict[str, str]]:
+        if HttpClientMixin._validators is None:
+            with HttpClientMixin._validators_lock:
+                if HttpClientMixin._validators is None:
+                    HttpClientMixin._validators = load_http_validators()
+        return HttpClientMixin._validators
+
+    @staticmethod
+    def _endpoint_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        """Ключ эндпоинта — хеш URL: ключ API из пути не попадает в файл"""
+        full = f"{url}?{urlencode(sorted((params or {}).items()))}"
+        return hashlib.sha256(full.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Задержка перед повтором: «полный джиттер» или Retry-After сервера"""
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), config.HTTP_BACKOFF_MAX)
+            except ValueError:
+                pass
+        ceiling = min(config.HTTP_BACKOFF_MAX, config.HTTP_BACKOFF_BASE * 2 ** (attempt - 1)) # noqa: E501
+        return random.uniform(0, ceiling)
+
+
 # --- Абстрактный базовый класс ---
-class BaseApiClient(ABC):
-    """Абстрактный клиент для получения курсов валют"""
+class BaseApiClient(HttpClientMixin, ABC):
+    """
+    Абстрактный клиент для получения курсов валют.
+    Запросы идут через общую на процесс requests.Session с пулом
+    соединений: повторные обновления не открывают TCP/TLS заново.
+    Запросы условные: с If-None-Match / If-Modified-Since по валидаторам
+    прошлого ответа. 304 — курсы не менялись, fetch_rates возвращает {}
+    и отмечает last_request["not_modified"].
+    """
+
+    _session: Optional[requests.Session] = None
+    _session_lock = threading.Lock()
 
     @abstractmethod
     def fetch_rates(self) -> Dict[str, float]:
@@ -62,6 +184,56 @@ class BaseApiClient(ABC):
         """
         pass
 
+    @classmethod
+    def session(cls) -> requests.Session:
+        """Общая сессия всех клиентов (создаётся при первом запросе)"""
+        if BaseApiClient._session is None:
+            with BaseApiClient._session_lock:
+                if BaseApiClient._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=config.HTTP_POOL_SIZE,
+                        pool_maxsize=config.HTTP_POOL_SIZE,
+                    )
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    BaseApiClient._session = session
+        return BaseApiClient._session
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET через общую сессию. На 429/5xx и сетевые сбои — до
+        HTTP_MAX_RETRIES повторов с задержкой base·2^n (не больше
+        HTTP_BACKOFF_MAX) со случайным джиттером; Retry-After учитывается.
+        """
+        kwargs.setdefault("timeout", config.REQUEST_TIMEOUT)
+        key, validator, kwargs["headers"] = self._conditional(
+            url, kwargs.get("params"), kwargs.get("headers")
+        )
+
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                response = self.session().get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout): # noqa: E501
+                if attempt > config.HTTP_MAX_RETRIES:
+                    self._record(start, None, attempt)
+                    raise
+            else:
+                if (
+                    response.status_code not in self.RETRY_STATUSES
+                    or attempt > config.HTTP_MAX_RETRIES
+                ):
+                    self._record(start, response.status_code, attempt)
+                    self._remember(key, validator, response)
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+            time.sleep(self._backoff(attempt, retry_after))
+
 
 # --- Клиент для CoinGecko ---
 class CoinGeckoClient(BaseApiClient):
@@ -71,32 +243,36 @@ class CoinGeckoClient(BaseApiClient):
         if config.COINGECKO_API_KEY:
             self.headers["x-cg-demo-api-key"] = config.COINGECKO_API_KEY
 
-    def fetch_rates(self) -> Dict[str, float]:
+    def request_args(self) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+        """(URL, параметры, заголовки) запроса — общие с асинхронным клиентом"""
         ids = ",".join(config.CRYPTO_ID_MAP[c] for c in config.CRYPTO_CURRENCIES)
         params = {
             "ids": ids,
             "vs_currencies": config.BASE_CURRENCY.lower()
         }
+        return self.url, params, self.headers
+
+    def parse(self, data: Dict[str, Any]) -> Dict[str, float]:
+        """Ответ CoinGecko → {"BTC_USD": ...}"""
+        result = {}
+        for code in config.CRYPTO_CURRENCIES:
+            coin_id = config.CRYPTO_ID_MAP[code]
+            if coin_id in data and config.BASE_CURRENCY.lower() in data[coin_id]:
+                rate = data[coin_id][config.BASE_CURRENCY.lower()]
+                if isinstance(rate, (int, float)) and rate > 0:
+                    pair = f"{code}_{config.BASE_CURRENCY}"
+                    result[pair] = float(rate)
+        return result
+
+    def fetch_rates(self) -> Dict[str, float]:
+        url, params, headers = self.request_args()
 
         try:
-            response = requests.get(
-                self.url,
-                params=params,
-                headers=self.headers,
-                timeout=config.REQUEST_TIMEOUT
-            )
+            response = self._get(url, params=params, headers=headers)
+            if response.status_code == 304:
+                return {}
             response.raise_for_status()
-            data = response.json()
-
-            result = {}
-            for code in config.CRYPTO_CURRENCIES:
-                coin_id = config.CRYPTO_ID_MAP[code]
-                if coin_id in data and config.BASE_CURRENCY.lower() in data[coin_id]:
-                    rate = data[coin_id][config.BASE_CURRENCY.lower()]
-                    if isinstance(rate, (int, float)) and rate > 0:
-                        pair = f"{code}_{config.BASE_CURRENCY}"
-                        result[pair] = float(rate)
-            return result
+            return self.parse(response.json())
 
         except requests.exceptions.RequestException as e:
             raise ApiRequestError(f"Ошибка запроса к CoinGecko: {e}")
@@ -113,33 +289,41 @@ class ExchangeRateApiClient(BaseApiClient):
             raise ValueError("ExchangeRateApiClient: EXCHANGERATE_API_KEY не задан")
         self.url = f"{config.EXCHANGERATE_API_URL}/{config.EXCHANGERATE_API_KEY}/latest/{config.BASE_CURRENCY}" # noqa: E501
 
+    def request_args(self) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+        """(URL, параметры, заголовки) запроса — общие с асинхронным клиентом"""
+        return self.url, {}, {}
+
+    def parse(self, data: Dict[str, Any]) -> Dict[str, float]:
+        """Ответ ExchangeRate-API → {"EUR_USD": ...}"""
+        if data.get("result") != "success":
+            error = data.get("error-type", "unknown")
+            if error == "invalid-key":
+                raise ApiRequestError("ExchangeRate-API: неверный API-ключ")
+            elif error == "quota-reached":
+                raise ApiRequestError("ExchangeRate-API: достигнут лимит запросов")
+            else:
+                raise ApiRequestError(f"ExchangeRate-API: {error}")
+
+        result = {}
+        # rates = data.get("rates", {})
+        rates = data.get("conversion_rates", {})
+        for code in config.FIAT_CURRENCIES:
+            if code == config.BASE_CURRENCY:
+                continue  # пропускаем базовую
+            if code in rates:
+                rate = rates[code]
+                if isinstance(rate, (int, float)) and rate > 0:
+                    pair = f"{code}_{config.BASE_CURRENCY}"
+                    result[pair] = float(rate)
+        return result
+
     def fetch_rates(self) -> Dict[str, float]:
         try:
-            response = requests.get(self.url, timeout=config.REQUEST_TIMEOUT)
+            response = self._get(self.url)
+            if response.status_code == 304:
+                return {}
             response.raise_for_status()
-            data = response.json()
-
-            if data.get("result") != "success":
-                error = data.get("error-type", "unknown")
-                if error == "invalid-key":
-                    raise ApiRequestError("ExchangeRate-API: неверный API-ключ")
-                elif error == "quota-reached":
-                    raise ApiRequestError("ExchangeRate-API: достигнут лимит запросов")
-                else:
-                    raise ApiRequestError(f"ExchangeRate-API: {error}")
-
-            result = {}
-            # rates = data.get("rates", {})
-            rates = data.get("conversion_rates", {})
-            for code in config.FIAT_CURRENCIES:
-                if code == config.BASE_CURRENCY:
-                    continue  # пропускаем базовую
-                if code in rates:
-                    rate = rates[code]
-                    if isinstance(rate, (int, float)) and rate > 0:
-                        pair = f"{code}_{config.BASE_CURRENCY}"
-                        result[pair] = float(rate)
-            return result
+            return self.parse(response.json())
 
         except requests.exceptions.RequestException as e:
             raise ApiRequestError(f"Ошибка запроса к ExchangeRate-API: {e}")
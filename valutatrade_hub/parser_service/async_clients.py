@@ -0,0 +1,159 @@
+# valutatrade_hub/parser_service/async_clients.py
+
+import asyncio
+import functools
+import json
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from valutatrade_hub.core.exceptions import ApiRequestError
+
+from .api_clients import (
+    BaseApiClient,
+    CoinGeckoClient,
+    ExchangeRateApiClient,
+    HttpClientMixin,
+)
+from .config import config
+
+# Асинхронные клиенты API для AsyncRatesUpdater.
+# URL, параметры и разбор ответа — те же, что у синхронных клиентов
+# (request_args / parse); повторы, условные запросы и meta — из
+# HttpClientMixin. С aiohttp запросы идут через общую на обновление
+# aiohttp.ClientSession; без него — через пул requests.Session
+# в потоках, интерфейс тот же.
+
+# Потоки для запросов без aiohttp. Свой пул, а не пул цикла событий:
+# asyncio.run при выходе ждёт свой пул, а отменённый по сроку запрос
+# должен дорабатывать в фоне, не задерживая обновление.
+_fallback_executor = ThreadPoolExecutor(
+    max_workers=config.HTTP_POOL_SIZE, thread_name_prefix="rates-async"
+)
+
+
+class _Response:
+    """Ответ aiohttp, приведённый к полям requests.Response"""
+
+    def __init__(self, status_code: int, headers, content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncBaseApiClient(HttpClientMixin, ABC):
+    """Асинхронный клиент курсов: await fetch_rates()"""
+
+    name = "API"
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        :param timeout: срок на один источник, с (по умолчанию REQUEST_TIMEOUT);
+                        по его истечении AsyncRatesUpdater отменяет запрос
+        """
+        self.timeout = timeout if timeout is not None else config.REQUEST_TIMEOUT
+        # aiohttp.ClientSession, которую выдаёт AsyncRatesUpdater
+        self.session = None
+
+    @abstractmethod
+    async def fetch_rates(self) -> Dict[str, float]:
+        """Курсы {"BTC_USD": 59337.21, ...}; {} — ответ 304"""
+
+    async def _fetch_with(self, spec: BaseApiClient) -> Dict[str, float]:
+        """Запрос и разбор по описанию синхронного клиента spec"""
+        url, params, headers = spec.request_args()
+        try:
+            response = await self._get(url, params=params, headers=headers)
+            if response.status_code == 304:
+                return {}
+            if response.status_code >= 400:
+                raise ApiRequestError(f"Ошибка запроса к {self.name}: HTTP {response.status_code}") # noqa: E501
+            return spec.parse(response.json())
+        except ApiRequestError:
+            raise
+        except asyncio.TimeoutError:
+            # Срок источника — решает AsyncRatesUpdater
+            raise
+        except KeyError as e:
+            raise ApiRequestError(f"Ошибка парсинга ответа {self.name}: отсутствует поле {e}") # noqa: E501
+        except Exception as e:
+            raise ApiRequestError(f"Ошибка запроса к {self.name}: {e}")
+
+    async def _get(self, url: str, params=None, headers=None):
+        """GET с повторами на 429/5xx и сетевые сбои (как BaseApiClient._get)"""
+        key, validator, headers = self._conditional(url, params, headers)
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                response = await self._request(url, params, headers)
+            except self._network_errors():
+                if attempt > config.HTTP_MAX_RETRIES:
+                    self._record(start, None, attempt)
+                    raise
+            else:
+                if (
+                    response.status_code not in self.RETRY_STATUSES
+                    or attempt > config.HTTP_MAX_RETRIES
+                ):
+                    self._record(start, response.status_code, attempt)
+                    self._remember(key, validator, response)
+                    return response
+                retry_after = response.headers.get("Retry-After")
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    async def _request(self, url: str, params, headers):
+        if aiohttp is None or self.session is None:
+            request = functools.partial(
+                BaseApiClient.session().get, url,
+                params=params, headers=headers, timeout=config.REQUEST_TIMEOUT,
+            )
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_fallback_executor, request)
+        async with self.session.get(url, params=params, headers=headers) as response: # noqa: E501
+            content = await response.read()
+            return _Response(response.status, response.headers, content)
+
+    @staticmethod
+    def _network_errors():
+        errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        if aiohttp is not None:
+            errors += (aiohttp.ClientConnectionError,)
+        return errors
+
+
+# --- Клиент для CoinGecko ---
+class AsyncCoinGeckoClient(AsyncBaseApiClient):
+    name = "CoinGecko"
+
+    def __init__(self, timeout: Optional[float] = None):
+        super().__init__(timeout)
+        self.spec = CoinGeckoClient()
+
+    async def fetch_rates(self) -> Dict[str, float]:
+        return await self._fetch_with(self.spec)
+
+
+# --- Клиент для ExchangeRate-API ---
+class AsyncExchangeRateApiClient(AsyncBaseApiClient):
+    name = "ExchangeRate-API"
+
+    def __init__(self, timeout: Optional[float] = None):
+        super().__init__(timeout)
+        self.spec = ExchangeRateApiClient()
+
+    async def fetch_rates(self) -> Dict[str, float]:
+        return await self._fetch_with(self.spec)
@@ -8,6 +8,8 @@ from typing import Dict, Tuple
 # Загрузка переменных окружения из .env
 from dotenv import load_dotenv
 
+from valutatrade_hub.infra.settings import SettingsLoader
+
 # конфигурация API и параметров обновления
 
 '''
@@ -95,12 +97,32 @@ class ParserConfig:
     CRYPTO_ID_MAP: Dict[str, str] = None  # инициализируется в __post_init__
 
     # --- Пути к файлам ---
-    DATA_DIR: Path = Path(__file__).parent.parent / "data"
+    # Каталог data_dir из настроек — тот же, что у DatabaseManager:
+    # курсы пишутся в тот rates.json, который читают CLI и кеш курсов
+    DATA_DIR: Path = SettingsLoader().data_path()
     RATES_FILE_PATH: Path = DATA_DIR / "rates.json"
     HISTORY_FILE_PATH: Path = DATA_DIR / "exchange_rates.json"
+    HISTORY_DIR: Path = DATA_DIR / "history"  # колоночная история по парам
+    # ETag / Last-Modified ответов API для условных запросов
+    HTTP_VALIDATORS_PATH: Path = DATA_DIR / "http_validators.json"
+
+    # --- Порог изменения курса (относительный) ---
+    # Пара перезаписывается в rates.json и историю, только если курс
+    # сдвинулся больше чем на порог своего класса активов
+    FIAT_RATE_EPSILON: float = float(os.getenv("FIAT_RATE_EPSILON", "1e-6"))
+    CRYPTO_RATE_EPSILON: float = float(os.getenv("CRYPTO_RATE_EPSILON", "1e-4"))
 
     # --- Сетевые параметры ---
     REQUEST_TIMEOUT: int = 10
+    # Общая для клиентов HTTP-сессия: пул соединений (keep-alive)
+    # и повторы на 429/5xx с экспоненциальной задержкой и джиттером
+    HTTP_POOL_SIZE: int = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+    HTTP_BACKOFF_BASE: float = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+    HTTP_BACKOFF_MAX: float = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+    # Общий срок опроса всех API за одно обновление (клиенты опрашиваются
+    # параллельно; кто не успел — пропускается до следующего обновления)
+    REFRESH_DEADLINE: float = float(os.getenv("REFRESH_DEADLINE", "12"))
     UPDATE_INTERVAL: int = 600  # 10 минут (в секундах)
 
     def __post_init__(self):
@@ -176,3 +198,8 @@ UPDATE_INTERVAL = config.UPDATE_INTERVAL
 BASE_CURRENCY = config.BASE_CURRENCY
 RATES_FILE_PATH = config.RATES_FILE_PATH
 HISTORY_FILE_PATH = config.HISTORY_FILE_PATH
+HISTORY_DIR = config.HISTORY_DIR
+HTTP_VALIDATORS_PATH = config.HTTP_VALIDATORS_PATH
+FIAT_RATE_EPSILON = config.FIAT_RATE_EPSILON
+CRYPTO_RATE_EPSILON = config.CRYPTO_RATE_EPSILON
+REFRESH_DEADLINE = config.REFRESH_DEADLINE
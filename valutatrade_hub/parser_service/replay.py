@@ -0,0 +1,296 @@
+# valutatrade_hub/parser_service/replay.py
+
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from valutatrade_hub.core.exceptions import ApiRequestError
+
+from .api_clients import BaseApiClient
+from .config import config
+
+# Запись и воспроизведение ответов API (фикстуры) для бенчмарков
+# без сети. RecordingApiClient опрашивает настоящий API и дописывает
+# ответы в <каталог>/<класс клиента>.json; ReplayApiClient отдаёт их
+# по кругу с заданной задержкой, долей ошибок и размером ответа.
+# Подменяется только транспорт requests (адаптер сессии): повторы,
+# условные запросы, разбор ответа и meta — те же, что у боевых клиентов.
+
+# Заголовки ответа, которые сохраняются в фикстуре
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Retry-After") # noqa: E501
+
+
+def fixture_path(directory, spec: BaseApiClient) -> Path:
+    """Файл фикстуры клиента: <каталог>/CoinGeckoClient.json и т.п."""
+    return Path(directory) / f"{type(spec).__name__}.json"
+
+
+def load_fixture(path) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fixture(path, fixture: Dict[str, Any]) -> None:
+    """Записать фикстуру атомарно"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".json.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, ensure_ascii=False, indent=2)
+    temp_path.replace(path)
+
+
+def _redact(url: str) -> str:
+    """URL без ключей API (у ExchangeRate-API ключ — часть пути)"""
+    for key in (config.EXCHANGERATE_API_KEY, config.COINGECKO_API_KEY):
+        if key:
+            url = url.replace(key, "***")
+    return url
+
+
+def _pad(body: str, scale: float) -> str:
+    """
+    Увеличить JSON-объект примерно в scale раз лишними ключами
+    верхнего уровня: клиенты их не читают, но разбирают.
+    """
+    if scale <= 1:
+        return body
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        return body
+    entry = len(json.dumps({"x-replay-pad-000000": {"usd": 1.0}})) - 1
+    count = math.ceil((len(body) * (scale - 1)) / entry)
+    for i in range(count):
+        data[f"x-replay-pad-{i:06d}"] = {"usd": 1.0}
+    return json.dumps(data)
+
+
+# --- Транспорты ---
+class RecordingAdapter(HTTPAdapter):
+    """Обычный HTTP-транспорт, который запоминает каждый ответ"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.responses: List[Dict[str, Any]] = []
+
+    def send(self, request, **kwargs):
+        # Записываем полные ответы, а не 304 на наши же валидаторы
+        request.headers.pop("If-None-Match", None)
+        request.headers.pop("If-Modified-Since", None)
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        body = response.content  # читаем сразу: ответ остаётся доступен
+        self.responses.append({
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in KEPT_HEADERS if name in response.headers
+            },
+            "body": body.decode(response.encoding or "utf-8", errors="replace"),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000),
+        })
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Транспорт без сети: отдаёт записанные ответы по кругу.
+    latency + случайная добавка до jitter — задержка ответа, с;
+    error_rate — доля ответов 503; payload_scale — во сколько раз
+    раздуть тело ответа. Со своим seed поведение воспроизводимо.
+    If-None-Match / If-Modified-Since учитываются, как на настоящем сервере.
+    """
+
+    def __init__(
+        self,
+        responses: List[Dict[str, Any]],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        payload_scale: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        super().__init__()
+        if not responses:
+            raise ValueError("ReplayAdapter: в фикстуре нет ответов")
+        self.responses = [
+            {**r, "body": _pad(r.get("body", ""), payload_scale).encode()}
+            for r in responses
+        ]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next = 0
+        # Счётчики для отчёта бенчмарка
+        self.served = 0
+        self.errors = 0
+        self.not_modified = 0
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None): # noqa: E501
+        with self._lock:
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            failed = self._rng.random() < self.error_rate
+            entry = self.responses[self._next % len(self.responses)]
+            if not failed:
+                self._next += 1
+
+        limit = timeout[1] if isinstance(timeout, tuple) else timeout
+        if limit is not None and delay > limit:
+            time.sleep(limit)
+            raise requests.exceptions.ReadTimeout(f"Replay: ответ дольше {limit} с")
+        time.sleep(delay)
+
+        if failed:
+            # Retry-After: 0 — повтор сразу, время не зависит от джиттера
+            response = self._build(request, 503, {"Retry-After": "0"}, b"")
+        elif self._matches(request, entry["headers"]):
+            response = self._build(request, 304, entry["headers"], b"")
+        else:
+            response = self._build(request, entry["status"], entry["headers"], entry["body"]) # noqa: E501
+        with self._lock:
+            self.served += 1
+            self.errors += failed
+            self.not_modified += response.status_code == 304
+        return response
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _matches(request, headers: Dict[str, str]) -> bool:
+        """Запрос условный и валидаторы совпали с записанными"""
+        etag = headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return True
+        modified = headers.get("Last-Modified")
+        return bool(modified) and request.headers.get("If-Modified-Since") == modified # noqa: E501
+
+    @staticmethod
+    def _build(request, status: int, headers: Dict[str, str], body: bytes) -> requests.Response: # noqa: E501
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "Replay"
+        return response
+
+
+# --- Клиенты ---
+class _FixtureClient(BaseApiClient):
+    """
+    Клиент по описанию боевого клиента spec (request_args / parse)
+    со своей сессией и транспортом вместо общей сессии процесса.
+    """
+
+    prefix = ""
+
+    def __init__(self, spec: BaseApiClient, adapter: BaseAdapter):
+        self.spec = spec
+        self.adapter = adapter
+        # Имя для RatesUpdater (по нему же определяется source)
+        self.client_name = self.prefix + type(spec).__name__.replace("Client", "")
+        self._own_session = requests.Session()
+        self._own_session.mount("http://", adapter)
+        self._own_session.mount("https://", adapter)
+
+    def session(self) -> requests.Session:
+        return self._own_session
+
+    def fetch_rates(self) -> Dict[str, float]:
+        url, params, headers = self.spec.request_args()
+        try:
+            response = self._get(url, params=params, headers=headers)
+            if response.status_code == 304:
+                return {}
+            response.raise_for_status()
+            return self.spec.parse(response.json())
+
+        except ApiRequestError:
+            raise
+        except requests.exceptions.RequestException as e:
+            raise ApiRequestError(f"Ошибка запроса к {self.client_name}: {e}")
+        except KeyError as e:
+            raise ApiRequestError(f"Ошибка парсинга ответа {self.client_name}: отсутствует поле {e}") # noqa: E501
+        except Exception as e:
+            raise ApiRequestError(f"Неизвестная ошибка при работе с {self.client_name}: {e}") # noqa: E501
+
+
+class RecordingApiClient(_FixtureClient):
+    """Опрашивает настоящий API и дописывает ответы в фикстуру"""
+
+    prefix = "Recording"
+
+    def __init__(self, spec: BaseApiClient, directory):
+        super().__init__(spec, RecordingAdapter(
+            pool_connections=1, pool_maxsize=config.HTTP_POOL_SIZE
+        ))
+        self.path = fixture_path(directory, spec)
+
+    def fetch_rates(self) -> Dict[str, float]:
+        try:
+            return super().fetch_rates()
+        finally:
+            self.save()
+
+    def save(self) -> None:
+        """Дописать записанные ответы в файл фикстуры"""
+        if not self.adapter.responses:
+            return
+        if self.path.exists():
+            fixture = load_fixture(self.path)
+        else:
+            url, _, _ = self.spec.request_args()
+            fixture = {"client": type(self.spec).__name__, "url": _redact(url), "responses": []} # noqa: E501
+        fixture["responses"].extend(self.adapter.responses)
+        fixture["recorded_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") # noqa: E501
+        save_fixture(self.path, fixture)
+        print(f"📼 [Replay] {self.client_name}: записано ответов {len(self.adapter.responses)} → {self.path}") # noqa: E501
+        self.adapter.responses = []
+
+
+class ReplayApiClient(_FixtureClient):
+    """Отдаёт ответы из фикстуры вместо запросов к API (см. ReplayAdapter)"""
+
+    prefix = "Replay"
+
+    def __init__(
+        self,
+        spec: BaseApiClient,
+        directory,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        payload_scale: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param spec: боевой клиент (CoinGeckoClient, ExchangeRateApiClient):
+                     от него URL, параметры и разбор ответа
+        :param directory: каталог с фикстурами
+        """
+        path = fixture_path(directory, spec)
+        if not path.exists():
+            raise ValueError(f"ReplayApiClient: нет фикстуры {path}")
+        super().__init__(spec, ReplayAdapter(
+            load_fixture(path)["responses"],
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            payload_scale=payload_scale,
+            seed=seed,
+        ))
@@ -0,0 +1,185 @@
+# valutatrade_hub/parser_service/rollups.py
+
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from valutatrade_hub.infra.locking import get_file_lock
+
+from .timeseries import RateHistoryStore, to_epoch_ms
+
+# Свечи OHLC по истории курсов, рядом с сегментами в history/:
+#   BTC_USD.1m.ohlc, BTC_USD.1h.ohlc, BTC_USD.1d.ohlc
+# Запись фиксированного размера: начало интервала и время последней
+# учтённой точки (int64, мс), open, high, low, close (double).
+# Новая точка либо обновляет последнюю запись на месте (тот же
+# интервал), либо дописывает новую — пересчёта по сырым точкам нет.
+# Точка не новее уже учтённой пропускается, поэтому повторная
+# подача того же снимка ничего не меняет.
+
+OHLC_SUFFIX = ".ohlc"
+INTERVALS: Dict[str, int] = {
+    "1m": 60_000,
+    "1h": 3_600_000,
+    "1d": 86_400_000,
+}
+_RECORD = struct.Struct("<qqdddd")
+
+Candle = Tuple[int, float, float, float, float]
+
+
+class RollupStore:
+    """Свечи (1m, 1h, 1d) по парам, обновляемые по мере поступления точек"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    # === Запись ===
+    def update(self, points: Iterable[Tuple[str, Any, float]]) -> int:
+        """
+        Учесть точки (пара, время, курс) во всех интервалах.
+        :return: число точек, изменивших хотя бы одну свечу
+        """
+        by_pair: Dict[str, List[Tuple[int, float]]] = {}
+        for pair, timestamp, rate in points:
+            by_pair.setdefault(pair.upper(), []).append(
+                (to_epoch_ms(timestamp), float(rate))
+            )
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        applied = 0
+        for pair, pair_points in by_pair.items():
+            pair_points.sort()
+            used = set()
+            for interval in INTERVALS:
+                used.update(self._apply(pair, interval, pair_points))
+            applied += len(used)
+        return applied
+
+    def rebuild(self, pair: str, history: RateHistoryStore) -> int:
+        """Пересчитать свечи пары по сырой истории (первый запуск, миграция)"""
+        pair = pair.upper()
+        for interval in INTERVALS:
+            path = self._path(pair, interval)
+            with get_file_lock(path).exclusive():
+                if path.exists():
+                    path.unlink()
+        timestamps, rates = history.read(pair)
+        return self.update((pair, ts, rate) for ts, rate in zip(timestamps, rates))
+
+    # === Чтение ===
+    def has(self, pair: str) -> bool:
+        return all(self._path(pair.upper(), i).exists() for i in INTERVALS)
+
+    def read(
+        self,
+        pair: str,
+        interval: str,
+        start: Any = None,
+        end: Any = None,
+        limit: Optional[int] = None,
+    ) -> List[Candle]:
+        """
+        Свечи пары в интервалах, начинающихся в [start, end].
+        :param limit: только последние limit свечей
+        :return: [(начало интервала в мс, open, high, low, close), ...]
+        """
+        path = self._path(pair.upper(), interval)
+        with get_file_lock(path).shared():
+            if not path.exists():
+                return []
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                count = size // _RECORD.size
+                if not count:
+                    return []
+                with mmap.mmap(f.fileno(), count * _RECORD.size, access=mmap.ACCESS_READ) as mm: # noqa: E501
+                    lo = self._search(mm, count, start, 0)
+                    hi = self._search(mm, count, end, 1) if end is not None else count # noqa: E501
+                    if limit is not None:
+                        lo = max(lo, hi - limit)
+                    return [
+                        self._candle(mm, i) for i in range(lo, max(lo, hi))
+                    ]
+
+    # === Вспомогательные ===
+    def _apply(
+        self, pair: str, interval: str, points: List[Tuple[int, float]]
+    ) -> List[int]:
+        """Обновить свечи одного интервала; возвращает метки учтённых точек"""
+        step = INTERVALS[interval]
+        path = self._path(pair, interval)
+        used = []
+        with get_file_lock(path).exclusive():
+            path.touch(exist_ok=True)
+            with open(path, "r+b") as f:
+                size = os.fstat(f.fileno()).st_size
+                # Обрывок записи после сбоя отрезаем
+                if size % _RECORD.size:
+                    size -= size % _RECORD.size
+                    f.truncate(size)
+
+                current = None  # [начало, последняя точка, o, h, l, c]
+                if size:
+                    f.seek(size - _RECORD.size)
+                    current = list(_RECORD.unpack(f.read(_RECORD.size)))
+                    size -= _RECORD.size
+
+                for ts, rate in points:
+                    if current is not None and ts <= current[1]:
+                        continue
+                    bucket = ts - ts % step
+                    if current is not None and bucket == current[0]:
+                        current[1] = ts
+                        current[3] = max(current[3], rate)
+                        current[4] = min(current[4], rate)
+                        current[5] = rate
+                    else:
+                        if current is not None:
+                            self._write(f, size, current)
+                            size += _RECORD.size
+                        current = [bucket, ts, rate, rate, rate, rate]
+                    used.append(ts)
+
+                if used:
+                    self._write(f, size, current)
+        return used
+
+    @staticmethod
+    def _write(f, offset: int, record: List) -> None:
+        f.seek(offset)
+        f.truncate(offset)
+        f.write(_RECORD.pack(*record))
+        f.flush()
+
+    @staticmethod
+    def _candle(mm: mmap.mmap, i: int) -> Candle:
+        bucket, _, o, h, lo, c = _RECORD.unpack_from(mm, i * _RECORD.size)
+        return bucket, o, h, lo, c
+
+    @staticmethod
+    def _search(mm: mmap.mmap, count: int, bound: Any, side: int) -> int:
+        """Бинарный поиск по началу интервала (side=1 — правая граница)"""
+        if bound is None:
+            return 0
+        target = to_epoch_ms(bound)
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            bucket = struct.unpack_from("<q", mm, mid * _RECORD.size)[0]
+            if bucket < target or (side and bucket == target):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _path(self, pair: str, interval: str) -> Path:
+        if interval not in INTERVALS:
+            raise ValueError(
+                f"Неизвестный интервал '{interval}'. Доступны: {', '.join(INTERVALS)}"
+            )
+        # Имя пары проверяется так же, как для сырых сегментов
+        ts_path, _ = RateHistoryStore(self.root)._paths(pair)
+        return ts_path.with_name(f"{pair}.{interval}{OHLC_SUFFIX}")
@@ -4,10 +4,20 @@ import json
 import os
 import tempfile
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from valutatrade_hub.infra.generation import next_generation, write_generation
+from valutatrade_hub.infra.locking import get_file_lock
 
 # ✅ Импортируем и config, и пути
-from .config import HISTORY_FILE_PATH, RATES_FILE_PATH
+from .config import (
+    HISTORY_DIR,
+    HISTORY_FILE_PATH,
+    HTTP_VALIDATORS_PATH,
+    RATES_FILE_PATH,
+)
+from .rollups import RollupStore
+from .timeseries import RateHistoryStore, from_epoch_ms, migrate_history_json
 
 # --- Устаревшие пути (можно удалить) ---
 # Больше не используем os.path.join("..", "..", "data", ...)
@@ -22,9 +32,10 @@ def load_exchange_rates() -> List[Dict[str, Any]]:
     if not HISTORY_FILE_PATH.exists():
         return []
     try:
-        with open(HISTORY_FILE_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data if isinstance(data, list) else []
+        with get_file_lock(HISTORY_FILE_PATH).shared():
+            with open(HISTORY_FILE_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        return data if isinstance(data, list) else []
     except (json.JSONDecodeError, IOError) as e:
         print(f"⚠️ [Storage] Ошибка чтения {HISTORY_FILE_PATH.name}: {e}")
         return []
@@ -33,23 +44,141 @@ def load_exchange_rates() -> List[Dict[str, Any]]:
 def save_exchange_rates(records: List[Dict[str, Any]]) -> bool:
     """Сохранить историю атомарно: temp file → rename"""
     try:
-        temp_fd, temp_path = tempfile.mkstemp(suffix=".json", dir=tempfile.gettempdir(), text=True) # noqa: E501
-        try:
-            with os.fdopen(temp_fd, "w", encoding="utf-8") as tmp_file:
-                json.dump(records, tmp_file, ensure_ascii=False, indent=4, default=str)
-            # Атомарная замена
-            os.replace(temp_path, HISTORY_FILE_PATH)
-            print(f"💾 История курсов сохранена: {len(records)} записей")
-            return True
-        except Exception as e:
-            os.close(temp_fd)
-            os.unlink(temp_path)
-            raise e
+        # Временный файл рядом с целевым: os.replace не работает между ФС
+        with get_file_lock(HISTORY_FILE_PATH).exclusive():
+            temp_fd, temp_path = tempfile.mkstemp(suffix=".json", dir=HISTORY_FILE_PATH.parent, text=True) # noqa: E501
+            try:
+                with os.fdopen(temp_fd, "w", encoding="utf-8") as tmp_file:
+                    json.dump(records, tmp_file, ensure_ascii=False, indent=4, default=str) # noqa: E501
+                # Атомарная замена
+                os.replace(temp_path, HISTORY_FILE_PATH)
+            except Exception as e:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise e
+        print(f"💾 История курсов сохранена: {len(records)} записей")
+        return True
     except Exception as e:
         print(f"❌ [Storage] Ошибка записи {HISTORY_FILE_PATH.name}: {e}")
         return False
 
 
+# === Колоночная история (history/<пара>.ts|.rate) ===
+
+_history_store = None
+
+
+def get_history_store() -> RateHistoryStore:
+    """
+    Хранилище истории по парам. При первом обращении, если его ещё нет,
+    переносит в него exchange_rates.json.
+    """
+    global _history_store
+    if _history_store is None:
+        store = RateHistoryStore(HISTORY_DIR)
+        if not HISTORY_DIR.exists() and HISTORY_FILE_PATH.exists():
+            migrate_history_json(HISTORY_FILE_PATH, store)
+        _history_store = store
+    return _history_store
+
+
+_rollup_store = None
+
+
+def get_rollup_store() -> RollupStore:
+    """Свечи OHLC (history/<пара>.<интервал>.ohlc)"""
+    global _rollup_store
+    if _rollup_store is None:
+        _rollup_store = RollupStore(get_history_store().root)
+    return _rollup_store
+
+
+def ensure_rollups(pair: str) -> None:
+    """Построить свечи пары по сырой истории, если их ещё нет"""
+    rollups = get_rollup_store()
+    if not rollups.has(pair):
+        rollups.rebuild(pair, get_history_store())
+
+
+def append_history(pairs: Dict[str, Dict], timestamp: str) -> int:
+    """
+    Дописать снимок курсов в историю и обновить свечи OHLC;
+    возвращает число новых точек
+    """
+    try:
+        added = get_history_store().append_snapshot(pairs, timestamp)
+        rollups = get_rollup_store()
+        points = []
+        for pair, info in pairs.items():
+            if not isinstance(info, dict) or "rate" not in info:
+                continue
+            if rollups.has(pair):
+                points.append((pair, info.get("updated_at") or timestamp, info["rate"])) # noqa: E501
+            else:
+                # Свечей ещё нет (история перенесена из JSON) — строим по истории
+                rollups.rebuild(pair, get_history_store())
+        rollups.update(points)
+        return added
+    except (OSError, ValueError) as e:
+        print(f"❌ [Storage] Ошибка записи истории: {e}")
+        return 0
+
+
+def get_rate_at(
+    pair: str, timestamp: Any, interpolate: bool = False
+) -> Optional[Tuple[float, str]]:
+    """
+    Курс пары на момент времени по истории: ("BTC_USD", "2025-10-10T12:00Z").
+    Если пары нет, но есть обратная (USD_BTC), берётся 1 / курс.
+    :return: (курс, метка использованной точки в ISO) или None
+    """
+    store = get_history_store()
+    pair = pair.strip().upper()
+    point = store.point_at(pair, timestamp, interpolate)
+    if point is not None:
+        return point[1], from_epoch_ms(point[0])
+
+    from_code, _, to_code = pair.partition("_")
+    point = store.point_at(f"{to_code}_{from_code}", timestamp, interpolate)
+    if point is not None and point[1]:
+        return 1 / point[1], from_epoch_ms(point[0])
+    return None
+
+
+# === Валидаторы HTTP-кеша (http_validators.json) ===
+
+def load_http_validators() -> Dict[str, Dict[str, str]]:
+    """{ключ эндпоинта: {"etag": ..., "last_modified": ...}}"""
+    if not HTTP_VALIDATORS_PATH.exists():
+        return {}
+    try:
+        with get_file_lock(HTTP_VALIDATORS_PATH).shared():
+            with open(HTTP_VALIDATORS_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ [Storage] Ошибка чтения {HTTP_VALIDATORS_PATH.name}: {e}")
+        return {}
+
+
+def save_http_validators(validators: Dict[str, Dict[str, str]]) -> None:
+    """Обновить валидаторы перечисленных эндпоинтов (остальные не трогаем)"""
+    try:
+        HTTP_VALIDATORS_PATH.parent.mkdir(exist_ok=True)
+        with get_file_lock(HTTP_VALIDATORS_PATH).exclusive():
+            data = {}
+            if HTTP_VALIDATORS_PATH.exists():
+                with open(HTTP_VALIDATORS_PATH, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            data.update(validators)
+            temp_path = HTTP_VALIDATORS_PATH.with_suffix(".json.tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            temp_path.replace(HTTP_VALIDATORS_PATH)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ [Storage] Ошибка записи {HTTP_VALIDATORS_PATH.name}: {e}")
+
+
 # === Операции для rates.json (актуальные курсы) ===
 
 def save_rates_cache(rates: Dict[str, float]) -> None:
@@ -61,10 +190,11 @@ def save_rates_cache(rates: Dict[str, float]) -> None:
     data["last_updated"] = datetime.now(timezone.utc).isoformat()
 
     try:
-        temp_fd, temp_path = tempfile.mkstemp(suffix=".json", dir=tempfile.gettempdir(), text=True) # noqa: E501
-        with os.fdopen(temp_fd, "w", encoding="utf-8") as tmp_file:
-            json.dump(data, tmp_file, ensure_ascii=False, indent=4, default=str)
-        os.replace(temp_path, RATES_FILE_PATH)
+        with get_file_lock(RATES_FILE_PATH).exclusive():
+            temp_fd, temp_path = tempfile.mkstemp(suffix=".json", dir=RATES_FILE_PATH.parent, text=True) # noqa: E501
+            with os.fdopen(temp_fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(data, tmp_file, ensure_ascii=False, indent=4, default=str)
+            os.replace(temp_path, RATES_FILE_PATH)
         print(f"💾 Актуальные курсы сохранены в {RATES_FILE_PATH}")
     except Exception as e:
         print(f"❌ [Storage] Ошибка записи {RATES_FILE_PATH.name}: {e}")
@@ -75,8 +205,9 @@ def load_rates_snapshot() -> Dict[str, Any]:
     if not RATES_FILE_PATH.exists():
         return {"pairs": {}, "last_refresh": None}
     try:
-        with open(RATES_FILE_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with get_file_lock(RATES_FILE_PATH).shared():
+            with open(RATES_FILE_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
             if not isinstance(data, dict):
                 return {"pairs": {}, "last_refresh": None}
             pairs = data.get("pairs", {})
@@ -92,7 +223,11 @@ def load_rates_snapshot() -> Dict[str, Any]:
 
 
 def save_rates_snapshot(pairs: Dict[str, Dict], timestamp: str) -> bool:
-    """Сохранить снимок курсов атомарно через временный файл"""
+    """
+    Сохранить снимок курсов атомарно через временный файл.
+    Каждый снимок получает следующий номер поколения (generation),
+    он же пишется в спутник rates.json.gen.
+    """
     try:
         # Создаём папку, если её нет
         RATES_FILE_PATH.parent.mkdir(exist_ok=True)
@@ -100,14 +235,22 @@ def save_rates_snapshot(pairs: Dict[str, Dict], timestamp: str) -> bool:
         # Временный файл
         temp_path = RATES_FILE_PATH.with_suffix(".json.tmp")
 
-        with open(temp_path, "w", encoding="utf-8") as f:
-            json.dump({
-                "pairs": pairs,
-                "last_updated": timestamp
-            }, f, ensure_ascii=False, indent=2)
+        # Один писатель: два процесса не перепишут один и тот же .tmp
+        with get_file_lock(RATES_FILE_PATH).exclusive():
+            generation = next_generation(RATES_FILE_PATH)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "pairs": pairs,
+                    "last_updated": timestamp,
+                    "generation": generation
+                }, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
 
-        # Атомарная замена — ключевой момент
-        temp_path.replace(RATES_FILE_PATH)
+            # Атомарная замена — ключевой момент
+            temp_path.replace(RATES_FILE_PATH)
+            # Спутник — после замены: номер не опережает содержимое
+            write_generation(RATES_FILE_PATH, generation)
 
         print(f"💾 [Storage] Успешно сохранено {len(pairs)} пар в {RATES_FILE_PATH.name}") # noqa: E501
         return True
@@ -115,3 +258,27 @@ def save_rates_snapshot(pairs: Dict[str, Dict], timestamp: str) -> bool:
     except Exception as e:
         print(f"❌ [Storage] Ошибка записи {RATES_FILE_PATH.name}: {e}")
         return False
+
+
+def merge_rates_snapshot(
+    pairs: Dict[str, Dict],
+    timestamp: str,
+    diff: Callable[[Dict[str, Dict], Dict[str, Dict]], Dict[str, Dict]],
+) -> Optional[Tuple[Dict[str, Dict], Dict[str, Dict]]]:
+    """
+    Влить опрошенные пары в rates.json: чтение, сравнение (diff) и запись
+    идут под одной исключительной блокировкой — параллельное обновление
+    не потеряет чужие пары. Если ничего не изменилось (или pairs пуст —
+    все источники ответили 304), котировки остаются прежними, но
+    last_updated и поколение обновляются: курсы подтверждены свежими.
+    :return: (снимок после записи, изменившиеся пары) или None при ошибке
+    """
+    with get_file_lock(RATES_FILE_PATH).exclusive():
+        previous = load_rates_snapshot()["pairs"]
+        changed = diff(previous, pairs)
+        merged = {**previous, **changed}
+        if not merged:
+            return merged, changed  # подтверждать нечего
+        if not save_rates_snapshot(merged, timestamp):
+            return None
+    return merged, changed
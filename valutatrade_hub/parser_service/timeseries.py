@@ -0,0 +1,276 @@
+# valutatrade_hub/parser_service/timeseries.py
+
+import json
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from valutatrade_hub.infra.locking import get_file_lock
+
+# Колоночное хранилище истории курсов.
+# На каждую пару — два append-only сегмента в history/:
+#   BTC_USD.ts    — метки времени, int64 (мс от эпохи), array('q')
+#   BTC_USD.rate  — курсы, double, array('d')
+# Запись — дописывание 8 байт в конец каждого файла, без перезаписи
+# истории. Чтение отображает файлы в память (mmap) и ищет диапазон
+# бинарным поиском по меткам времени, не трогая другие пары.
+# Метки в сегменте строго возрастают: точка не новее последней
+# не дописывается (повторный снимок с тем же временем — не дубль).
+
+TS_SUFFIX = ".ts"
+RATE_SUFFIX = ".rate"
+_ITEM = 8  # размер int64 / double
+_PAIR_RE = re.compile(r"^[A-Z0-9]+_[A-Z0-9]+$")
+
+
+def to_epoch_ms(value: Any) -> int:
+    """ISO-строка ('2025-10-10T12:00:00Z'), datetime или число → мс от эпохи"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1000)
+
+
+def from_epoch_ms(ms: int) -> str:
+    """мс от эпохи → ISO-строка UTC с Z, как в rates.json"""
+    dt = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S") + "Z"
+
+
+class _Segment:
+    """Отображённые в память сегменты одной пары (только чтение)"""
+
+    def __init__(self, ts_path: Path, rate_path: Path):
+        self._files = []
+        self._maps = []
+        self.ts = self.rates = None
+        try:
+            self.ts = self._map(ts_path, "q")
+            self.rates = self._map(rate_path, "d")
+        except BaseException:
+            # Второй сегмент не открылся (ошибка mmap, файл удалён между
+            # exists() и open) — закрываем то, что уже успели открыть
+            self.close()
+            raise
+        # Дописанная наполовину точка (сбой между двумя файлами) не читается
+        self.count = min(len(self.ts), len(self.rates))
+
+    def _map(self, path: Path, typecode: str):
+        f = open(path, "rb")
+        self._files.append(f)
+        size = os.fstat(f.fileno()).st_size // _ITEM * _ITEM
+        if not size:
+            return memoryview(b"").cast("B").cast(typecode)
+        mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        return memoryview(mm).cast(typecode)
+
+    def close(self) -> None:
+        for view in (self.ts, self.rates):
+            if view is not None:
+                view.release()
+        for mm in self._maps:
+            mm.close()
+        for f in self._files:
+            f.close()
+
+
+class RateHistoryStore:
+    """История курсов по парам: O(1) дописывание, чтение диапазона по паре"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    # === Запись ===
+    def append(self, pair: str, timestamp: Any, rate: float) -> bool:
+        """Дописать точку. False — точка не новее последней и пропущена"""
+        return self.append_many([(pair, timestamp, rate)]) == 1
+
+    def append_snapshot(self, pairs: Dict[str, Dict[str, Any]], timestamp: str) -> int: # noqa: E501
+        """Дописать снимок {"BTC_USD": {"rate": ..., "updated_at": ...}}"""
+        return self.append_many(
+            (pair, info.get("updated_at") or timestamp, info["rate"])
+            for pair, info in pairs.items()
+            if isinstance(info, dict) and "rate" in info
+        )
+
+    def append_many(self, points: Iterable[Tuple[str, Any, float]]) -> int:
+        """Дописать точки (пара, время, курс); возвращает число записанных"""
+        by_pair: Dict[str, List[Tuple[int, float]]] = {}
+        for pair, timestamp, rate in points:
+            by_pair.setdefault(pair.upper(), []).append(
+                (to_epoch_ms(timestamp), float(rate))
+            )
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        written = 0
+        for pair, pair_points in by_pair.items():
+            ts_path, rate_path = self._paths(pair)
+            with get_file_lock(ts_path).exclusive():
+                # Метку читаем с диска: в сегмент мог дописать другой процесс
+                last = self._last_timestamp(ts_path, rate_path)
+                ts_col, rate_col = array("q"), array("d")
+                for ts, rate in sorted(pair_points):
+                    if last is not None and ts <= last:
+                        continue
+                    ts_col.append(ts)
+                    rate_col.append(rate)
+                    last = ts
+                if not ts_col:
+                    continue
+                # Сначала курс, потом метка: незавершённая точка не видна
+                with open(rate_path, "ab") as f:
+                    rate_col.tofile(f)
+                with open(ts_path, "ab") as f:
+                    ts_col.tofile(f)
+                written += len(ts_col)
+        return written
+
+    # === Чтение ===
+    def pairs(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(
+            path.name[:-len(TS_SUFFIX)]
+            for path in self.root.iterdir() if path.name.endswith(TS_SUFFIX)
+        )
+
+    def read(
+        self,
+        pair: str,
+        start: Any = None,
+        end: Any = None,
+    ) -> Tuple[List[int], List[float]]:
+        """
+        Точки пары в диапазоне [start, end] (включительно).
+        :return: (метки времени в мс, курсы)
+        """
+        with self.segment(pair) as seg:
+            if seg is None:
+                return [], []
+            lo, hi = self._bounds(seg, start, end)
+            return seg.ts[lo:hi].tolist(), seg.rates[lo:hi].tolist()
+
+    def count(self, pair: str) -> int:
+        with self.segment(pair) as seg:
+            return seg.count if seg is not None else 0
+
+    def last(self, pair: str) -> Optional[Tuple[int, float]]:
+        with self.segment(pair) as seg:
+            if seg is None or not seg.count:
+                return None
+            return seg.ts[seg.count - 1], seg.rates[seg.count - 1]
+
+    def point_at(
+        self, pair: str, timestamp: Any, interpolate: bool = False
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Курс пары на момент timestamp: последняя точка не позже него
+        (бинарный поиск по столбцу меток, O(log n)).
+        :param interpolate: линейно между соседними точками
+        :return: (метка использованной точки в мс, курс); None — раньше истории
+        """
+        at = to_epoch_ms(timestamp)
+        with self.segment(pair) as seg:
+            if seg is None or not seg.count:
+                return None
+            i = bisect_right(seg.ts, at, 0, seg.count)
+            if i == 0:
+                return None
+            t0, r0 = seg.ts[i - 1], seg.rates[i - 1]
+            if not interpolate or t0 == at or i == seg.count:
+                return t0, r0
+            t1, r1 = seg.ts[i], seg.rates[i]
+            return at, r0 + (r1 - r0) * (at - t0) / (t1 - t0)
+
+    @contextmanager
+    def segment(self, pair: str) -> Iterator[Optional[_Segment]]:
+        """Отображённые сегменты пары (None, если пары нет) под блокировкой"""
+        ts_path, rate_path = self._paths(pair.upper())
+        with get_file_lock(ts_path).shared():
+            if not (ts_path.exists() and rate_path.exists()):
+                yield None
+                return
+            seg = _Segment(ts_path, rate_path)
+            try:
+                yield seg
+            finally:
+                seg.close()
+
+    # === Вспомогательные ===
+    def _paths(self, pair: str) -> Tuple[Path, Path]:
+        if not _PAIR_RE.match(pair):
+            raise ValueError(f"Некорректное имя пары: '{pair}'")
+        return self.root / f"{pair}{TS_SUFFIX}", self.root / f"{pair}{RATE_SUFFIX}"
+
+    @staticmethod
+    def _last_timestamp(ts_path: Path, rate_path: Path) -> Optional[int]:
+        """Последняя метка пары; вызывается под исключительной блокировкой"""
+        sizes = [path.stat().st_size if path.exists() else 0 for path in (ts_path, rate_path)] # noqa: E501
+        # Выравниваем сегменты: хвост от оборванной записи отрезаем
+        count = min(sizes) // _ITEM
+        for path, size in zip((ts_path, rate_path), sizes):
+            if size != count * _ITEM:
+                os.truncate(path, count * _ITEM)
+        if not count:
+            return None
+        with open(ts_path, "rb") as f:
+            f.seek((count - 1) * _ITEM)
+            tail = array("q")
+            tail.frombytes(f.read(_ITEM))
+        return tail[0]
+
+    @staticmethod
+    def _bounds(seg: _Segment, start: Any, end: Any) -> Tuple[int, int]:
+        ts = seg.ts[:seg.count]
+        lo = bisect_left(ts, to_epoch_ms(start)) if start is not None else 0
+        hi = bisect_right(ts, to_epoch_ms(end)) if end is not None else seg.count
+        return lo, max(lo, hi)
+
+
+def migrate_history_json(history_path: Path, store: RateHistoryStore) -> int:
+    """
+    Перенос exchange_rates.json (список записей) в колоночное хранилище.
+    Исходный файл не меняется; повторный запуск ничего не дублирует.
+    :return: число перенесённых точек
+    """
+    history_path = Path(history_path)
+    if not history_path.exists():
+        return 0
+    try:
+        with get_file_lock(history_path).shared():
+            with open(history_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ [History] Ошибка чтения {history_path.name}: {e}")
+        return 0
+    if not isinstance(records, list):
+        return 0
+
+    points = []
+    for record in records:
+        try:
+            pair = f"{record['from_currency']}_{record['to_currency']}"
+            points.append((pair, record["timestamp"], float(record["rate"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    written = store.append_many(points)
+    print(f"📦 [History] Перенесено точек: {written} из {len(records)}")
+    return written
+
+
+if __name__ == "__main__":
+    # Ручной запуск миграции: python -m valutatrade_hub.parser_service.timeseries
+    from .config import config
+    from .storage import get_history_store
+
+    migrate_history_json(config.HISTORY_FILE_PATH, get_history_store())
@@ -1,23 +1,66 @@
 # valutatrade_hub/parser_service/updater.py
 
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.infra.events import rate_events
+from valutatrade_hub.infra.generation import read_generation
+from valutatrade_hub.infra.rate_cache import make_snapshot
+from valutatrade_hub.infra.settings import SettingsLoader
 
+from . import storage
 from .api_clients import BaseApiClient, CoinGeckoClient, ExchangeRateApiClient
+from .async_clients import (
+    AsyncBaseApiClient,
+    AsyncCoinGeckoClient,
+    AsyncExchangeRateApiClient,
+    aiohttp,
+)
 from .config import config
-from .storage import save_rates_snapshot
+from .storage import append_history, merge_rates_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Счётчики обновлений за время работы процесса: сколько всего и сколько
+# завершились без разбора и записи (все ответившие источники вернули 304)
+REFRESH_STATS: Dict[str, int] = {"refreshes": 0, "not_modified": 0}
+
 
 def generate_id(from_curr: str, to_curr: str, timestamp: str) -> str:
     """Создать уникальный ID: BTC_USD_2025-10-10T12:00:00Z"""
     return f"{from_curr}_{to_curr}_{timestamp}"
 
 
+def rate_epsilon(pair: str) -> float:
+    """Порог изменения для пары: крипто, если в паре есть криптовалюта"""
+    codes = pair.upper().split("_")
+    if any(code in config.CRYPTO_CURRENCIES for code in codes):
+        return config.CRYPTO_RATE_EPSILON
+    return config.FIAT_RATE_EPSILON
+
+
+def diff_pairs(
+    previous: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Пары из current, которых нет в previous или чей курс сдвинулся больше порога""" # noqa: E501
+    changed = {}
+    for pair, info in current.items():
+        old = previous.get(pair)
+        try:
+            old_rate = float(old["rate"])
+        except (TypeError, KeyError, ValueError):
+            changed[pair] = info
+            continue
+        new_rate = float(info["rate"])
+        if abs(new_rate - old_rate) > rate_epsilon(pair) * max(abs(old_rate), abs(new_rate)): # noqa: E501
+            changed[pair] = info
+    return changed
+
+
 class RatesUpdater:
     """
     Координирует обновление курсов:
@@ -28,6 +71,13 @@ class RatesUpdater:
     def __init__(self, clients: List[BaseApiClient] = None):
         self.pairs: Dict[str, Dict[str, Any]] = {}
         self.timestamp = self._now_iso()
+        # Клиенты, не уложившиеся в REFRESH_DEADLINE при последнем опросе
+        self.missed: List[str] = []
+        # Клиенты, ответившие 304 Not Modified
+        self.unchanged: List[str] = []
+        # ETag / Last-Modified ответов, чьи курсы вошли в self.pairs;
+        # сохраняются только после записи снимка
+        self.validators: Dict[str, Dict[str, str]] = {}
 
         if clients is not None:
             self.clients = clients
@@ -56,50 +106,51 @@ class RatesUpdater:
     def run_update(self) -> bool:
         """Запустить обновление курсов"""
         print("🔄 [Updater] Запуск обновления курсов...")
-        success = False
-
-        for client in self.clients:
-            client_name = client.__class__.__name__.replace("Client", "")
-            print(f"📡 [Updater] Запрос к {client_name}...")
-
-            try:
-                rates = client.fetch_rates()
-                if not rates:
-                    print(f"🟡 [Updater] {client_name}: получено 0 курсов")
-                    continue
-
-                source = "CoinGecko" if "CoinGecko" in client_name else "ExchangeRate-API" # noqa: E501
-
-                for pair, rate in rates.items():
-                    self.pairs[pair] = {
-                        "rate": rate,
-                        "updated_at": self.timestamp,
-                        "source": source
-                    }
-
-                print(f"✅ [Updater] {client_name}: получено {len(rates)} курсов")
+        self.fetch_all()
+        return self._save()
 
-            except ApiRequestError as e:
-                print(f"❌ [Updater] Ошибка {client_name}: {e}")
-                logger.error(f"Ошибка в run_update: {client_name}: {e}")
-                continue
+    def _save(self) -> bool:
+        """Сохранить опрошенные курсы: rates.json, история, подписчики"""
+        success = False
+        REFRESH_STATS["refreshes"] += 1
 
-            except Exception as e:
-                print(f"❌ [Updater] Неизвестная ошибка {client_name}: {e}")
-                logger.error(f"Неизвестная ошибка в run_update: {client_name}: {e}")
-                continue
+        if self.missed:
+            print(f"⏱️ [Updater] Не уложились в срок: {', '.join(self.missed)}")
+            logger.warning(f"Источники не уложились в срок: {self.missed}")
 
-        if not self.pairs:
+        if not self.pairs and not self.unchanged:
             print("❌ [Updater] Не удалось получить ни одного курса")
             return False
 
-        # Сохраняем снимок
+        # Сохраняем только изменившиеся пары: у остальных остаются
+        # прежние курс и updated_at, в историю они не дописываются.
+        # Даже без изменений last_updated обновляется — иначе снимок
+        # сочли бы устаревшим (is_stale, refuse_stale_trades)
         try:
-            if save_rates_snapshot(self.pairs, self.timestamp):
-                print(f"💾 [Updater] Успешно сохранено {len(self.pairs)} пар в rates.json") # noqa: E501
-                success = True
-            else:
+            result = merge_rates_snapshot(self.pairs, self.timestamp, diff_pairs)
+            if result is None:
                 print("❌ [Updater] Не удалось сохранить снимок")
+            else:
+                # Снимок записан — теперь 304 по этим валидаторам безопасен
+                BaseApiClient.commit_validators(self.validators)
+                self.validators = {}
+                merged, changed = result
+                if not self.pairs:
+                    # Ответили только 304: разбирать и сравнивать нечего
+                    REFRESH_STATS["not_modified"] += 1
+                    print(f"💤 [Updater] Источники ответили 304 ({', '.join(self.unchanged)}), курсы подтверждены") # noqa: E501
+                    print(f"📊 [Updater] Пропущено без разбора: {REFRESH_STATS['not_modified']} из {REFRESH_STATS['refreshes']} обновлений") # noqa: E501
+                    return True
+                success = True
+                if not changed:
+                    print(f"💤 [Updater] Курсы не изменились ({len(self.pairs)} пар), обновлена только отметка времени") # noqa: E501
+                else:
+                    print(f"💾 [Updater] Изменилось {len(changed)} из {len(self.pairs)} пар, сохранено в rates.json") # noqa: E501
+                    self._publish(merged)
+                    # История: по точке на пару в конец сегментов, без
+                    # перезаписи; свечи OHLC (1m, 1h, 1d) обновляются там же
+                    added = append_history(changed, self.timestamp)
+                    print(f"📈 [Updater] В историю добавлено {added} точек")
         except Exception as e:
             print(f"❌ [Updater] Ошибка при сохранении: {e}")
             logger.error(f"Ошибка при сохранении снимка: {e}")
@@ -107,6 +158,190 @@ class RatesUpdater:
         print("✅ [Updater] Обновление завершено." if success else "⚠️ [Updater] Обновление частично неудачно.") # noqa: E501
         return success
 
+    def fetch_all(self, deadline: Optional[float] = None) -> Dict[str, Dict[str, Any]]: # noqa: E501
+        """
+        Опросить всех клиентов параллельно (по потоку на клиента).
+        Ждём не дольше deadline секунд на всех сразу; курсы тех, кто
+        не успел, в снимок не попадают, их имена — в self.missed.
+        При совпадении пар побеждает клиент, стоящий в списке позже.
+        """
+        if deadline is None:
+            deadline = config.REFRESH_DEADLINE
+        self.missed = []
+        self.unchanged = []
+        self.validators = {}
+        if not self.clients:
+            return self.pairs
+
+        executor = ThreadPoolExecutor(
+            max_workers=len(self.clients), thread_name_prefix="rates-fetch"
+        )
+        futures = []
+        for client in self.clients:
+            print(f"📡 [Updater] Запрос к {self._client_name(client)}...")
+            futures.append(executor.submit(client.fetch_rates))
+        wait(futures, timeout=deadline)
+        # Опоздавшие дорабатывают в фоне (их ограничивает REQUEST_TIMEOUT)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for client, future in zip(self.clients, futures):
+            self._collect(client, future)
+        return self.pairs
+
+    def _collect(self, client, future) -> None:
+        """
+        Забрать результат клиента (concurrent.futures.Future или
+        asyncio.Task) в self.pairs; опоздавших — в self.missed.
+        """
+        client_name = self._client_name(client)
+        # Валидаторы забираем у всех; остаются только у тех, чьи курсы
+        # вошли в снимок (опоздавшие и упавшие — не в счёт)
+        take = getattr(client, "take_validators", None)
+        validators = take() if take is not None else {}
+        if not future.done() or future.cancelled():
+            self.missed.append(client_name)
+            return
+        try:
+            rates = future.result()
+            meta = getattr(client, "last_request", None) or {}
+            if not rates and meta.get("not_modified"):
+                self.unchanged.append(client_name)
+                print(f"♻️ [Updater] {client_name}: 304, курсы не изменились")
+                return
+            if not rates:
+                print(f"🟡 [Updater] {client_name}: получено 0 курсов")
+                return
+
+            source = "CoinGecko" if "CoinGecko" in client_name else "ExchangeRate-API" # noqa: E501
+            # Сведения о запросе — как meta в записях exchange_rates.json
+            meta = {k: v for k, v in meta.items() if k != "not_modified"}
+
+            for pair, rate in rates.items():
+                self.pairs[pair] = {
+                    "rate": rate,
+                    "updated_at": self.timestamp,
+                    "source": source
+                }
+                if meta:
+                    self.pairs[pair]["meta"] = dict(meta)
+
+            self.validators.update(validators)
+            print(f"✅ [Updater] {client_name}: получено {len(rates)} курсов")
+
+        except TimeoutError:
+            # Истёк срок источника (AsyncRatesUpdater)
+            self.missed.append(client_name)
+
+        except ApiRequestError as e:
+            print(f"❌ [Updater] Ошибка {client_name}: {e}")
+            logger.error(f"Ошибка в run_update: {client_name}: {e}")
+
+        except Exception as e:
+            print(f"❌ [Updater] Неизвестная ошибка {client_name}: {e}")
+            logger.error(f"Неизвестная ошибка в run_update: {client_name}: {e}")
+
+    @staticmethod
+    def _client_name(client: BaseApiClient) -> str:
+        # У клиентов-обёрток (replay.py) имя задано явно
+        return getattr(client, "client_name", None) or client.__class__.__name__.replace("Client", "") # noqa: E501
+
+    def _publish(self, pairs: Dict[str, Dict[str, Any]]) -> None:
+        """Разослать новый снимок подписчикам процесса (кеш курсов и др.)"""
+        ttl = SettingsLoader().get("rates_ttl_seconds", 300)
+        # Путь — тот, куда storage записал снимок; кеш курсов сверяет его
+        # с db.rates_file через canonical_path (один и тот же data_dir)
+        rates_file = storage.RATES_FILE_PATH
+        snapshot = make_snapshot({
+            "pairs": pairs,
+            "last_updated": self.timestamp,
+            "generation": read_generation(rates_file),
+        }, ttl)
+        rate_events.publish(snapshot, str(rates_file))
+
+
+class AsyncRatesUpdater(RatesUpdater):
+    """
+    То же обновление, но источники (AsyncBaseApiClient) опрашиваются
+    корутинами в одном цикле событий: у каждого свой срок client.timeout,
+    на всех — REFRESH_DEADLINE; не успевшие отменяются.
+    Объединение и сохранение курсов — общие с RatesUpdater.
+    """
+
+    def __init__(self, clients: List[AsyncBaseApiClient] = None):
+        super().__init__(clients if clients is not None else [])
+        if clients is None:
+            self.clients = self._default_clients()
+
+    @staticmethod
+    def _default_clients() -> List[AsyncBaseApiClient]:
+        clients = []
+        if config.EXCHANGERATE_API_KEY:
+            try:
+                clients.append(AsyncExchangeRateApiClient())
+                logger.info("AsyncExchangeRateApiClient добавлен")
+            except Exception as e:
+                logger.warning(f"Не удалось добавить AsyncExchangeRateApiClient: {e}")
+
+        try:
+            clients.append(AsyncCoinGeckoClient())
+            logger.info("AsyncCoinGeckoClient добавлен")
+        except Exception as e:
+            logger.warning(f"Не удалось добавить AsyncCoinGeckoClient: {e}")
+        return clients
+
+    def run_update(self) -> bool:
+        """Синхронный вход: свой цикл событий на время обновления"""
+        return asyncio.run(self.run_update_async())
+
+    async def run_update_async(self) -> bool:
+        print("🔄 [Updater] Запуск обновления курсов...")
+        await self.fetch_all_async()
+        # Запись файлов блокирующая — выносим из цикла событий
+        return await asyncio.to_thread(self._save)
+
+    def fetch_all(self, deadline: Optional[float] = None) -> Dict[str, Dict[str, Any]]: # noqa: E501
+        return asyncio.run(self.fetch_all_async(deadline))
+
+    async def fetch_all_async(
+        self, deadline: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Опросить всех клиентов конкурентно в текущем цикле событий"""
+        if deadline is None:
+            deadline = config.REFRESH_DEADLINE
+        self.missed = []
+        self.unchanged = []
+        self.validators = {}
+        if not self.clients:
+            return self.pairs
+
+        session = None
+        if aiohttp is not None:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=config.HTTP_POOL_SIZE),
+                timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT),
+            )
+        tasks = []
+        try:
+            for client in self.clients:
+                client.session = session
+                print(f"📡 [Updater] Запрос к {self._client_name(client)}...")
+                tasks.append(asyncio.ensure_future(
+                    asyncio.wait_for(client.fetch_rates(), client.timeout)
+                ))
+            _, pending = await asyncio.wait(tasks, timeout=deadline)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            for client in self.clients:
+                client.session = None
+            if session is not None:
+                await session.close()
+
+        for client, task in zip(self.clients, tasks):
+            self._collect(client, task)
+        return self.pairs
+
 
 def update_rates() -> bool:
     """Обновить курсы и сохранить как снимок в rates.json"""
@@ -116,5 +351,6 @@ def update_rates() -> bool:
         print("⚠️ [Updater] Обновление отключено: нет доступных API-ключей")
         return False
 
-    updater = RatesUpdater()
+    # Тонкая обёртка над асинхронным обновлением
+    updater = AsyncRatesUpdater()
     return updater.run_update()